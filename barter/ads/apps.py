@@ -1,4 +1,8 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import (
+    post_delete, post_migrate, post_save, pre_delete, pre_save
+)
 
 
 class AdsConfig(AppConfig):
@@ -6,3 +10,25 @@ class AdsConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ads'
+
+    def ready(self):
+        from . import signals
+        from .models import Ad, ExchangeProposal
+
+        post_migrate.connect(signals.restore_search_index, sender=self)
+        post_delete.connect(
+            signals.proposal_deleted, sender=ExchangeProposal)
+        pre_save.connect(
+            signals.bump_proposal_version, sender=ExchangeProposal)
+        post_save.connect(signals.refresh_version, sender=ExchangeProposal)
+        post_save.connect(signals.proposal_saved, sender=ExchangeProposal)
+        post_save.connect(
+            signals.create_proposal_counter, sender=settings.AUTH_USER_MODEL)
+        post_save.connect(signals.refresh_version, sender=Ad)
+        post_save.connect(signals.invalidate_ad_listings, sender=Ad)
+        post_delete.connect(signals.invalidate_ad_listings, sender=Ad)
+        pre_save.connect(signals.bump_ad_version, sender=Ad)
+        post_save.connect(signals.ad_saved, sender=Ad)
+        post_save.connect(signals.match_saved_searches, sender=Ad)
+        pre_delete.connect(signals.collect_cascaded_proposals, sender=Ad)
+        post_delete.connect(signals.ad_deleted, sender=Ad)
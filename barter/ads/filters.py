@@ -2,28 +2,45 @@ import django_filters
 
 from .models import Ad
 from constants import ConstStr
-from django.db.models import Q
+from services.search import rank_ads, search_ads
 
 
-def filter_ads(queryset, search=None, category=None, condition=None):
+def filter_ads(
+    queryset, search=None, category=None, condition=None, rank=False
+):
     """
     Применяет фильтрацию к набору объявлений по параметрам:
-    - search: текстовое вхождение в заголовок или описание (поиск нечёткий).
-    - category: точное совпадение категории.
-    - condition: точное совпадение состояния.
+    - search: слова из заголовка или описания (полнотекстовый индекс,
+      при его отсутствии — вхождение подстроки).
+    - category: совпадение категории без учёта регистра.
+    - condition: совпадение состояния без учёта регистра.
+    - rank: отсортировать найденное по релевантности запросу.
+
+    Значения выбора хранятся в нижнем регистре, поэтому параметры
+    приводятся к нему и сравниваются точно: так работают индексы.
 
     """
-    if search:
-        queryset = queryset.filter(
-            Q(title__icontains=search) | Q(description__icontains=search)
-        )
+    if search and rank:
+        queryset = rank_ads(queryset, search)
+    elif search:
+        queryset = search_ads(queryset, search)
     if category:
-        queryset = queryset.filter(category__iexact=category)
+        queryset = queryset.filter(category=category.lower())
     if condition:
-        queryset = queryset.filter(condition__iexact=condition)
+        queryset = queryset.filter(condition=condition.lower())
     return queryset
 
 
+class LowercaseCharFilter(django_filters.CharFilter):
+    """
+    Фильтр точного совпадения со значением в нижнем регистре.
+    В отличие от iexact не мешает базе использовать индекс.
+    """
+
+    def filter(self, qs, value):
+        return super().filter(qs, value.lower() if value else value)
+
+
 class AdFilter(django_filters.FilterSet):
     """
     Фильтры для модели Ad:
@@ -31,14 +48,8 @@ class AdFilter(django_filters.FilterSet):
     - По состоянию (без учёта регистра).
     """
 
-    category = django_filters.CharFilter(
-        field_name=ConstStr.CATEGORY,
-        lookup_expr='iexact'
-    )
-    condition = django_filters.CharFilter(
-        field_name=ConstStr.CONDITION,
-        lookup_expr='iexact'
-    )
+    category = LowercaseCharFilter(field_name=ConstStr.CATEGORY)
+    condition = LowercaseCharFilter(field_name=ConstStr.CONDITION)
 
     class Meta:
         model = Ad
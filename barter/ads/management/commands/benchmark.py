@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from services.benchmarks import SCENARIOS, isolated_database
+
+
+class Command(BaseCommand):
+    """
+    Запускает сценарий нагрузочного замера на отдельной базе
+    и печатает таблицу результатов.
+    """
+
+    help = 'Замеры производительности на синтетических данных.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', help='Название сценария замера.')
+        parser.add_argument(
+            '--sizes',
+            type=lambda value: [int(size) for size in value.split(',')],
+            default=[10_000, 100_000, 1_000_000],
+            help='Размеры данных через запятую.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Количество повторов для медианы.'
+        )
+
+    def handle(self, *args, scenario, sizes, repeat, **options):
+        if scenario not in SCENARIOS:
+            raise CommandError(
+                f'Неизвестный сценарий {scenario!r}. '
+                f'Доступны: {", ".join(sorted(SCENARIOS))}.'
+            )
+        with isolated_database():
+            rows = SCENARIOS[scenario](sizes=sizes, repeat=repeat)
+        if not rows:
+            return
+        columns = list(rows[0])
+        self.stdout.write('\t'.join(columns))
+        for row in rows:
+            self.stdout.write('\t'.join(
+                f'{row[column]:.2f}' if isinstance(row[column], float)
+                else str(row[column])
+                for column in columns
+            ))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from ads.filters import filter_ads
+from ads.models import Ad
+from constants import ConstNum
+from services.ad_export import CONTENT_TYPES, stream_export
+
+
+class Command(BaseCommand):
+    """
+    Выгружает объявления в NDJSON, JSON или CSV серверным курсором:
+    потребление памяти не зависит от размера каталога.
+    """
+
+    help = 'Потоковая выгрузка объявлений в NDJSON, JSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', choices=list(CONTENT_TYPES), default='ndjson',
+            help='Формат выгрузки.'
+        )
+        parser.add_argument(
+            '--file', help='Файл для записи; по умолчанию stdout.')
+        parser.add_argument('--search', default='')
+        parser.add_argument('--category', default='')
+        parser.add_argument('--condition', default='')
+        parser.add_argument(
+            '--chunk-size', type=int, default=ConstNum.EXPORT_CHUNK_SIZE,
+            help='Число строк, читаемых из базы за раз.'
+        )
+
+    def handle(self, *args, **options):
+        queryset = filter_ads(
+            Ad.objects.order_by('id'),
+            options['search'], options['category'], options['condition']
+        )
+        chunks = stream_export(
+            queryset, options['output'], options['chunk_size'])
+        if not options['file']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['file'], 'w', encoding='utf-8',
+                  newline='') as stream:
+            for chunk in chunks:
+                stream.write(chunk)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api.schema import write_schema
+
+
+class Command(BaseCommand):
+    """
+    Собирает схему OpenAPI при сборке или деплое: процессы
+    приложения отдают её из файла, не разбирая представления.
+    """
+
+    help = 'Генерирует схему OpenAPI в файл API_SCHEMA_PATH.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file', help='Файл для записи; по умолчанию API_SCHEMA_PATH.')
+
+    def handle(self, *args, **options):
+        target = write_schema(options['file'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Схема записана в {target} ({target.stat().st_size} байт).'
+        ))
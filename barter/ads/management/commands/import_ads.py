@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from constants import ConstNum
+from services.ad_import import (
+    FORMATS, ImportFormatError, detect_format, import_ads, read_rows
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Импортирует объявления пользователя из файла JSON Lines или CSV.
+    Файл читается построчно, поэтому размер не ограничен памятью.
+    """
+
+    help = 'Массовый импорт объявлений из JSON Lines или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу импорта.')
+        parser.add_argument(
+            '--user', required=True,
+            help='Имя пользователя — владельца объявлений.'
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS, dest='fmt',
+            help='Формат файла; по умолчанию определяется по расширению.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=ConstNum.IMPORT_BATCH_SIZE,
+            help='Размер пачки для проверки и bulk_create.'
+        )
+
+    def handle(self, *args, path, user, fmt, batch_size, **options):
+        try:
+            owner = User.objects.get(username=user)
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {user!r} не найден.')
+
+        def on_error(row, errors):
+            self.stderr.write(f'Строка {row}: {errors}')
+
+        with open(path, encoding='utf-8', newline='') as stream:
+            try:
+                rows = read_rows(stream, fmt or detect_format(path))
+            except ImportFormatError as e:
+                raise CommandError(str(e))
+            report = import_ads(rows, owner, batch_size, on_error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано объявлений: {report.created}, '
+            f'ошибок: {report.error_count}, '
+            f'скорость: {report.rows_per_second:.0f} строк/с.'
+        ))
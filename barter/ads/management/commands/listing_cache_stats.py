@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from services.listing_cache import get_cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    """Выводит статистику кэша выборок списков объявлений."""
+
+    help = 'Показывает попадания и промахи кэша списков объявлений.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Обнулить счётчики после вывода.'
+        )
+
+    def handle(self, *args, **options):
+        stats = get_cache_stats()
+        self.stdout.write(
+            f"Попаданий: {stats['hits']}, промахов: {stats['misses']}, "
+            f"ожиданий чужого запроса: {stats['waits']}, "
+            f"доля попаданий: {stats['hit_rate']:.1%}."
+        )
+        if options['reset']:
+            reset_cache_stats()
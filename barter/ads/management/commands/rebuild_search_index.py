@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from services.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    """Перестраивает полнотекстовый индекс объявлений."""
+
+    help = 'Перестраивает полнотекстовый индекс объявлений (FTS5).'
+
+    def handle(self, *args, **options):
+        if not rebuild_search_index():
+            raise CommandError(
+                'Текущая база данных не поддерживает индекс FTS5.')
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен.'))
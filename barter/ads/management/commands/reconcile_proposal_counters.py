@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from services.counters import reconcile_all_counters
+
+
+class Command(BaseCommand):
+    """Сверяет счётчики ожидающих предложений с таблицей предложений."""
+
+    help = 'Пересчитывает счётчики ожидающих предложений пользователей.'
+
+    def handle(self, *args, **options):
+        fixed = reconcile_all_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: {fixed}.'))
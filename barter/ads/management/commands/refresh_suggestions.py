@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from services.suggestions import refresh_suggestions
+
+
+class Command(BaseCommand):
+    """
+    Обновляет рекомендации обменов по журналу изменений.
+    Рассчитана на периодический запуск (cron, systemd timer).
+    """
+
+    help = 'Инкрементально обновляет рекомендации обменов пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать рекомендации всех активных пользователей.'
+        )
+
+    def handle(self, *args, **options):
+        stats = refresh_suggestions(full=options['full'])
+        mode = 'полный' if stats['full'] else 'инкрементальный'
+        self.stdout.write(self.style.SUCCESS(
+            f"Пересчёт {mode}: пользователей {stats['users']}, "
+            f"новых и изменённых объявлений {stats['ads']}."
+        ))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from services.startup import group_by_package, profile_startup
+
+# Инструменты документации загружаются только при первом запросе к ней.
+LAZY_PACKAGES = ('drf_yasg',)
+
+
+class Command(BaseCommand):
+    """
+    Профиль запуска воркера: время настройки Django и загрузки
+    URLconf в новом процессе и время импорта по пакетам и модулям.
+    """
+
+    help = 'Показывает, из чего складывается время запуска процесса.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default='/api/ads/',
+            help='URL, по которому загружается URLconf.'
+        )
+        parser.add_argument(
+            '--top', type=int, default=15,
+            help='Сколько пакетов и модулей показать.'
+        )
+
+    def handle(self, *args, path, top, **options):
+        summary, imports = profile_startup(path)
+        self.stdout.write(
+            f"django.setup(): {summary['setup_ms']:.1f} мс, "
+            f"URLconf: {summary['urlconf_ms']:.1f} мс, "
+            f"модулей: {len(summary['modules'])}."
+        )
+        loaded = [
+            name for name in LAZY_PACKAGES if name in summary['modules']]
+        self.stdout.write(
+            'Инструменты документации загружены при запуске: '
+            + ', '.join(loaded) if loaded
+            else 'Инструменты документации при запуске не загружаются.'
+        )
+        self.stdout.write('\npackage\tself_ms\tmodules')
+        for name, own, count in group_by_package(imports)[:top]:
+            self.stdout.write(f'{name}\t{own:.2f}\t{count}')
+        self.stdout.write('\nmodule\tself_ms\tcumulative_ms')
+        slowest = sorted(
+            imports.items(), key=lambda item: item[1][1], reverse=True)
+        for name, (own, cumulative) in slowest[:top]:
+            self.stdout.write(f'{name}\t{own:.2f}\t{cumulative:.2f}')
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    ExchangeProposal = apps.get_model('ads', 'ExchangeProposal')
+    ProposalCounter = apps.get_model('ads', 'ProposalCounter')
+    pending = ExchangeProposal.objects.filter(status='pending')
+    sent = dict(
+        pending.values('ad_sender__user')
+        .annotate(total=Count('id')).values_list('ad_sender__user', 'total')
+    )
+    received = dict(
+        pending.exclude(ad_sender__user=F('ad_receiver__user'))
+        .values('ad_receiver__user')
+        .annotate(total=Count('id'))
+        .values_list('ad_receiver__user', 'total')
+    )
+    ProposalCounter.objects.bulk_create(
+        ProposalCounter(
+            user_id=user_id,
+            pending_sent=sent.get(user_id, 0),
+            pending_received=received.get(user_id, 0),
+        )
+        for user_id in User.objects.values_list('pk', flat=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0005_ad_search_index'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProposalCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='proposal_counter', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('pending_sent', models.IntegerField(default=0, verbose_name='Ожидающих отправленных')),
+                ('pending_received', models.IntegerField(default=0, verbose_name='Ожидающих входящих')),
+            ],
+            options={
+                'verbose_name': 'Счётчик предложений',
+                'verbose_name_plural': 'Счётчики предложений',
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
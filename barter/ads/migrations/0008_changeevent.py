@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0007_ad_proposal_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('ad', 'Объявление'), ('proposal', 'Предложение обмена')], max_length=20, verbose_name='Сущность')),
+                ('object_id', models.BigIntegerField(verbose_name='ID объекта')),
+                ('event', models.CharField(choices=[('created', 'Создание'), ('updated', 'Изменение'), ('deleted', 'Удаление'), ('status_changed', 'Смена статуса')], max_length=20, verbose_name='Событие')),
+                ('payload', models.JSONField(default=dict, verbose_name='Данные события')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Время события')),
+            ],
+            options={
+                'verbose_name': 'Событие изменения',
+                'verbose_name_plural': 'Журнал изменений',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['entity', 'id'], name='change_entity_id_idx')],
+            },
+        ),
+    ]
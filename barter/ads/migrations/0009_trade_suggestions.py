@@ -0,0 +1,58 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0008_changeevent'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCheckpoint',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Задача')),
+                ('cursor', models.BigIntegerField(default=0, verbose_name='Последнее событие')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Время обновления')),
+            ],
+            options={
+                'verbose_name': 'Позиция задачи',
+                'verbose_name_plural': 'Позиции задач',
+            },
+        ),
+        migrations.CreateModel(
+            name='TradeProfile',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trade_profile', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('categories', models.JSONField(default=dict, verbose_name='Доли категорий')),
+                ('conditions', models.JSONField(default=dict, verbose_name='Доли состояний')),
+                ('threshold', models.FloatField(blank=True, null=True, verbose_name='Порог оценки')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Время пересчёта')),
+            ],
+            options={
+                'verbose_name': 'Профиль рекомендаций',
+                'verbose_name_plural': 'Профили рекомендаций',
+            },
+        ),
+        migrations.CreateModel(
+            name='TradeSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Оценка')),
+                ('ad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trade_suggestions', to='ads.ad', verbose_name='Объявление')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trade_suggestions', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Рекомендация обмена',
+                'verbose_name_plural': 'Рекомендации обмена',
+                'indexes': [models.Index(fields=['user', '-score', 'ad'], name='suggestion_user_score_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'ad'), name='suggestion_user_ad_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0009_trade_suggestions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Время создания')),
+                ('search', models.CharField(blank=True, max_length=255, verbose_name='Поисковый запрос')),
+                ('category', models.CharField(blank=True, choices=[('books', 'Книги'), ('electronics', 'Электроника'), ('clothes', 'Одежда'), ('furniture', 'Мебель'), ('toys', 'Игрушки'), ('other', 'Другое')], max_length=50, verbose_name='Категория')),
+                ('condition', models.CharField(blank=True, choices=[('new', 'Новый'), ('used', 'Б/у')], max_length=10, verbose_name='Состояние')),
+                ('term_count', models.PositiveSmallIntegerField(default=0, verbose_name='Число термов')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Уведомлять о новых объявлениях')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Сохранённый поиск',
+                'verbose_name_plural': 'Сохранённые поиски',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SavedSearchMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Время создания')),
+                ('is_read', models.BooleanField(default=False, verbose_name='Просмотрено')),
+                ('ad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_matches', to='ads.ad', verbose_name='Объявление')),
+                ('saved_search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='ads.savedsearch', verbose_name='Сохранённый поиск')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_matches', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Совпадение сохранённого поиска',
+                'verbose_name_plural': 'Совпадения сохранённых поисков',
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SavedSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Терм')),
+                ('saved_search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='ads.savedsearch', verbose_name='Сохранённый поиск')),
+            ],
+            options={
+                'verbose_name': 'Терм сохранённого поиска',
+                'verbose_name_plural': 'Термы сохранённых поисков',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='savedsearch',
+            index=models.Index(condition=models.Q(('is_active', True), ('term_count', 0)), fields=['category', 'condition'], name='saved_search_termless_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savedsearchmatch',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='search_match_user_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='savedsearchmatch',
+            constraint=models.UniqueConstraint(fields=('saved_search', 'ad'), name='saved_search_match_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='savedsearchterm',
+            index=models.Index(fields=['term', 'saved_search'], name='saved_search_term_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='savedsearchterm',
+            constraint=models.UniqueConstraint(fields=('saved_search', 'term'), name='saved_search_term_unique'),
+        ),
+    ]
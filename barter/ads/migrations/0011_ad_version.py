@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0010_saved_searches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='version',
+            field=models.PositiveIntegerField(default=1, verbose_name='Версия'),
+        ),
+    ]
@@ -22,6 +22,18 @@ class StatusChoices(models.TextChoices):
     REJECTED = 'rejected', 'Отклонена'
 
 
+class EntityChoices(models.TextChoices):
+    AD = 'ad', 'Объявление'
+    PROPOSAL = 'proposal', 'Предложение обмена'
+
+
+class EventChoices(models.TextChoices):
+    CREATED = 'created', 'Создание'
+    UPDATED = 'updated', 'Изменение'
+    DELETED = 'deleted', 'Удаление'
+    STATUS_CHANGED = 'status_changed', 'Смена статуса'
+
+
 class BaseModel(models.Model):
     """
     Абстрактная базовая модель с полем даты создания.
@@ -72,11 +84,37 @@ class Ad(BaseModel):
         default=False,
         verbose_name='Состояние обмена'
     )
+    version = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Версия'
+    )
 
     class Meta:
         verbose_name = 'Объявление'
         verbose_name_plural = 'Объявления'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='ad_created_id_idx'
+            ),
+            models.Index(
+                fields=['category', 'condition', '-created_at', '-id'],
+                name='ad_category_condition_idx'
+            ),
+            models.Index(
+                fields=['category', '-created_at', '-id'],
+                name='ad_category_created_idx'
+            ),
+            models.Index(
+                fields=['condition', '-created_at', '-id'],
+                name='ad_condition_created_idx'
+            ),
+            models.Index(
+                fields=['user', '-created_at', '-id'],
+                name='ad_user_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -109,11 +147,362 @@ class ExchangeProposal(BaseModel):
         default='pending',
         verbose_name='Статус обмена'
     )
+    version = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Версия'
+    )
 
     class Meta:
         verbose_name = 'Предложение обмена'
         verbose_name_plural = 'Предложения обмена'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='proposal_created_id_idx'
+            ),
+            models.Index(
+                fields=['ad_sender', 'ad_receiver'],
+                condition=models.Q(status='pending'),
+                name='proposal_pending_sender_idx'
+            ),
+            models.Index(
+                fields=['ad_receiver', 'ad_sender'],
+                condition=models.Q(status='pending'),
+                name='proposal_pending_receiver_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'Обмен от {self.ad_sender} к {self.ad_receiver}'
+
+
+class ProposalCounter(models.Model):
+    """
+    Денормализованные счётчики необработанных предложений пользователя.
+    Поддерживаются сервисом предложений, сверяются командой
+    reconcile_proposal_counters. Входящие не включают предложения
+    между объявлениями самого пользователя: они учтены в отправленных.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='proposal_counter',
+        verbose_name='Пользователь'
+    )
+    pending_sent = models.IntegerField(
+        default=0,
+        verbose_name='Ожидающих отправленных'
+    )
+    pending_received = models.IntegerField(
+        default=0,
+        verbose_name='Ожидающих входящих'
+    )
+
+    class Meta:
+        verbose_name = 'Счётчик предложений'
+        verbose_name_plural = 'Счётчики предложений'
+
+    def __str__(self):
+        return f'Счётчик предложений {self.user}'
+
+    @property
+    def pending_total(self):
+        return self.pending_sent + self.pending_received
+
+
+class ChangeEvent(models.Model):
+    """
+    Запись журнала изменений объявлений и предложений обмена.
+    Журнал только дополняется; возрастающий id служит курсором
+    инкрементальной синхронизации.
+    """
+
+    entity = models.CharField(
+        max_length=20,
+        choices=EntityChoices.choices,
+        verbose_name='Сущность'
+    )
+    object_id = models.BigIntegerField(verbose_name='ID объекта')
+    event = models.CharField(
+        max_length=20,
+        choices=EventChoices.choices,
+        verbose_name='Событие'
+    )
+    payload = models.JSONField(
+        default=dict,
+        verbose_name='Данные события'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Время события'
+    )
+
+    class Meta:
+        verbose_name = 'Событие изменения'
+        verbose_name_plural = 'Журнал изменений'
+        ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['entity', 'id'],
+                name='change_entity_id_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.entity} {self.object_id}: {self.event}'
+
+
+class TradeSuggestion(models.Model):
+    """
+    Предрассчитанная рекомендация: объявление, которое пользователь
+    вероятно захочет получить. Для каждого пользователя хранится
+    не больше SUGGESTIONS_PER_USER лучших объявлений; таблица
+    обновляется командой refresh_suggestions.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='trade_suggestions',
+        verbose_name='Пользователь'
+    )
+    ad = models.ForeignKey(
+        Ad,
+        on_delete=models.CASCADE,
+        related_name='trade_suggestions',
+        verbose_name='Объявление'
+    )
+    score = models.FloatField(verbose_name='Оценка')
+
+    class Meta:
+        verbose_name = 'Рекомендация обмена'
+        verbose_name_plural = 'Рекомендации обмена'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ad'],
+                name='suggestion_user_ad_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score', 'ad'],
+                name='suggestion_user_score_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.ad} для {self.user}'
+
+
+class TradeProfile(models.Model):
+    """
+    Профиль предпочтений пользователя для рекомендаций: доли
+    категорий и состояний из истории предложений и оценка
+    последней сохранённой рекомендации (порог для новых объявлений).
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trade_profile',
+        verbose_name='Пользователь'
+    )
+    categories = models.JSONField(
+        default=dict,
+        verbose_name='Доли категорий'
+    )
+    conditions = models.JSONField(
+        default=dict,
+        verbose_name='Доли состояний'
+    )
+    threshold = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='Порог оценки'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Время пересчёта'
+    )
+
+    class Meta:
+        verbose_name = 'Профиль рекомендаций'
+        verbose_name_plural = 'Профили рекомендаций'
+
+    def __str__(self):
+        return f'Профиль рекомендаций {self.user}'
+
+
+class JobCheckpoint(models.Model):
+    """
+    Позиция фоновой задачи в журнале изменений:
+    id последнего обработанного события.
+    """
+
+    name = models.CharField(
+        max_length=50,
+        primary_key=True,
+        verbose_name='Задача'
+    )
+    cursor = models.BigIntegerField(
+        default=0,
+        verbose_name='Последнее событие'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Время обновления'
+    )
+
+    class Meta:
+        verbose_name = 'Позиция задачи'
+        verbose_name_plural = 'Позиции задач'
+
+    def __str__(self):
+        return f'{self.name}: {self.cursor}'
+
+
+class SavedSearch(BaseModel):
+    """
+    Сохранённый поиск пользователя: текст запроса, категория
+    и состояние. Новые объявления сверяются с сохранёнными поисками
+    через обратный индекс термов (SavedSearchTerm).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='saved_searches',
+        verbose_name='Пользователь'
+    )
+    search = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Поисковый запрос'
+    )
+    category = models.CharField(
+        max_length=50,
+        choices=CategoryChoices.choices,
+        blank=True,
+        verbose_name='Категория'
+    )
+    condition = models.CharField(
+        max_length=10,
+        choices=ConditionChoices.choices,
+        blank=True,
+        verbose_name='Состояние'
+    )
+    term_count = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Число термов'
+    )
+    is_active = models.BooleanField(
+        default=True,
+        verbose_name='Уведомлять о новых объявлениях'
+    )
+
+    class Meta:
+        verbose_name = 'Сохранённый поиск'
+        verbose_name_plural = 'Сохранённые поиски'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['category', 'condition'],
+                condition=models.Q(term_count=0, is_active=True),
+                name='saved_search_termless_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return self.search or f'{self.category} {self.condition}'.strip()
+
+
+class SavedSearchTerm(models.Model):
+    """
+    Запись обратного индекса: терм сохранённого поиска.
+    Объявление подходит под поиск, если для каждого терма
+    в нём есть слово, начинающееся с этого терма.
+    """
+
+    saved_search = models.ForeignKey(
+        SavedSearch,
+        on_delete=models.CASCADE,
+        related_name='terms',
+        verbose_name='Сохранённый поиск'
+    )
+    term = models.CharField(
+        max_length=64,
+        verbose_name='Терм'
+    )
+
+    class Meta:
+        verbose_name = 'Терм сохранённого поиска'
+        verbose_name_plural = 'Термы сохранённых поисков'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['saved_search', 'term'],
+                name='saved_search_term_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['term', 'saved_search'],
+                name='saved_search_term_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return self.term
+
+
+class SavedSearchMatch(BaseModel):
+    """
+    Новое объявление, подошедшее под сохранённый поиск:
+    запись ленты уведомлений пользователя.
+    """
+
+    saved_search = models.ForeignKey(
+        SavedSearch,
+        on_delete=models.CASCADE,
+        related_name='matches',
+        verbose_name='Сохранённый поиск'
+    )
+    ad = models.ForeignKey(
+        Ad,
+        on_delete=models.CASCADE,
+        related_name='search_matches',
+        verbose_name='Объявление'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='search_matches',
+        verbose_name='Пользователь'
+    )
+    is_read = models.BooleanField(
+        default=False,
+        verbose_name='Просмотрено'
+    )
+
+    class Meta:
+        verbose_name = 'Совпадение сохранённого поиска'
+        verbose_name_plural = 'Совпадения сохранённых поисков'
+        ordering = ['-created_at', '-id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['saved_search', 'ad'],
+                name='saved_search_match_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-created_at', '-id'],
+                name='search_match_user_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.ad} по запросу {self.saved_search}'
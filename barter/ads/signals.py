@@ -0,0 +1,188 @@
+from django.db import connections
+from django.db.models import F, Q
+
+from constants import ConstStr
+from services.ad_cards import forget_ad_card
+from services.change_feed import (
+    ad_payload, proposal_payload, record_change, record_changes
+)
+from services.counters import adjust_pending_counters, pending_changes
+from services.listing_cache import PROPOSALS_NAMESPACE, bump_generation
+from services.saved_searches import percolate
+from services.search import ensure_search_index
+from .models import (
+    Ad, EntityChoices, EventChoices, ExchangeProposal, ProposalCounter
+)
+
+
+def restore_search_index(sender, using='default', **kwargs):
+    """После миграций проверяет целостность поискового индекса."""
+    ensure_search_index(connections[using])
+
+
+def cascade_state(origin, instance):
+    """
+    Предложения, собранные перед каскадным удалением объявлений:
+    хранятся на источнике удаления (объявление или QuerySet),
+    общем для всех сигналов одного delete().
+    """
+    holder = instance if origin is None else origin
+    if '_cascaded_proposals' not in holder.__dict__:
+        holder._cascaded_proposals = {'ids': set(), 'by_ad': {}}
+    return holder._cascaded_proposals
+
+
+def collect_cascaded_proposals(sender, instance, origin=None, **kwargs):
+    """
+    Перед удалением объявления одним запросом читает предложения,
+    которые удалятся каскадом, чтобы после удаления записать события
+    и поправить счётчики для всех сразу (см. ad_deleted).
+    """
+    state = cascade_state(origin, instance)
+    rows = [
+        row for row in ExchangeProposal.objects.filter(
+            Q(ad_sender=instance) | Q(ad_receiver=instance)
+        ).values_list(
+            'pk', 'status', 'ad_sender__user_id', 'ad_receiver__user_id')
+        if row[0] not in state['ids']
+    ]
+    state['ids'].update(row[0] for row in rows)
+    state['by_ad'][instance.pk] = rows
+
+
+def release_cascaded_proposals(rows):
+    """
+    Журнал и счётчики для предложений, удалённых каскадом:
+    одна вставка событий и один UPDATE счётчиков.
+    """
+    if not rows:
+        return
+    bump_generation(PROPOSALS_NAMESPACE)
+    record_changes(
+        EntityChoices.PROPOSAL, EventChoices.DELETED,
+        (
+            (pk, proposal_payload(sender_user, receiver_user, status))
+            for pk, status, sender_user, receiver_user in rows
+        )
+    )
+    adjust_pending_counters(pending_changes(
+        [
+            (sender_user, receiver_user)
+            for _, status, sender_user, receiver_user in rows
+            if status == ConstStr.PENDING
+        ],
+        -1
+    ), create_missing=False)
+
+
+def proposal_deleted(sender, instance, origin=None, **kwargs):
+    """
+    При удалении предложения пишет событие в журнал изменений
+    и уменьшает счётчики, если предложение ожидало ответа.
+    Каскадные удаления при удалении объявления обрабатываются
+    пачкой в ad_deleted.
+    """
+    if instance.pk in cascade_state(origin, instance)['ids']:
+        return
+    owners = dict(
+        Ad.objects.filter(
+            pk__in=[instance.ad_sender_id, instance.ad_receiver_id]
+        ).values_list('pk', 'user_id')
+    )
+    sender_user = owners.get(instance.ad_sender_id)
+    receiver_user = owners.get(instance.ad_receiver_id)
+    bump_generation(PROPOSALS_NAMESPACE)
+    record_change(
+        EntityChoices.PROPOSAL, instance.pk, EventChoices.DELETED,
+        proposal_payload(sender_user, receiver_user, instance.status)
+    )
+    if instance.status != ConstStr.PENDING or len(owners) < 2:
+        return
+    adjust_pending_counters(pending_changes(
+        [(sender_user, receiver_user)], -1
+    ), create_missing=False)
+
+
+def proposal_saved(sender, instance, created, **kwargs):
+    """
+    Пишет создание или изменение предложения в журнал изменений
+    и сдвигает поколение коллекции предложений.
+    """
+    bump_generation(PROPOSALS_NAMESPACE)
+    record_change(
+        EntityChoices.PROPOSAL, instance.pk,
+        EventChoices.CREATED if created else EventChoices.UPDATED,
+        proposal_payload(
+            instance.ad_sender.user_id, instance.ad_receiver.user_id,
+            instance.status
+        )
+    )
+
+
+def ad_saved(sender, instance, created, **kwargs):
+    """Пишет создание или изменение объявления в журнал изменений."""
+    record_change(
+        EntityChoices.AD, instance.pk,
+        EventChoices.CREATED if created else EventChoices.UPDATED,
+        ad_payload(instance)
+    )
+
+
+def ad_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Пишет удаление объявления и его предложений в журнал изменений,
+    уменьшает счётчики и удаляет кэшированную карточку.
+    """
+    release_cascaded_proposals(
+        cascade_state(origin, instance)['by_ad'].pop(instance.pk, []))
+    record_change(
+        EntityChoices.AD, instance.pk, EventChoices.DELETED,
+        ad_payload(instance)
+    )
+    forget_ad_card(instance.pk, instance.version)
+
+
+def bump_ad_version(sender, instance, **kwargs):
+    """
+    Увеличивает версию изменяемого объявления: версия входит
+    в ключ кэша карточки, поэтому старый фрагмент перестаёт читаться.
+    Версия увеличивается выражением F в самом UPDATE, а не в копии
+    в памяти: версию могли сдвинуть после загрузки объявления
+    (например, mark_ads_exchanged), и она не должна повториться.
+    """
+    if instance._state.adding or instance.pk is None:
+        return
+    forget_ad_card(instance.pk, instance.version)
+    instance.version = F('version') + 1
+
+
+def match_saved_searches(sender, instance, created, **kwargs):
+    """Сверяет новое объявление с сохранёнными поисками."""
+    if created:
+        percolate([instance])
+
+
+def bump_proposal_version(sender, instance, **kwargs):
+    """
+    Увеличивает версию изменяемого предложения (ETag объекта)
+    выражением F в самом UPDATE, как и bump_ad_version.
+    """
+    if not instance._state.adding and instance.pk is not None:
+        instance.version = F('version') + 1
+
+
+def refresh_version(sender, instance, created, **kwargs):
+    """Читает версию, записанную выражением F при сохранении."""
+    if hasattr(instance.version, 'resolve_expression'):
+        instance.refresh_from_db(fields=['version'])
+
+
+def create_proposal_counter(sender, instance, created, **kwargs):
+    """Заводит нулевой счётчик предложений для нового пользователя."""
+    if created:
+        ProposalCounter.objects.get_or_create(user=instance)
+
+
+def invalidate_ad_listings(sender, **kwargs):
+    """Сбрасывает кэш списков объявлений при изменении объявления."""
+    bump_generation()
@@ -1,8 +1,12 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.shortcuts import get_object_or_404, redirect
 from django.core.paginator import Paginator
+from django.utils.decorators import method_decorator
 from django.utils.http import urlencode
 from django.urls import reverse_lazy
 from django.views.generic import (
@@ -12,69 +16,109 @@ from django.views.generic import (
 
 from .models import Ad, ExchangeProposal
 from .forms import AdForm, ExchangeProposalForm
-from api.mixins import AdsFilterMixin, IsOwnerMixin
+from api.mixins import AdsFilterMixin, IsOwnerMixin, QueryPlanMixin
 from constants import ConstStr, ConstNum, Message, Errors
 from services.proposal_service import (
     process_proposal_action, create_exchange_proposal,
     ProposalCreationError
 )
+from services.listing_cache import CachedPaginator, cached_keyset_page
+from services.pagination import InvalidCursorError, get_keyset_direction
+from services.query_plans import QueryPlan
 from services.registration import register_user, RegistrationError
 
 
-class AdListView(LoginRequiredMixin, AdsFilterMixin, ListView):
+class AdListView(
+    LoginRequiredMixin,
+    AdsFilterMixin,
+    QueryPlanMixin,
+    ListView
+):
     """
     Представление для отображения списка объявлений
     с фильтрацией, сортировкой и пагинацией.
+
+    По умолчанию страницы листаются курсором по (created_at, id),
+    параметр page включает прежнюю постраничную навигацию.
+    id страниц кэшируются по нормализованным параметрам фильтрации,
+    общая для всех пользователей часть карточек — по id и версии
+    объявления.
     """
 
     model = Ad
     template_name = 'ads/ad_list.html'
     context_object_name = 'ads'
     paginate_by = ConstNum.PAGINATION_COUNT
+    paginator_class = CachedPaginator
     ordering = ['-created_at']
+    query_plan = QueryPlan(only=[
+        'id', 'user_id', ConstStr.TITLE, ConstStr.DESCRIPTION,
+        ConstStr.IMAGE_URL, ConstStr.CATEGORY, ConstStr.CONDITION,
+        'is_exchanged', ConstStr.CREATED_AT, 'version',
+    ])
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = self.apply_query_plan(super().get_queryset())
         queryset = self.filter_ads_queryset(queryset)
+        queryset = self.filter_my_ads(queryset)
+        queryset = queryset.annotate(is_proposed=Exists(
+            ExchangeProposal.objects.filter(
+                ad_receiver=OuterRef('pk'),
+                ad_sender__user=self.request.user,
+                status=ConstStr.PENDING
+            )
+        ))
+        return self.order_ads_queryset(queryset)
+
+    def filter_my_ads(self, queryset):
         if self.request.GET.get(
             'my_ads'
         ) and self.request.user.is_authenticated:
             queryset = queryset.filter(user=self.request.user)
-        order_by = self.request.GET.get('order_by')
-        if order_by in [
-            ConstStr.TITLE,
-            f'-{ConstStr.TITLE}',
-            '-created_at'.lstrip('-'),
-            '-created_at',
-        ]:
-            queryset = queryset.order_by(order_by)
-        else:
-            queryset = queryset.order_by('-created_at')
         return queryset
 
+    def get_listing_params(self):
+        params = super().get_listing_params()
+        if self.request.GET.get('my_ads'):
+            params['user'] = self.request.user.pk
+        return params
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return super().get_paginator(
+            queryset, per_page, params=self.get_listing_params(), **kwargs)
+
+    def paginate_queryset(self, queryset, page_size):
+        if (
+            self.page_kwarg in self.request.GET
+            or get_keyset_direction(queryset) is None
+        ):
+            return super().paginate_queryset(queryset, page_size)
+        params = self.get_listing_params()
+        try:
+            page = cached_keyset_page(
+                queryset, self.request.GET.get('cursor'), page_size, params)
+        except InvalidCursorError:
+            page = cached_keyset_page(queryset, None, page_size, params)
+        return None, page, page.object_list, page.has_other_pages()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user_ads = Ad.objects.filter(user=self.request.user)
-        context['proposed_ads_ids'] = set(
-            ExchangeProposal.objects.filter(
-                ad_sender__in=user_ads,
-                status=ConstStr.PENDING
-            ).values_list('ad_receiver_id', flat=True)
-        )
-        context['exchanged_ads_ids'] = set(
-            Ad.objects.filter(is_exchanged=True).values_list('id', flat=True)
-        )
+        pagination_query = self.request.GET.copy()
+        pagination_query.pop('cursor', None)
+        pagination_query.pop(self.page_kwarg, None)
+        context['pagination_query'] = pagination_query.urlencode()
         context['search_query'] = self.get_search_param()
         context['filter_category'] = self.get_category_param()
         context['filter_condition'] = self.get_condition_param()
-        context['category_choices'] = Ad._meta.get_field(
-            ConstStr.CATEGORY).choices
-        context['condition_choices'] = Ad._meta.get_field(
-            ConstStr.CONDITION).choices
+        facets = self.get_ad_facets(self.filter_my_ads(Ad.objects.all()))
+        context['category_facets'] = facets[ConstStr.CATEGORY]
+        context['condition_facets'] = facets[ConstStr.CONDITION]
         context['my_ads_checked'] = bool(self.request.GET.get('my_ads'))
+        context['ad_card_timeout'] = settings.AD_CARD_CACHE_TIMEOUT
         return context
 
 
+@method_decorator(transaction.atomic, name='form_valid')
 class AdCreateView(LoginRequiredMixin, CreateView):
     """Создание нового объявления текущим пользователем."""
 
@@ -88,6 +132,7 @@ class AdCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
+@method_decorator(transaction.atomic, name='form_valid')
 class AdUpdateView(
     LoginRequiredMixin,
     UserPassesTestMixin,
@@ -106,6 +151,7 @@ class AdUpdateView(
         return self.is_owner(ad)
 
 
+@method_decorator(transaction.atomic, name='form_valid')
 class AdDeleteView(
     LoginRequiredMixin,
     UserPassesTestMixin,
@@ -168,22 +214,31 @@ class ProposalCreateView(LoginRequiredMixin, FormView):
         return super().form_valid(form)
 
 
-class MyProposalsView(LoginRequiredMixin, TemplateView):
+class MyProposalsView(LoginRequiredMixin, QueryPlanMixin, TemplateView):
     """
     Отображение предложений, отправленных
     и полученных текущим пользователем, с фильтрацией.
     """
 
     template_name = 'ads/my_proposals.html'
+    query_plan = QueryPlan(
+        select_related=['ad_sender__user', 'ad_receiver__user'],
+        only=[
+            'id', 'status', ConstStr.CREATED_AT,
+            'ad_sender', 'ad_sender__title',
+            'ad_sender__user', 'ad_sender__user__username',
+            'ad_receiver', 'ad_receiver__title',
+            'ad_receiver__user', 'ad_receiver__user__username',
+        ]
+    )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.request.user
         user_ads = Ad.objects.filter(user=user)
-        sent_proposals = ExchangeProposal.objects.filter(
-            ad_sender__in=user_ads)
-        received_proposals = ExchangeProposal.objects.filter(
-            ad_receiver__in=user_ads)
+        proposals = self.apply_query_plan(ExchangeProposal.objects.all())
+        sent_proposals = proposals.filter(ad_sender__in=user_ads)
+        received_proposals = proposals.filter(ad_receiver__in=user_ads)
         status_filter = self.request.GET.get('status')
         sender_filter = self.request.GET.get('sender', '').strip()
         receiver_filter = self.request.GET.get('receiver', '').strip()
@@ -0,0 +1,80 @@
+import threading
+from importlib import import_module
+
+_lock = threading.Lock()
+_deferred = []
+
+
+class Deferred:
+    """
+    Отложенное обращение к drf_yasg.openapi: атрибут модуля
+    или его вызов с аргументами, вычисляемые в resolve().
+    """
+
+    def __init__(self, name, args=None, kwargs=None):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+
+    def __repr__(self):
+        return f'Deferred(openapi.{self.name})'
+
+    def __call__(self, *args, **kwargs):
+        return Deferred(self.name, args, kwargs)
+
+    def resolve(self):
+        target = getattr(import_module('drf_yasg.openapi'), self.name)
+        if self.args is None and self.kwargs is None:
+            return target
+        return target(*resolve(self.args), **resolve(self.kwargs))
+
+
+class LazyOpenAPI:
+    """Заменитель модуля drf_yasg.openapi: openapi.Parameter(...) и т.д."""
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return Deferred(name)
+
+
+openapi = LazyOpenAPI()
+
+
+def resolve(value):
+    """Заменяет отложенные объекты настоящими, в том числе вложенные."""
+    if isinstance(value, Deferred):
+        return value.resolve()
+    if isinstance(value, dict):
+        return {key: resolve(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(resolve(item) for item in value)
+    return value
+
+
+def swagger_auto_schema(**kwargs):
+    """
+    Запоминает параметры drf_yasg.utils.swagger_auto_schema
+    для метода представления, не импортируя drf_yasg: документация
+    нужна редко, а импорт drf_yasg (вместе с yaml и инспекторами)
+    заметно удлиняет запуск воркера. Настоящий декоратор применяет
+    load_docs() перед первой генерацией схемы.
+    """
+    def decorator(view_method):
+        _deferred.append((view_method, kwargs))
+        return view_method
+    return decorator
+
+
+def load_docs():
+    """
+    Применяет отложенные декораторы swagger_auto_schema.
+    Вызывается перед генерацией схемы; повторный вызов ничего не делает.
+    """
+    with _lock:
+        if not _deferred:
+            return
+        from drf_yasg.utils import swagger_auto_schema as decorate
+        for view_method, kwargs in _deferred:
+            decorate(**resolve(kwargs))(view_method)
+        _deferred.clear()
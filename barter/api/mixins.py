@@ -1,6 +1,21 @@
+import hashlib
+import json
+from types import SimpleNamespace
+
 from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 
 from ads.filters import filter_ads
+from constants import ConstStr
+from services.facets import get_facets
+from services.listing_cache import get_generation
+from services.row_serializers import UnknownFieldsError
+from services.search import normalize_search
 
 
 class IsOwnerMixin:
@@ -9,7 +24,7 @@ class IsOwnerMixin:
     """
 
     def is_owner(self, obj):
-        return obj.user == self.request.user
+        return obj.user_id == self.request.user.id
 
 
 class IsOwnerPermission(permissions.BasePermission):
@@ -18,7 +33,163 @@ class IsOwnerPermission(permissions.BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        return obj.user == request.user
+        return obj.user_id == request.user.id
+
+
+class QueryPlanMixin:
+    """
+    Миксин для применения плана загрузки (QueryPlan) к кверисету.
+    План задаётся атрибутом query_plan или словарём query_plans
+    по действию DRF (list, retrieve и т.д.).
+    Используется в Django CBV и в DRF ViewSet.
+    """
+
+    query_plan = None
+    query_plans = {}
+
+    def get_query_plan(self):
+        return self.query_plans.get(
+            getattr(self, 'action', None), self.query_plan)
+
+    def apply_query_plan(self, queryset):
+        plan = self.get_query_plan()
+        return plan.apply(queryset) if plan else queryset
+
+
+class RowSerializerMixin:
+    """
+    Миксин быстрого чтения для DRF ViewSet: list и retrieve выводят
+    строки values() через RowSerializer, заданный словарём
+    row_serializers по действию, вместо экземпляров моделей
+    и ModelSerializer. Для действий без RowSerializer работает
+    обычный путь.
+
+    Параметр fields оставляет в ответе перечисленные поля (остальные
+    колонки не читаются), expand раскрывает связи RowSerializer
+    в объекты тем же запросом.
+    """
+
+    row_serializers = {}
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def get_row_serializer(self):
+        row_serializer = self.row_serializers.get(
+            getattr(self, 'action', None))
+        if row_serializer is None:
+            return None
+        try:
+            return row_serializer.select(
+                self.request.query_params.get(self.fields_query_param),
+                self.request.query_params.get(self.expand_query_param),
+            )
+        except UnknownFieldsError as e:
+            raise ValidationError(str(e))
+
+    def list(self, request, *args, **kwargs):
+        row_serializer = self.get_row_serializer()
+        if row_serializer is None:
+            return super().list(request, *args, **kwargs)
+        queryset = row_serializer.values(
+            self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(row_serializer.represent(page))
+        return Response(row_serializer.represent(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        row_serializer = self.get_row_serializer()
+        if row_serializer is None:
+            return super().retrieve(request, *args, **kwargs)
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            row_serializer.values(self.filter_queryset(self.get_queryset())),
+            **{self.lookup_field: self.kwargs[lookup]}
+        )
+        # Пермишены проверяют атрибуты объекта, например user_id.
+        self.check_object_permissions(request, SimpleNamespace(**row))
+        return Response(row_serializer.to_representation(row))
+
+
+class ConditionalGetMixin:
+    """
+    Миксин условных GET-запросов (ETag) для list и retrieve DRF ViewSet.
+
+    ETag списка строится из поколения коллекции etag_namespace
+    и строки запроса, поэтому неизменившаяся коллекция получает 304
+    без запроса выборки. ETag объекта — из его версии: один запрос
+    одного поля вместо загрузки и сериализации.
+    etag_per_user добавляет в ETag пользователя, если выборка
+    зависит от него. etag_object_fields — поля, которые проверяют
+    пермишены объекта: они читаются тем же запросом, что и версия,
+    и ответ 304 отдаётся только после check_object_permissions.
+
+    Last-Modified не отдаётся: у него секундная точность, и изменение
+    в ту же секунду, что и чтение, давало бы клиенту устаревший 304.
+    """
+
+    etag_namespace = None
+    etag_per_user = False
+    etag_object_fields = ()
+
+    def get_etag_namespaces(self):
+        """
+        Коллекции, от которых зависит ответ: своя и, например,
+        коллекции раскрытых связей.
+        """
+        return [self.etag_namespace]
+
+    def make_etag(self, *parts):
+        if self.etag_per_user:
+            parts += (self.request.user.id,)
+        raw = json.dumps(
+            [self.etag_namespace, self.request.get_full_path(), *parts])
+        return quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+
+    def get_list_etag(self):
+        return self.make_etag(*(
+            get_generation(namespace)
+            for namespace in self.get_etag_namespaces()
+        ))
+
+    def get_object_etag(self):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        row = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup]}
+        ).values('version', *self.etag_object_fields).first()
+        if row is None:
+            return None
+        # Без проверки чужой клиент получил бы 304 вместо 403.
+        self.check_object_permissions(self.request, SimpleNamespace(**row))
+        return self.make_etag(self.kwargs[lookup], row['version'], *(
+            get_generation(namespace)
+            for namespace in self.get_etag_namespaces()
+            if namespace != self.etag_namespace
+        ))
+
+    def conditional(self, etag, handler, request, *args, **kwargs):
+        """
+        Отвечает 304, если ETag клиента актуален,
+        иначе вызывает обработчик. Без ETag (объект не найден)
+        ответ целиком отдаётся обработчику.
+        """
+        if etag is None:
+            return handler(request, *args, **kwargs)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response.headers['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(
+            self.get_list_etag(), super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(
+            self.get_object_etag(), super().retrieve,
+            request, *args, **kwargs)
 
 
 class AdsFilterMixin:
@@ -27,9 +198,20 @@ class AdsFilterMixin:
     - Поиск (по заголовку и описанию),
     - Категория,
     - Состояние.
+    А также сортировки, включая сортировку по релевантности.
     Используется в Django CBV и в DRF ViewSet.
     """
 
+    ordering_query_param = 'order_by'
+    allowed_orderings = (
+        ConstStr.TITLE,
+        f'-{ConstStr.TITLE}',
+        ConstStr.CREATED_AT,
+        f'-{ConstStr.CREATED_AT}',
+        ConstStr.RELEVANCE,
+    )
+    default_ordering = f'-{ConstStr.CREATED_AT}'
+
     def get_search_param(self):
         return self.request.query_params.get(
             'search', ''
@@ -48,6 +230,17 @@ class AdsFilterMixin:
                 self.request, 'query_params') else self.request.GET.get(
                     'condition', '')
 
+    def get_ordering_param(self):
+        ordering = self.request.query_params.get(
+            self.ordering_query_param, '') if hasattr(
+                self.request, 'query_params') else self.request.GET.get(
+                    self.ordering_query_param, '')
+        if ordering not in self.allowed_orderings:
+            return self.default_ordering
+        if ordering == ConstStr.RELEVANCE and not self.get_search_param():
+            return self.default_ordering
+        return ordering
+
     def filter_ads_queryset(self, queryset):
         """
         Фильтрует кверисет объявлений по параметрам поиска,
@@ -57,4 +250,42 @@ class AdsFilterMixin:
         search = self.get_search_param()
         category = self.get_category_param()
         condition = self.get_condition_param()
-        return filter_ads(queryset, search, category, condition)
+        rank = self.get_ordering_param() == ConstStr.RELEVANCE
+        return filter_ads(queryset, search, category, condition, rank)
+
+    def get_listing_params(self):
+        """
+        Нормализованные параметры выборки для ключа кэша списка:
+        запросы, дающие одинаковый результат, получают один ключ.
+        """
+
+        return {
+            'search': normalize_search(self.get_search_param()),
+            'category': self.get_category_param().lower(),
+            'condition': self.get_condition_param().lower(),
+            'ordering': self.get_ordering_param(),
+        }
+
+    def get_ad_facets(self, queryset):
+        """
+        Считает фасеты категории и состояния для базового кверисета
+        с учётом текущего поискового запроса.
+        """
+
+        return get_facets(
+            filter_ads(queryset, self.get_search_param()),
+            self.get_listing_params(),
+            self.get_category_param(),
+            self.get_condition_param(),
+        )
+
+    def order_ads_queryset(self, queryset):
+        """
+        Сортирует кверисет по параметру запроса. Сортировку
+        по релевантности уже применил поиск в filter_ads_queryset.
+        """
+
+        ordering = self.get_ordering_param()
+        if ordering == ConstStr.RELEVANCE:
+            return queryset
+        return queryset.order_by(ordering)
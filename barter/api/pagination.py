@@ -0,0 +1,82 @@
+from functools import partial
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from services.listing_cache import CachedPaginator, cached_keyset_page
+from services.pagination import (
+    InvalidCursorError, get_keyset_direction, paginate_keyset
+)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная пагинация по ключу (created_at, id) без COUNT(*) и OFFSET.
+
+    Постраничный режим остаётся доступным для обратной совместимости:
+    он включается параметром page, а также используется для сортировок,
+    не подходящих для курсора (по заголовку или релевантности).
+
+    Если представление сообщает параметры выборки (get_listing_params),
+    id страниц кэшируются до следующего изменения данных.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    page_query_param = 'page'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.fallback = None
+        get_params = getattr(view, 'get_listing_params', None)
+        params = get_params() if get_params else None
+        if (
+            self.page_query_param in request.query_params
+            or get_keyset_direction(queryset) is None
+        ):
+            self.fallback = PageNumberPagination()
+            if params is not None:
+                self.fallback.django_paginator_class = partial(
+                    CachedPaginator, params=params)
+            return self.fallback.paginate_queryset(queryset, request, view)
+        cursor = request.query_params.get(self.cursor_query_param)
+        try:
+            if params is None:
+                self.page = paginate_keyset(queryset, cursor, self.page_size)
+            else:
+                self.page = cached_keyset_page(
+                    queryset, cursor, self.page_size, params)
+        except InvalidCursorError as e:
+            raise NotFound(str(e))
+        return list(self.page)
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        return Response({
+            'next': self.get_link(self.page.next_cursor),
+            'previous': self.get_link(self.page.previous_cursor),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {
+                    'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
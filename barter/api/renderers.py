@@ -0,0 +1,80 @@
+import json
+from itertools import islice
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # Даты и нестандартные типы кодирует JSONEncoder DRF, чтобы вывод
+    # не отличался от стандартного рендерера (например, 'Z' в датах).
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def encode_json(data):
+    """
+    Кодирует данные в компактный JSON (bytes) так же, как JSONRenderer
+    DRF. Использует orjson, если он установлен, иначе — стандартный
+    json. Бросает TypeError для данных, которые orjson не кодирует.
+
+    Отличие от DRF: orjson записывает NaN и бесконечности как null,
+    тогда как JSONRenderer бросает ValueError. API не отдаёт float,
+    поэтому проверка данных на такие значения не выполняется.
+    """
+    if orjson is not None:
+        ret = orjson.dumps(
+            data, default=JSONEncoder().default, option=ORJSON_OPTIONS)
+    else:
+        ret = json.dumps(
+            data, cls=JSONEncoder, ensure_ascii=False,
+            separators=(',', ':'), allow_nan=False
+        ).encode()
+    # Как в DRF: U+2028 и U+2029 допустимы в JSON, но не в JavaScript.
+    return ret.replace(
+        '\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer с быстрым кодированием через orjson.
+
+    Вывод совпадает со стандартным рендерером побайтно (кроме
+    NaN и бесконечностей, см. encode_json). Ответы
+    с отступами (indent в Accept) и данные, которые orjson
+    не кодирует, отдаются стандартному рендереру.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(
+            accepted_media_type, renderer_context or {}
+        ) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return encode_json(data)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class StreamingJSONRenderer(FastJSONRenderer):
+    """
+    Потоковый рендерер JSON-массива для больших выгрузок: элементы
+    итератора кодируются пачками по chunk_size, поэтому в памяти
+    не собирается ни полный список объектов, ни всё тело ответа.
+    """
+
+    chunk_size = 1000
+
+    def render_stream(self, items, chunk_size=None):
+        chunk_size = chunk_size or self.chunk_size
+        items = iter(items)
+        separator = b'['
+        while chunk := list(islice(items, chunk_size)):
+            yield separator + b','.join(encode_json(item) for item in chunk)
+            separator = b','
+        yield b'[]' if separator == b'[' else b']'
@@ -0,0 +1,222 @@
+import hashlib
+import inspect
+import json
+import sys
+import threading
+from importlib.metadata import version
+from pathlib import Path
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.urls import URLPattern, URLResolver, include, path
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from .docs import load_docs, openapi, resolve
+
+API_INFO = openapi.Info(
+    title='API Платформы для бартера',
+    default_version='v1',
+    description=(
+        'Тестовое задание для Effective Mobile 🚀.\n'
+        'API для монолитного веб-приложение на Django \n'
+        'для организации обмена вещами между пользователями.\n'
+        '\n'
+        'Автор: Скуратова Евгения\n'
+        '📌 telegram: @janedoel\n'
+        '📌 email: skuratovajj@gmail.com\n'
+    ),
+    contact=openapi.Contact(email='skuratovajj@gmail.com'),
+    license=openapi.License(name='Тестовое задание'),
+)
+
+SCHEMA_PATTERNS = [
+    path('api/', include('api.urls')),
+]
+FINGERPRINT_KEY = 'x-urlconf-fingerprint'
+SCHEMA_PACKAGES = ('drf-yasg', 'djangorestframework', 'django-filter')
+CONTENT_TYPES = {
+    '.json': 'application/json; charset=utf-8',
+    '.yaml': 'application/yaml; charset=utf-8',
+}
+
+_lock = threading.Lock()
+_documents = {}
+
+
+def iter_routes(patterns, prefix=''):
+    """
+    Маршруты схемы: шаблон URL, имя, модуль и имя представления,
+    действия ViewSet.
+    """
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from iter_routes(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern):
+            view = getattr(pattern.callback, 'cls', pattern.callback)
+            yield (
+                route, pattern.name, view.__module__, view.__qualname__,
+                getattr(pattern.callback, 'actions', None),
+            )
+
+
+def schema_modules(names):
+    """
+    Модули проекта, от которых зависит схема: модули представлений
+    и всё, что они транзитивно импортируют из проекта (сериализаторы,
+    фильтры, модели, константы). Возвращает {имя модуля: путь}.
+    """
+    base = Path(settings.BASE_DIR).resolve()
+    modules = {}
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        module = sys.modules.get(name)
+        source = module and getattr(module, '__file__', None)
+        if name in modules or not source:
+            continue
+        source = Path(source).resolve()
+        if base not in source.parents or 'site-packages' in source.parts:
+            continue
+        modules[name] = source
+        for value in vars(module).values():
+            ref = (
+                value.__name__ if inspect.ismodule(value)
+                else getattr(value, '__module__', None)
+            )
+            if isinstance(ref, str) and ref not in modules:
+                pending.append(ref)
+    return modules
+
+
+def urlconf_fingerprint():
+    """
+    Отпечаток того, из чего строится схема: маршрутов API, версий
+    библиотек схемы и исходного кода модулей представлений вместе
+    с импортируемыми ими модулями проекта (там объявлены
+    swagger_auto_schema, сериализаторы и фильтры). Схема на диске
+    с другим отпечатком считается устаревшей.
+    """
+    routes = list(iter_routes(SCHEMA_PATTERNS))
+    digest = hashlib.sha1(json.dumps(routes, default=str).encode())
+    for package in SCHEMA_PACKAGES:
+        digest.update(f'{package}=={version(package)}'.encode())
+    modules = schema_modules({route[2] for route in routes})
+    for name in sorted(modules):
+        digest.update(name.encode())
+        digest.update(modules[name].read_bytes())
+    return digest.hexdigest()
+
+
+def generate_schema(fingerprint=None):
+    """
+    Строит схему OpenAPI без запроса (без host и schemes: интерфейс
+    документации подставляет текущий адрес) и возвращает её
+    как JSON в байтах с отпечатком маршрутов.
+    """
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    load_docs()
+    swagger = OpenAPISchemaGenerator(
+        info=resolve(API_INFO), patterns=SCHEMA_PATTERNS
+    ).get_schema(request=None, public=True)
+    data = json.loads(OpenAPICodecJson(validators=[]).encode(swagger))
+    data[FINGERPRINT_KEY] = fingerprint or urlconf_fingerprint()
+    return json.dumps(
+        data, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def write_schema(target=None):
+    """Генерирует схему и записывает её в файл. Возвращает путь."""
+    target = Path(target or settings.API_SCHEMA_PATH)
+    target.write_bytes(generate_schema())
+    return target
+
+
+def read_schema(fingerprint):
+    """Схема с диска, если она есть и построена для текущих маршрутов."""
+    try:
+        body = Path(settings.API_SCHEMA_PATH).read_bytes()
+        if json.loads(body).get(FINGERPRINT_KEY) == fingerprint:
+            return body
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def load_schema():
+    """
+    Загружает схему в память процесса один раз: с диска, если она
+    собрана командой generate_schema для текущих маршрутов, иначе
+    генерирует заново и обновляет файл. Маршруты и код представлений
+    не меняются без перезапуска, поэтому дальше схема отдаётся
+    из памяти.
+    """
+    if '.json' in _documents:
+        return _documents
+    from drf_yasg.codecs import yaml_sane_dump
+
+    with _lock:
+        if '.json' not in _documents:
+            fingerprint = urlconf_fingerprint()
+            body = read_schema(fingerprint)
+            if body is None:
+                body = generate_schema(fingerprint)
+                try:
+                    Path(settings.API_SCHEMA_PATH).write_bytes(body)
+                except OSError:
+                    pass
+            yaml_body = yaml_sane_dump(json.loads(body), binary=True)
+            for suffix, content in (('.yaml', yaml_body), ('.json', body)):
+                _documents[suffix] = (
+                    content,
+                    quote_etag(hashlib.sha1(content).hexdigest()),
+                )
+    return _documents
+
+
+def clear_schema_cache():
+    _documents.clear()
+
+
+def schema_response(request, format='.json'):
+    """
+    Отдаёт схему из памяти с ETag по хэшу содержимого: клиент,
+    у которого схема актуальна, получает 304.
+    """
+    if format not in CONTENT_TYPES:
+        raise Http404
+    content, etag = load_schema()[format]
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=CONTENT_TYPES[format])
+    response.headers['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def schema_ui_view(renderer_name):
+    """
+    Страница Swagger UI или ReDoc (имя рендерера drf_yasg).
+    Схема для страницы не строится: интерфейс загружает её
+    запросом с ?format=openapi, на который отвечает schema_response.
+    """
+    def view(request):
+        if request.GET.get('format') == 'openapi':
+            return schema_response(request)
+        from drf_yasg import renderers
+
+        swagger = resolve(openapi.Swagger(
+            info=API_INFO, _prefix='/', paths=openapi.Paths({})))
+        renderer = getattr(renderers, renderer_name)()
+        return HttpResponse(
+            renderer.render(swagger, renderer_context={'request': request}),
+            content_type=f'{renderer.media_type}; charset=utf-8'
+        )
+    return view
+
+
+swagger_ui_view = schema_ui_view('SwaggerUIRenderer')
+redoc_view = schema_ui_view('ReDocRenderer')
@@ -1,7 +1,11 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
 
-from ads.models import Ad, ExchangeProposal
+from ads.models import (
+    Ad, ChangeEvent, EntityChoices, ExchangeProposal, SavedSearch,
+    SavedSearchMatch
+)
+from constants import ConstNum, Errors
 
 
 class EmptySerializer(serializers.Serializer):
@@ -42,17 +46,41 @@ class AdCreateSerializer(serializers.ModelSerializer):
     """
     Сериализатор для модели Ad.
     Используется для создания объявлений.
-    Исключены user и дата создания.
+    Исключены user, дата создания и служебная версия.
     """
     class Meta:
         model = Ad
-        exclude = ['user', 'created_at']
+        exclude = ['user', 'created_at', 'version']
+
+
+class FacetSerializer(serializers.Serializer):
+    """Значение фильтра с числом подходящих объявлений."""
+    value = serializers.CharField()
+    label = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class AdFacetsSerializer(serializers.Serializer):
+    """Фасеты списка объявлений по категории и состоянию."""
+    category = FacetSerializer(many=True)
+    condition = FacetSerializer(many=True)
+
+
+class AdImportReportSerializer(serializers.Serializer):
+    """Итог массового создания объявлений."""
+    created = serializers.IntegerField()
+    processed = serializers.IntegerField()
+    error_count = serializers.IntegerField()
+    errors = serializers.ListField(child=serializers.DictField())
+    rows_per_second = serializers.FloatField()
 
 
 class ExchangeProposalSerializer(serializers.ModelSerializer):
     """
     Сериализатор для модели ExchangeProposal.
     Представляет предложения на обмен между пользователями.
+    Статус меняется только действиями accept и reject, которые
+    поддерживают счётчики и отклоняют конкурирующие предложения.
     """
 
     class Meta:
@@ -61,6 +89,117 @@ class ExchangeProposalSerializer(serializers.ModelSerializer):
             'id', 'ad_sender', 'ad_receiver',
             'status', 'created_at'
         ]
+        read_only_fields = ['status']
+
+
+class ProposalActionItemSerializer(serializers.Serializer):
+    """Одно действие пакетной обработки предложений."""
+    id = serializers.IntegerField()
+    action = serializers.ChoiceField(choices=['accept', 'reject'])
+
+
+class BulkProposalActionSerializer(serializers.Serializer):
+    """Пакет действий над предложениями обмена."""
+    items = ProposalActionItemSerializer(
+        many=True, allow_empty=False,
+        max_length=ConstNum.BULK_PROPOSALS_LIMIT
+    )
+
+
+class ProposalActionResultSerializer(serializers.Serializer):
+    """Результат действия над одним предложением из пакета."""
+    id = serializers.IntegerField()
+    error = serializers.BooleanField()
+    message = serializers.CharField()
+
+
+class BulkProposalResultSerializer(serializers.Serializer):
+    """Результаты пакетной обработки в порядке запроса."""
+    results = ProposalActionResultSerializer(many=True)
+
+
+class ChangeEventSerializer(serializers.ModelSerializer):
+    """Событие журнала изменений."""
+
+    class Meta:
+        model = ChangeEvent
+        fields = ['entity', 'object_id', 'event', 'payload', 'created_at']
+
+
+class ChangeFeedQuerySerializer(serializers.Serializer):
+    """Параметры запроса журнала изменений."""
+    since = serializers.CharField(required=False)
+    limit = serializers.IntegerField(
+        required=False, min_value=1, max_value=ConstNum.CHANGES_MAX)
+    entity = serializers.ChoiceField(
+        choices=EntityChoices.choices, required=False)
+
+
+class ChangeFeedSerializer(serializers.Serializer):
+    """Пачка событий и курсор для следующего запроса."""
+    results = ChangeEventSerializer(many=True)
+    next = serializers.CharField()
+    has_more = serializers.BooleanField()
+
+
+class CycleQuerySerializer(serializers.Serializer):
+    """Параметры поиска обменов по кругу."""
+    max_length = serializers.IntegerField(
+        required=False,
+        min_value=ConstNum.CYCLES_MIN_LENGTH,
+        max_value=ConstNum.CYCLES_MAX_LENGTH
+    )
+    limit = serializers.IntegerField(
+        required=False, min_value=1, max_value=ConstNum.CYCLES_LIMIT)
+
+
+class CycleStepSerializer(serializers.Serializer):
+    """Шаг обмена по кругу: предложение и его участники."""
+    proposal = serializers.IntegerField()
+    ad_sender = serializers.IntegerField()
+    ad_receiver = serializers.IntegerField()
+    sender_user = serializers.IntegerField()
+    receiver_user = serializers.IntegerField()
+
+
+class SuggestedCyclesSerializer(serializers.Serializer):
+    """Найденные обмены по кругу, каждый — список шагов."""
+    results = serializers.ListField(child=CycleStepSerializer(many=True))
+
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    """Сохранённый поиск: те же параметры, что у списка объявлений."""
+
+    class Meta:
+        model = SavedSearch
+        fields = [
+            'id', 'search', 'category', 'condition', 'is_active',
+            'created_at'
+        ]
+        read_only_fields = ['created_at']
+        extra_kwargs = {'is_active': {'default': True}}
+
+    def validate(self, attrs):
+        fields = ('search', 'category', 'condition')
+        values = {field: getattr(self.instance, field, '') for field in fields}
+        values.update(attrs)
+        if not any(values[field] for field in fields):
+            raise serializers.ValidationError(Errors.EMPTY_SAVED_SEARCH)
+        return attrs
+
+
+class SavedSearchMatchSerializer(serializers.ModelSerializer):
+    """Объявление из ленты совпадений сохранённых поисков."""
+    ad = AdCreateSerializer(read_only=True)
+
+    class Meta:
+        model = SavedSearchMatch
+        fields = ['id', 'saved_search', 'ad', 'is_read', 'created_at']
+
+
+class MatchesReadSerializer(serializers.Serializer):
+    """Число совпадений, отмеченных просмотренными."""
+    updated = serializers.IntegerField()
 
 
 class UserSerializer(serializers.ModelSerializer):
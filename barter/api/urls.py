@@ -3,7 +3,9 @@ from rest_framework.routers import DefaultRouter
 
 from .views import (
     AdViewSet,
+    ChangeFeedViewSet,
     ExchangeProposalViewSet,
+    SavedSearchViewSet,
     UserViewSet,
     CustomTokenRefreshView,
     CustomTokenObtainPairView
@@ -13,6 +15,9 @@ router = DefaultRouter()
 router.register(r'ads', AdViewSet, basename='ad')
 router.register(r'proposals', ExchangeProposalViewSet, basename='proposal')
 router.register(r'users', UserViewSet, basename='user')
+router.register(r'changes', ChangeFeedViewSet, basename='change')
+router.register(
+    r'saved-searches', SavedSearchViewSet, basename='saved-search')
 
 urlpatterns = router.urls + [
     path(
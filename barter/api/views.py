@@ -1,33 +1,60 @@
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, status, serializers, viewsets
+from rest_framework import status, serializers, viewsets
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import (
     IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly
 )
 from rest_framework.response import Response
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
 from rest_framework_simplejwt.views import (
     TokenObtainPairView, TokenRefreshView
 )
 from rest_framework.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
 
-from ads.models import Ad, ExchangeProposal
+from ads.filters import AdFilter
+from ads.models import Ad, ExchangeProposal, SavedSearch, SavedSearchMatch
 from .serializers import (
     AdSerializer, ExchangeProposalSerializer, UserSerializer,
-    AdCreateSerializer, EmptySerializer
+    AdCreateSerializer, EmptySerializer, AdFacetsSerializer,
+    AdImportReportSerializer, BulkProposalActionSerializer,
+    BulkProposalResultSerializer, ChangeFeedSerializer,
+    ChangeFeedQuerySerializer, CycleQuerySerializer,
+    SuggestedCyclesSerializer, SavedSearchSerializer,
+    SavedSearchMatchSerializer, MatchesReadSerializer
 )
-from .mixins import AdsFilterMixin, IsOwnerPermission
-from constants import ConstStr, Errors, Message
+from .docs import openapi, swagger_auto_schema
+from .mixins import (
+    AdsFilterMixin, ConditionalGetMixin, IsOwnerPermission, QueryPlanMixin,
+    RowSerializerMixin
+)
+from constants import ConstNum, ConstStr, Errors, Message
+from services.ad_export import CONTENT_TYPES, ExportFormatError, stream_export
+from services.ad_import import import_ads, read_jsonl, read_csv
+from services.change_feed import get_changes
+from services.counters import adjust_pending_counters, pending_changes
+from services.exchange_cycles import GraphLoadingError, suggest_cycles
+from services.saved_searches import index_saved_search
+from services.listing_cache import ADS_NAMESPACE, PROPOSALS_NAMESPACE
+from services.pagination import InvalidCursorError
 from services.proposal_service import (
     process_proposal_action, create_exchange_proposal,
-    ProposalCreationError
+    bulk_process_proposals, ProposalCreationError
 )
+from services.query_plans import QueryPlan
+from services.row_serializers import RowSerializer
 from services.registration import register_user, RegistrationError
 
 
-class AdViewSet(AdsFilterMixin, viewsets.ModelViewSet):
+@method_decorator(transaction.atomic, name='perform_update')
+@method_decorator(transaction.atomic, name='perform_destroy')
+class AdViewSet(
+    AdsFilterMixin, QueryPlanMixin, ConditionalGetMixin, RowSerializerMixin,
+    viewsets.ModelViewSet
+):
     """
     API эндпоинты для работы с объявлениями.
 
@@ -37,14 +64,38 @@ class AdViewSet(AdsFilterMixin, viewsets.ModelViewSet):
 
     queryset = Ad.objects.all()
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerPermission]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    search_fields = [ConstStr.TITLE, ConstStr.DESCRIPTION]
-    filterset_fields = [ConstStr.CATEGORY, ConstStr.CONDITION]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = AdFilter
+    etag_namespace = ADS_NAMESPACE
+    etag_object_fields = ['user_id']
+
+    ordering_query_param = 'ordering'
+    import_streaming_formats = {
+        'application/x-ndjson': read_jsonl,
+        'application/jsonl': read_jsonl,
+        'text/csv': read_csv,
+    }
+    query_plans = {
+        'list': QueryPlan.for_serializer(
+            AdCreateSerializer, extra=[ConstStr.CREATED_AT]),
+        'retrieve': QueryPlan.for_serializer(
+            AdCreateSerializer, extra=['user']),
+        'suggestions': QueryPlan.for_serializer(
+            AdCreateSerializer, extra=[ConstStr.CREATED_AT]),
+    }
+    row_serializers = {
+        'list': RowSerializer(
+            AdCreateSerializer, extra=[ConstStr.CREATED_AT]),
+        'retrieve': RowSerializer(AdCreateSerializer, extra=['user_id']),
+    }
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        return self.filter_ads_queryset(queryset).order_by('-created_at')
+        if getattr(self, 'swagger_fake_view', False):
+            return Ad.objects.none()
+        queryset = self.apply_query_plan(super().get_queryset())
+        return self.order_ads_queryset(self.filter_ads_queryset(queryset))
 
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
@@ -77,24 +128,183 @@ class AdViewSet(AdsFilterMixin, viewsets.ModelViewSet):
                 name='ordering',
                 in_=openapi.IN_QUERY,
                 description=(
-                    'Сортировка: title, -title, created_at, -created_at'
+                    'Сортировка: title, -title, created_at, -created_at, '
+                    'relevance (по релевантности поисковому запросу)'
                 ),
                 type=openapi.TYPE_STRING
             ),
+            openapi.Parameter(
+                name='fields',
+                in_=openapi.IN_QUERY,
+                description='Поля ответа через запятую, например id,title',
+                type=openapi.TYPE_STRING
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                name='search',
+                in_=openapi.IN_QUERY,
+                description='Поиск по заголовку и описанию',
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                name='category',
+                in_=openapi.IN_QUERY,
+                description='Выбранная категория: учитывается в счётчиках '
+                            'состояний',
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                name='condition',
+                in_=openapi.IN_QUERY,
+                description='Выбранное состояние: учитывается в счётчиках '
+                            'категорий',
+                type=openapi.TYPE_STRING
+            ),
+        ],
+        responses={200: AdFacetsSerializer}
+    )
+    @action(detail=False, methods=['get'], filter_backends=[])
+    def facets(self, request):
+        """
+        Число объявлений по категориям и состояниям.
+
+        Счётчики считаются одним запросом с учётом поискового запроса,
+        чтобы интерфейс мог показать «Книги (12)» рядом с фильтром.
+        """
+        facets = self.get_ad_facets(Ad.objects.all())
+        return Response(AdFacetsSerializer(facets).data)
+
+    @swagger_auto_schema(responses={200: AdCreateSerializer(many=True)})
+    @action(
+        detail=False,
+        methods=['get'],
+        filter_backends=[],
+        permission_classes=[IsAuthenticated]
+    )
+    def suggestions(self, request):
+        """
+        Рекомендованные объявления для обмена.
 
-class ExchangeProposalViewSet(viewsets.ModelViewSet):
+        Список рассчитывается заранее командой refresh_suggestions
+        по истории предложений пользователя, состоянию и свежести
+        объявлений; запрос только читает страницу готового списка.
+        """
+        ads = self.apply_query_plan(Ad.objects.filter(
+            trade_suggestions__user=request.user, is_exchanged=False
+        )).order_by('-trade_suggestions__score', '-id')
+        paginator = PageNumberPagination()
+        page = paginator.paginate_queryset(ads, request, view=self)
+        return paginator.get_paginated_response(
+            self.get_serializer(page, many=True).data)
+
+    @swagger_auto_schema(
+        operation_description=(
+            'Тело запроса — JSON-массив объявлений, JSON Lines '
+            '(Content-Type: application/x-ndjson) или CSV с заголовком '
+            '(Content-Type: text/csv). Ответ содержит число созданных '
+            'объявлений, ошибки по строкам и скорость обработки.'
+        ),
+        request_body=AdCreateSerializer(many=True),
+        responses={201: AdImportReportSerializer}
+    )
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Массовое создание объявлений текущего пользователя.
+
+        JSON Lines и CSV читаются из тела запроса построчно,
+        без загрузки целиком в память.
+        """
+        content_type = request.content_type.split(';')[0].strip()
+        if content_type in self.import_streaming_formats:
+            reader = self.import_streaming_formats[content_type]
+            stream = request.stream
+            rows = reader(iter(stream.readline, b'') if stream else [])
+        else:
+            if not isinstance(request.data, list):
+                raise ValidationError(Errors.IMPORT_EXPECTED_LIST)
+            rows = enumerate(request.data, start=1)
+        report = import_ads(rows, request.user)
+        return Response(
+            AdImportReportSerializer(report.as_dict()).data,
+            status=(
+                status.HTTP_201_CREATED if report.created
+                else status.HTTP_400_BAD_REQUEST
+            )
+        )
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                name='output',
+                in_=openapi.IN_QUERY,
+                description=(
+                    'Формат выгрузки: ndjson (по умолчанию), json или csv'
+                ),
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                name='search',
+                in_=openapi.IN_QUERY,
+                description='Поиск по заголовку и описанию',
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                name='category',
+                in_=openapi.IN_QUERY,
+                description='Фильтр по категории',
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                name='condition',
+                in_=openapi.IN_QUERY,
+                description='Фильтр по состоянию',
+                type=openapi.TYPE_STRING
+            ),
+        ]
+    )
+    @action(detail=False, methods=['get'], filter_backends=[])
+    def export(self, request):
+        """
+        Потоковая выгрузка всех объявлений, подходящих под фильтры.
+
+        Объявления читаются из базы серверным курсором и отдаются
+        частями без пагинации, поэтому каталог любого размера
+        выгружается одним запросом.
+        """
+        output = request.query_params.get('output', 'ndjson')
+        try:
+            chunks = stream_export(self.get_queryset(), output)
+        except ExportFormatError as e:
+            raise ValidationError(str(e))
+        response = StreamingHttpResponse(
+            chunks, content_type=CONTENT_TYPES[output])
+        response['Content-Disposition'] = (
+            f'attachment; filename="ads.{output}"')
+        return response
+
+
+@method_decorator(transaction.atomic, name='perform_update')
+@method_decorator(transaction.atomic, name='perform_destroy')
+class ExchangeProposalViewSet(
+    QueryPlanMixin, ConditionalGetMixin, RowSerializerMixin,
+    viewsets.ModelViewSet
+):
     """
     API эндпоинты для предложений обмена.
 
     Реализует GET списка предложений, POST,
     GET одного предложения,
     PUT, PATCH и DELETE методы. Также два POST-метода
-    для принятия или отклонения предложения обмена.
+    для принятия или отклонения предложения обмена,
+    POST-метод пакетной обработки нескольких предложений
+    и GET-метод поиска обменов по кругу.
     """
 
     serializer_class = ExchangeProposalSerializer
@@ -105,12 +315,40 @@ class ExchangeProposalViewSet(viewsets.ModelViewSet):
         'ad_sender__user__username',
         'ad_receiver__user__username'
     ]
+    etag_namespace = PROPOSALS_NAMESPACE
+    etag_per_user = True
+
+    query_plans = {
+        'list': QueryPlan.for_serializer(ExchangeProposalSerializer),
+        'retrieve': QueryPlan.for_serializer(ExchangeProposalSerializer),
+        'accept': QueryPlan(select_related=['ad_sender', 'ad_receiver']),
+        'reject': QueryPlan(select_related=['ad_sender', 'ad_receiver']),
+    }
+    proposal_expansions = {
+        'ad_sender': AdCreateSerializer,
+        'ad_receiver': AdCreateSerializer,
+    }
+    row_serializers = {
+        'list': RowSerializer(
+            ExchangeProposalSerializer, extra=[ConstStr.CREATED_AT],
+            expand=proposal_expansions
+        ),
+        'retrieve': RowSerializer(
+            ExchangeProposalSerializer, expand=proposal_expansions),
+    }
+
+    def get_etag_namespaces(self):
+        if self.request.query_params.get(self.expand_query_param):
+            return [PROPOSALS_NAMESPACE, ADS_NAMESPACE]
+        return [PROPOSALS_NAMESPACE]
 
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return ExchangeProposal.objects.none()
         user = self.request.user
-        return ExchangeProposal.objects.filter(
+        return self.apply_query_plan(ExchangeProposal.objects.filter(
             Q(ad_sender__user=user) | Q(ad_receiver__user=user)
-        )
+        ))
 
     def perform_create(self, serializer):
         ad_sender = serializer.validated_data.get('ad_sender')
@@ -126,6 +364,26 @@ class ExchangeProposalViewSet(viewsets.ModelViewSet):
         except ProposalCreationError as e:
             raise serializers.ValidationError(str(e))
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """
+        Если у ожидающего предложения меняются объявления,
+        оно переносится в счётчиках новых участников.
+        """
+        proposal = serializer.instance
+        before = (proposal.ad_sender.user_id, proposal.ad_receiver.user_id)
+        proposal = serializer.save()
+        after = (proposal.ad_sender.user_id, proposal.ad_receiver.user_id)
+        if proposal.status != ConstStr.PENDING or before == after:
+            return
+        changes = pending_changes([before], -1)
+        for user_id, (sent, received) in pending_changes(
+            [after], 1
+        ).items():
+            changes[user_id][0] += sent
+            changes[user_id][1] += received
+        adjust_pending_counters(changes)
+
     @swagger_auto_schema(
         manual_parameters=[
             openapi.Parameter(
@@ -149,6 +407,20 @@ class ExchangeProposalViewSet(viewsets.ModelViewSet):
                 description='Фильтрация: имя пользователя получателя',
                 type=openapi.TYPE_STRING
             ),
+            openapi.Parameter(
+                name='fields',
+                in_=openapi.IN_QUERY,
+                description='Поля ответа через запятую',
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                name='expand',
+                in_=openapi.IN_QUERY,
+                description=(
+                    'Раскрыть объявления вместо id: ad_sender, ad_receiver'
+                ),
+                type=openapi.TYPE_STRING
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
@@ -188,6 +460,80 @@ class ExchangeProposalViewSet(viewsets.ModelViewSet):
         """
         return self._handle_proposal_action(request, pk, 'reject')
 
+    @swagger_auto_schema(
+        request_body=BulkProposalActionSerializer,
+        responses={200: BulkProposalResultSerializer}
+    )
+    @action(
+        detail=False,
+        methods=['post'],
+        serializer_class=BulkProposalActionSerializer
+    )
+    def bulk(self, request):
+        """
+        Принять или отклонить несколько предложений одним запросом.
+
+        Тело запроса: {"items": [{"id": 1, "action": "accept"}, ...]}.
+        Все изменения выполняются в одной транзакции, ответ содержит
+        результат для каждого предложения в порядке запроса.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = bulk_process_proposals(
+            [
+                (item['id'], item['action'])
+                for item in serializer.validated_data['items']
+            ],
+            request.user
+        )
+        return Response(
+            BulkProposalResultSerializer({'results': results}).data)
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                name='max_length',
+                in_=openapi.IN_QUERY,
+                description='Наибольшее число участников обмена',
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                name='limit',
+                in_=openapi.IN_QUERY,
+                description='Наибольшее число найденных обменов',
+                type=openapi.TYPE_INTEGER
+            ),
+        ],
+        responses={
+            200: SuggestedCyclesSerializer,
+            503: 'Граф обменов загружается',
+        }
+    )
+    @action(detail=False, methods=['get'], filter_backends=[])
+    def cycles(self, request):
+        """
+        Обмены по кругу с участием текущего пользователя.
+
+        Строятся из ожидающих предложений: каждый участник отдаёт
+        своё объявление и получает то, на которое предлагал обмен.
+        Пока граф загружается после запуска воркера, отвечает 503.
+        """
+        params = CycleQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        try:
+            cycles = suggest_cycles(
+                request.user,
+                params.validated_data.get('max_length'),
+                params.validated_data.get('limit'),
+            )
+        except GraphLoadingError as error:
+            return Response(
+                {'detail': str(error)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(ConstNum.CYCLES_RETRY_AFTER)}
+            )
+        return Response(SuggestedCyclesSerializer({'results': cycles}).data)
+
     def _handle_proposal_action(self, request, pk, action):
         proposal = self.get_object()
         result = process_proposal_action(proposal, action, request.user)
@@ -196,6 +542,139 @@ class ExchangeProposalViewSet(viewsets.ModelViewSet):
         return Response({'status': result['message']})
 
 
+class ChangeFeedViewSet(viewsets.ViewSet):
+    """
+    API эндпоинт журнала изменений для инкрементальной синхронизации.
+
+    Возвращает события после непрозрачного курсора since пачками;
+    курсор из ответа передаётся в следующий запрос.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                name='since',
+                in_=openapi.IN_QUERY,
+                description='Курсор из предыдущего ответа (next); '
+                            'без него журнал читается с начала',
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                name='limit',
+                in_=openapi.IN_QUERY,
+                description='Размер пачки событий',
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                name='entity',
+                in_=openapi.IN_QUERY,
+                description='Тип объектов: ad или proposal',
+                type=openapi.TYPE_STRING
+            ),
+        ],
+        responses={200: ChangeFeedSerializer}
+    )
+    def list(self, request):
+        """
+        События создания, изменения, удаления объявлений
+        и смены статуса предложений, в которых участвует пользователь.
+        """
+        params = ChangeFeedQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        try:
+            events, cursor, has_more = get_changes(
+                request.user,
+                params.validated_data.get('since'),
+                params.validated_data.get('limit'),
+                params.validated_data.get('entity'),
+            )
+        except InvalidCursorError as e:
+            raise ValidationError(str(e))
+        return Response(ChangeFeedSerializer({
+            'results': events, 'next': cursor, 'has_more': has_more,
+        }).data)
+
+
+@method_decorator(transaction.atomic, name='perform_create')
+@method_decorator(transaction.atomic, name='perform_update')
+class SavedSearchViewSet(QueryPlanMixin, viewsets.ModelViewSet):
+    """
+    API эндпоинты сохранённых поисков.
+
+    Реализует GET списка, POST, GET одного поиска, PUT, PATCH
+    и DELETE методы. Новые объявления сверяются с поисками при
+    создании, совпадения доступны GET-методом matches.
+    """
+
+    serializer_class = SavedSearchSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = []
+
+    query_plans = {
+        'matches': QueryPlan.for_serializer(
+            SavedSearchMatchSerializer),
+    }
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return SavedSearch.objects.none()
+        return SavedSearch.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        index_saved_search(serializer.save(user=self.request.user))
+
+    def perform_update(self, serializer):
+        index_saved_search(serializer.save())
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                name='unread',
+                in_=openapi.IN_QUERY,
+                description='Только непросмотренные совпадения',
+                type=openapi.TYPE_BOOLEAN
+            ),
+        ],
+        responses={200: SavedSearchMatchSerializer(many=True)}
+    )
+    @action(
+        detail=False,
+        methods=['get'],
+        serializer_class=SavedSearchMatchSerializer
+    )
+    def matches(self, request):
+        """
+        Лента новых объявлений, подошедших под сохранённые поиски.
+
+        Совпадения находятся в момент создания объявления,
+        запрос только читает готовую ленту.
+        """
+        matches = SavedSearchMatch.objects.filter(user=request.user)
+        if request.query_params.get('unread') in ('1', 'true'):
+            matches = matches.filter(is_read=False)
+        page = self.paginate_queryset(self.apply_query_plan(matches))
+        return self.get_paginated_response(
+            self.get_serializer(page, many=True).data)
+
+    @swagger_auto_schema(
+        request_body=EmptySerializer,
+        responses={200: MatchesReadSerializer}
+    )
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='matches/read',
+        serializer_class=EmptySerializer
+    )
+    def read_matches(self, request):
+        """Отметить все совпадения ленты просмотренными."""
+        updated = SavedSearchMatch.objects.filter(
+            user=request.user, is_read=False).update(is_read=True)
+        return Response(MatchesReadSerializer({'updated': updated}).data)
+
+
 class UserViewSet(viewsets.ViewSet):
     """
     API эндпоинты для пользователей.
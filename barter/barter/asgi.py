@@ -9,8 +9,16 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'barter.settings')
 
 application = get_asgi_application()
+
+# Граф обменов по кругу загружается в фоне при запуске воркера,
+# а не в первом запросе к /api/proposals/cycles/.
+if settings.EXCHANGE_GRAPH_WARM:
+    from services.exchange_cycles import exchange_graph
+
+    exchange_graph.warm()
@@ -1,4 +1,5 @@
 import os
+from importlib.util import find_spec
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -7,6 +8,11 @@ from constants import ConstNum
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# drf_yasg не подключается приложением, чтобы не импортироваться
+# при запуске воркера; шаблоны и статика документации берутся
+# из каталога пакета.
+DRF_YASG_DIR = Path(find_spec('drf_yasg').origin).parent
+
 load_dotenv()
 
 SECRET_KEY = os.getenv('SECRET_KEY', 'key')
@@ -23,7 +29,6 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
-    'drf_yasg',
     'ads.apps.AdsConfig',
     'api.apps.ApiConfig',
 ]
@@ -36,6 +41,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'services.instrumentation.QueryInstrumentationMiddleware',
 ]
 
 ROOT_URLCONF = 'barter.urls'
@@ -43,7 +49,10 @@ ROOT_URLCONF = 'barter.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [os.path.join(BASE_DIR, 'templates')],
+        'DIRS': [
+            os.path.join(BASE_DIR, 'templates'),
+            os.path.join(DRF_YASG_DIR, 'templates'),
+        ],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -63,6 +72,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -91,17 +104,18 @@ USE_I18N = True
 USE_TZ = True
 
 STATIC_URL = '/static/'
+STATICFILES_DIRS = [os.path.join(DRF_YASG_DIR, 'static')]
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination', # noqa
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
     'PAGE_SIZE': ConstNum.PAGINATION_COUNT,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.FastJSONRenderer',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -124,4 +138,79 @@ SWAGGER_SETTINGS = {
 }
 
 SWAGGER_USE_COMPAT_RENDERERS = False
+
+# Схема OpenAPI, собранная командой generate_schema.
+API_SCHEMA_PATH = os.path.join(BASE_DIR, 'openapi.json')
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'barter'),
+    }
+}
+
+# Журнал изменений читается по возрастающему id (курсор since,
+# граф обменов, рекомендации). id выдаётся при вставке, а событие
+# становится видно после коммита: транзакция с меньшим id может
+# закоммититься позже прочитанной с большим, и курсор её пропустит.
+# Поэтому читателям отдаются только события старше окна, которое
+# больше времени жизни транзакции. SQLite с IMMEDIATE выполняет
+# пишущие транзакции по одной, и окно не нужно.
+CHANGE_FEED_SETTLE_SECONDS = float(os.getenv(
+    'CHANGE_FEED_SETTLE_SECONDS',
+    0 if DATABASES['default']['ENGINE'].endswith('sqlite3') else 5
+))
+
+# Загружать граф обменов в фоне при запуске воркера (wsgi/asgi).
+EXCHANGE_GRAPH_WARM = os.getenv('EXCHANGE_GRAPH_WARM', 'True') == 'True'
+
+LISTING_CACHE_TIMEOUT = 60
+# Поколения выборок (ключи кэша списков и ETag) хранятся в кэше.
+# В локальном кэше у каждого процесса своё поколение, и изменение,
+# сделанное в другом процессе, он не увидит, пока поколение
+# не истечёт: срок жизни ограничивает устаревание ответов 304
+# временем жизни закэшированных выборок. В общем кэше поколение
+# не истекает.
+LISTING_GENERATION_TIMEOUT = (
+    LISTING_CACHE_TIMEOUT
+    if CACHES['default']['BACKEND'].endswith(('LocMemCache', 'DummyCache'))
+    else None
+)
+LISTING_CACHE_LOCK_TIMEOUT = 5
+LISTING_CACHE_WAIT = 2.0
+AD_CARD_CACHE_TIMEOUT = 24 * 60 * 60
+
+QUERY_BUDGETS = {
+    'GET ad_list': 7,
+    'GET my_proposals': 8,
+    'GET ad-list': 3,
+    'GET ad-detail': 3,
+    'GET ad-facets': 2,
+    'GET ad-export': 1,
+    'GET ad-suggestions': 3,
+    'GET change-list': 3,
+    'GET proposal-list': 3,
+    'GET proposal-detail': 3,
+    'GET proposal-cycles': 3,
+    'GET saved-search-list': 3,
+    'GET saved-search-matches': 3,
+}
+QUERY_BUDGET_RAISE = os.getenv('QUERY_BUDGET_RAISE', 'False') == 'True'
+QUERY_SLOW_STATEMENTS = 3
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'barter.queries': {
+            'handlers': ['console'],
+            'level': os.getenv('QUERY_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
 FORMS_URLFIELD_ASSUME_HTTPS = True
@@ -19,12 +19,51 @@ class Errors:
     USERNAME_TAKEN = 'Юзернейм уже занят!'
     UNKNOWN_RESULT = 'Неизвестный результат.'
     SAME_PROPOSAL = 'Объявления отправителя и получателя не могут совпадать.'
+    INVALID_CURSOR = 'Некорректный курсор пагинации.'
+    PROPOSAL_NOT_FOUND = 'Предложение не найдено.'
+    DUPLICATE_PROPOSAL = 'Предложение указано в запросе несколько раз.'
+    IMPORT_EXPECTED_LIST = 'Ожидается список объявлений.'
+    EMPTY_SAVED_SEARCH = (
+        'Укажите поисковый запрос, категорию или состояние.')
+    UNKNOWN_EXPORT_FORMAT = (
+        'Неизвестный формат выгрузки {fmt!r}. Доступны: {formats}.')
+    UNKNOWN_IMPORT_FORMAT = (
+        'Неизвестный формат {fmt!r}. Доступны: {formats}.')
+    UNKNOWN_FIELDS = 'Неизвестные поля: {fields}. Доступны: {allowed}.'
+    CYCLES_LOADING = 'Граф обменов загружается, повторите запрос позже.'
+    QUERY_BUDGET_EXCEEDED = (
+        'Представление {view} выполнило {count} SQL-запросов '
+        'при бюджете {budget}.')
 
 
 class ConstNum:
     COMMENTS_ROWS = 3
     DESC_ROWS = 4
     PAGINATION_COUNT = 10
+    SEARCH_MAX_TERMS = 16
+    SEARCH_TITLE_WEIGHT = 10.0
+    SEARCH_DESCRIPTION_WEIGHT = 1.0
+    BULK_PROPOSALS_LIMIT = 500
+    IMPORT_BATCH_SIZE = 1000
+    IMPORT_MAX_ERRORS = 100
+    EXPORT_CHUNK_SIZE = 2000
+    CHANGES_PAGE_SIZE = 100
+    CHANGES_MAX = 1000
+    CYCLES_MIN_LENGTH = 3
+    CYCLES_DEFAULT_LENGTH = 4
+    CYCLES_MAX_LENGTH = 5
+    CYCLES_LIMIT = 20
+    CYCLES_SEARCH_BUDGET = 50_000
+    CYCLES_SYNC_MAX = 5000
+    CYCLES_RETRY_AFTER = 5
+    SUGGESTIONS_PER_USER = 50
+    SUGGESTIONS_BATCH_SIZE = 500
+    SUGGESTIONS_ACTIVE_DAYS = 30
+    SUGGESTIONS_HALF_LIFE_DAYS = 14
+    SUGGESTIONS_CATEGORY_PRIOR = 0.1
+    SUGGESTIONS_CONDITION_PRIOR = 0.5
+    SAVED_SEARCH_TERM_LENGTH = 64
+    SAVED_SEARCH_BATCH_SIZE = 500
 
 
 class ConstStr:
@@ -42,3 +81,5 @@ class ConstStr:
     IMAGE_URL = 'image_url'
     AD_SENDER = 'ad_sender'
     COMMENT = 'comment'
+    CREATED_AT = 'created_at'
+    RELEVANCE = 'relevance'
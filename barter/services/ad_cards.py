@@ -0,0 +1,17 @@
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+AD_CARD_FRAGMENT = 'ad_card'
+
+
+def ad_card_key(pk, version):
+    """Ключ кэшированного фрагмента карточки объявления."""
+    return make_template_fragment_key(AD_CARD_FRAGMENT, [pk, version])
+
+
+def forget_ad_card(pk, version):
+    """
+    Удаляет фрагмент карточки указанной версии. Устаревшая версия
+    и так больше не запрашивается: удаление лишь освобождает кэш.
+    """
+    cache.delete(ad_card_key(pk, version))
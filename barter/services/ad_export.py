@@ -0,0 +1,81 @@
+import csv
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from api.renderers import StreamingJSONRenderer
+from constants import ConstNum, Errors
+
+EXPORT_FIELDS = (
+    'id', 'title', 'description', 'category', 'condition', 'image_url',
+    'is_exchanged', 'created_at', 'user__username',
+)
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class ExportFormatError(Exception):
+    """Кастомное исключение неизвестного формата выгрузки."""
+    pass
+
+
+class Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=None):
+    """
+    Итерирует словари объявлений серверным курсором: в памяти
+    одновременно находится не больше chunk_size строк.
+    """
+    return queryset.values(*EXPORT_FIELDS).iterator(
+        chunk_size=chunk_size or ConstNum.EXPORT_CHUNK_SIZE)
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def iter_ndjson(rows, chunk_size):
+    """Строки JSON по объекту на строку, склеенные по chunk_size."""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for chunk in chunked(rows, chunk_size):
+        yield ''.join(encoder.encode(row) + '\n' for row in chunk)
+
+
+def iter_json(rows, chunk_size):
+    """JSON-массив объектов, отдаваемый частями по chunk_size."""
+    for chunk in StreamingJSONRenderer().render_stream(rows, chunk_size):
+        yield chunk.decode('utf-8')
+
+
+def iter_csv(rows, chunk_size):
+    """CSV с заголовком; блоки по chunk_size строк."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for chunk in chunked(rows, chunk_size):
+        yield ''.join(
+            writer.writerow([row[field] for field in EXPORT_FIELDS])
+            for row in chunk
+        )
+
+
+def stream_export(queryset, output, chunk_size=None):
+    """
+    Возвращает генератор текстовых блоков выгрузки в формате output
+    (ndjson, json или csv). Память не зависит от размера каталога.
+    """
+    chunk_size = chunk_size or ConstNum.EXPORT_CHUNK_SIZE
+    writers = {'ndjson': iter_ndjson, 'json': iter_json, 'csv': iter_csv}
+    if output not in writers:
+        raise ExportFormatError(Errors.UNKNOWN_EXPORT_FORMAT.format(
+            fmt=output, formats=', '.join(writers)))
+    return writers[output](export_rows(queryset, chunk_size), chunk_size)
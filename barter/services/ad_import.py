@@ -0,0 +1,143 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from rest_framework import serializers
+
+from django.db import transaction
+
+from ads.models import Ad, EntityChoices, EventChoices
+from api.serializers import AdCreateSerializer
+from constants import ConstNum, Errors
+from .change_feed import ad_payload, record_changes
+from .listing_cache import bump_generation
+from .saved_searches import percolate
+
+FORMATS = ('jsonl', 'csv')
+
+
+class ImportFormatError(Exception):
+    """Кастомное исключение неизвестного формата импорта."""
+    pass
+
+
+class ImportReport:
+    """
+    Итог импорта: число созданных объявлений, ошибки по строкам
+    (хранятся первые IMPORT_MAX_ERRORS) и скорость обработки.
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.processed = 0
+        self.error_count = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, row, errors):
+        self.error_count += 1
+        if len(self.errors) < ConstNum.IMPORT_MAX_ERRORS:
+            self.errors.append({'row': row, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'processed': self.processed,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def detect_format(name):
+    """Определяет формат файла по расширению: .csv или JSON Lines."""
+    return 'csv' if str(name).lower().endswith('.csv') else 'jsonl'
+
+
+def read_jsonl(lines):
+    """
+    Построчно читает JSON Lines. Возвращает пары
+    (номер строки, объект или исключение разбора).
+    """
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as error:
+            yield number, error
+
+
+def read_csv(lines):
+    """
+    Построчно читает CSV с заголовком; номера строк — как в файле.
+    Пустая ячейка означает отсутствующее значение.
+    """
+    lines = (
+        line.decode('utf-8') if isinstance(line, bytes) else line
+        for line in lines
+    )
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, {
+            key: value for key, value in row.items() if value != ''
+        }
+
+
+def read_rows(lines, fmt):
+    if fmt == 'jsonl':
+        return read_jsonl(lines)
+    if fmt == 'csv':
+        return read_csv(lines)
+    raise ImportFormatError(Errors.UNKNOWN_IMPORT_FORMAT.format(
+        fmt=fmt, formats=', '.join(FORMATS)))
+
+
+def import_ads(rows, user, batch_size=None, on_error=None):
+    """
+    Импортирует объявления пользователя из потока пар
+    (номер строки, данные), не загружая его в память целиком.
+
+    Строки проверяются AdCreateSerializer пачками по batch_size
+    и вставляются одним bulk_create на пачку вместе с событиями
+    журнала изменений и совпадениями сохранённых поисков;
+    поисковый индекс обновляют триггеры базы,
+    кэш списков сбрасывается после каждой пачки.
+    on_error(номер, ошибки) вызывается для каждой отклонённой строки.
+    """
+    batch_size = batch_size or ConstNum.IMPORT_BATCH_SIZE
+    validator = AdCreateSerializer()
+    report = ImportReport()
+    started = time.perf_counter()
+    rows = iter(rows)
+    while chunk := list(islice(rows, batch_size)):
+        ads = []
+        for number, data in chunk:
+            report.processed += 1
+            try:
+                if isinstance(data, Exception):
+                    raise serializers.ValidationError(
+                        {'non_field_errors': [str(data)]})
+                ads.append(Ad(user=user, **validator.run_validation(data)))
+            except serializers.ValidationError as error:
+                report.add_error(number, error.detail)
+                if on_error:
+                    on_error(number, error.detail)
+        if ads:
+            with transaction.atomic():
+                Ad.objects.bulk_create(ads)
+                record_changes(EntityChoices.AD, EventChoices.CREATED, (
+                    (ad.pk, ad_payload(ad)) for ad in ads
+                ))
+                percolate(ads)
+            report.created += len(ads)
+            bump_generation()
+    report.elapsed = time.perf_counter() - started
+    return report
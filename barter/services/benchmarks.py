@@ -0,0 +1,316 @@
+import random
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.test import RequestFactory, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from ads.filters import filter_ads
+from ads.models import Ad, CategoryChoices, ConditionChoices
+from ads.views import AdListView
+from api.renderers import FastJSONRenderer, StreamingJSONRenderer
+from api.serializers import AdCreateSerializer, AdSerializer
+from .exchange_cycles import ExchangeGraph
+from .row_serializers import RowSerializer
+
+User = get_user_model()
+
+SCENARIOS = {}
+
+WORDS = (
+    'детская', 'коляска', 'книга', 'стол', 'лампа', 'телефон', 'куртка',
+    'диван', 'велосипед', 'ноутбук', 'кресло', 'игрушка', 'шкаф', 'плеер',
+    'новый', 'старый', 'рабочий', 'деревянный', 'кожаный', 'светодиодная',
+    'почти', 'отличное', 'состояние', 'обмен', 'срочно', 'зимняя', 'летняя',
+)
+
+
+def scenario(name):
+    """Регистрирует функцию как сценарий команды benchmark."""
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+
+@contextmanager
+def isolated_database():
+    """
+    Создаёт отдельную тестовую базу на время замера,
+    чтобы синтетические данные не попали в рабочую.
+    """
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def measure(func, repeat):
+    """Возвращает медианное время выполнения func в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def peak_memory(func):
+    """Пиковый объём памяти Python за вызов func в килобайтах."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def random_text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed_ads(count, batch_size=5000, seed=0):
+    """Досоздаёт синтетические объявления до общего количества count."""
+    rng = random.Random(seed + Ad.objects.count())
+    user, _ = User.objects.get_or_create(username='benchmark')
+    categories = CategoryChoices.values
+    conditions = ConditionChoices.values
+    missing = count - Ad.objects.count()
+    while missing > 0:
+        size = min(batch_size, missing)
+        Ad.objects.bulk_create(
+            Ad(
+                user=user,
+                title=random_text(rng, 3),
+                description=random_text(rng, 12),
+                category=rng.choice(categories),
+                condition=rng.choice(conditions),
+            )
+            for _ in range(size)
+        )
+        missing -= size
+
+
+def icontains_filter(queryset, search):
+    return queryset.filter(
+        Q(title__icontains=search) | Q(description__icontains=search)
+    )
+
+
+@scenario('search')
+def search_benchmark(sizes, repeat, query='детская коляска'):
+    """
+    Сравнивает поиск через индекс FTS5 и через icontains:
+    страница из 10 объявлений плюс COUNT, как в списке объявлений.
+    Отдельно замеряется сортировка по релевантности BM25.
+    """
+    def run(queryset):
+        queryset.count()
+        list(queryset[:10])
+
+    rows = []
+    for size in sorted(sizes):
+        seed_ads(size)
+        base = Ad.objects.all()
+        rows.append({
+            'ads': size,
+            'fts_ms': measure(lambda: run(
+                filter_ads(base, search=query).order_by('-created_at')
+            ), repeat),
+            'fts_relevance_ms': measure(lambda: run(
+                filter_ads(base, search=query, rank=True)
+            ), repeat),
+            'icontains_ms': measure(lambda: run(
+                icontains_filter(base, query).order_by('-created_at')
+            ), repeat),
+        })
+    return rows
+
+
+def synthetic_edges(count, seed=0, degree=4, community=1000, local=0.8):
+    """
+    Рёбра синтетического графа обменов: у пользователя по два
+    объявления, в среднем degree предложений на объявление.
+    Большая часть предложений внутри сообществ по community
+    объявлений, чтобы в графе были короткие циклы.
+    """
+    rng = random.Random(seed)
+    ads = max(count // degree, community)
+    for pk in range(1, count + 1):
+        sender = rng.randrange(ads)
+        if rng.random() < local:
+            base = sender - sender % community
+            receiver = base + rng.randrange(min(community, ads - base))
+        else:
+            receiver = rng.randrange(ads)
+        if receiver // 2 == sender // 2:
+            receiver = (receiver + 2) % ads
+        yield pk, sender, receiver, sender // 2, receiver // 2
+
+
+@scenario('cycles')
+def cycles_benchmark(sizes, repeat, users=200):
+    """
+    Граф обменов на синтетических данных (размер — число рёбер):
+    полная загрузка, одно инкрементальное изменение и поиск
+    циклов для случайных пользователей (медиана и 95-й перцентиль).
+    """
+    rows = []
+    for size in sorted(sizes):
+        edges = list(synthetic_edges(size))
+        graph = ExchangeGraph()
+        started = time.perf_counter()
+        graph.load(edges)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        rng = random.Random(size)
+        changed = rng.sample(edges, min(1000, size))
+        started = time.perf_counter()
+        for edge in changed:
+            graph.remove_edge(edge[0])
+            graph.add_edge(*edge)
+        update_us = (time.perf_counter() - started) * 1e6 / len(changed)
+
+        owners = list(graph.user_ads)
+        timings, found = [], 0
+        for user in rng.sample(owners, min(users, len(owners))):
+            timings.append(measure(lambda: graph.find_cycles(user), repeat))
+            found += len(graph.find_cycles(user))
+        timings.sort()
+        rows.append({
+            'edges': size,
+            'build_ms': build_ms,
+            'update_us': update_us,
+            'find_median_ms': statistics.median(timings),
+            'find_p95_ms': timings[int(len(timings) * 0.95) - 1],
+            'cycles_per_user': found / len(timings),
+        })
+    return rows
+
+
+@scenario('ad_cards')
+def ad_cards_benchmark(sizes, repeat, page_size=50):
+    """
+    Отрисовка страницы списка объявлений (AdListView) с кэшем
+    фрагментов карточек и без него. Кэш id страниц прогрет
+    в обоих случаях, поэтому разница — только шаблон карточек.
+    """
+    view = AdListView.as_view(paginate_by=page_size)
+    viewer, _ = User.objects.get_or_create(username='benchmark_viewer')
+
+    def render():
+        request = RequestFactory().get('/ads/')
+        request.user = viewer
+        request._messages = CookieStorage(request)
+        view(request).render()
+
+    rows = []
+    for size in sorted(sizes):
+        seed_ads(size)
+        cache.clear()
+        with override_settings(AD_CARD_CACHE_TIMEOUT=0):
+            render()
+            uncached = measure(render, repeat)
+        render()
+        cached = measure(render, repeat)
+        rows.append({
+            'ads': size,
+            'page_size': page_size,
+            'uncached_ms': uncached,
+            'cached_ms': cached,
+            'speedup': uncached / cached,
+        })
+    return rows
+
+
+@scenario('serializers')
+def serializers_benchmark(sizes, repeat, page_size=1000):
+    """
+    Вывод страницы объявлений через AdCreateSerializer по экземплярам
+    моделей и через RowSerializer по строкам values(), вместе
+    с запросом к базе. Скорость — объектов в секунду.
+    """
+    row_serializer = RowSerializer(AdCreateSerializer)
+    rows = []
+    for size in sorted(sizes):
+        seed_ads(size)
+        page = Ad.objects.order_by('-created_at', '-id')[:page_size]
+
+        def model_path():
+            return AdCreateSerializer(list(page), many=True).data
+
+        def row_path():
+            return row_serializer.represent(row_serializer.values(page))
+
+        count = len(model_path())
+        model_ms = measure(model_path, repeat)
+        row_ms = measure(row_path, repeat)
+        rows.append({
+            'ads': size,
+            'page_size': count,
+            'model_objects_per_s': count / model_ms * 1000,
+            'row_objects_per_s': count / row_ms * 1000,
+            'speedup': model_ms / row_ms,
+        })
+    return rows
+
+
+@scenario('renderers')
+def renderers_benchmark(sizes, repeat):
+    """
+    Выдача size объявлений с пользователем одним JSON: JSONRenderer DRF,
+    FastJSONRenderer и потоковый StreamingJSONRenderer.
+    render — только кодирование готовых данных, total — вместе
+    с чтением строк из базы; потоковый рендерер читает их серверным
+    курсором и не собирает тело ответа целиком. Пиковая память — total.
+    """
+    row_serializer = RowSerializer(AdSerializer)
+
+    def consume(chunks):
+        for _ in chunks:
+            pass
+
+    rows = []
+    for size in sorted(sizes):
+        seed_ads(size)
+        queryset = row_serializer.values(Ad.objects.order_by('id')[:size])
+        payload = row_serializer.represent(queryset)
+        renders = {
+            'drf': lambda: JSONRenderer().render(payload),
+            'fast': lambda: FastJSONRenderer().render(payload),
+            'streaming': lambda: consume(
+                StreamingJSONRenderer().render_stream(payload)),
+        }
+        totals = {
+            'drf': lambda: JSONRenderer().render(
+                row_serializer.represent(queryset.all())),
+            'fast': lambda: FastJSONRenderer().render(
+                row_serializer.represent(queryset.all())),
+            'streaming': lambda: consume(
+                StreamingJSONRenderer().render_stream(map(
+                    row_serializer.to_representation,
+                    queryset.iterator(
+                        chunk_size=StreamingJSONRenderer.chunk_size)
+                ))
+            ),
+        }
+        for name, render in renders.items():
+            rows.append({
+                'items': size,
+                'renderer': name,
+                'render_items_per_s': size / measure(render, repeat) * 1000,
+                'total_items_per_s': (
+                    size / measure(totals[name], repeat) * 1000),
+                'peak_kb': peak_memory(totals[name]),
+            })
+    return rows
@@ -0,0 +1,129 @@
+import base64
+import binascii
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from ads.models import ChangeEvent, EntityChoices, EventChoices
+from constants import ConstNum, Errors
+from .listing_cache import PROPOSALS_NAMESPACE, bump_generation
+from .pagination import InvalidCursorError
+
+
+def ad_payload(ad):
+    return {'user': ad.user_id}
+
+
+def proposal_payload(sender_user, receiver_user, status):
+    """
+    Данные события предложения: пользователи-участники
+    (по ним журнал фильтруется для клиента) и статус.
+    """
+    return {
+        'sender_user': sender_user,
+        'receiver_user': receiver_user,
+        'status': status,
+    }
+
+
+def record_change(entity, object_id, event, payload=None):
+    """Добавляет событие в журнал в текущей транзакции."""
+    return ChangeEvent.objects.create(
+        entity=entity, object_id=object_id, event=event,
+        payload=payload or {}
+    )
+
+
+def record_changes(entity, event, changes):
+    """
+    Добавляет события пачкой для set-based операций.
+    changes: пары (id объекта, данные события).
+    """
+    return ChangeEvent.objects.bulk_create(
+        ChangeEvent(
+            entity=entity, object_id=object_id, event=event,
+            payload=payload
+        )
+        for object_id, payload in changes
+    )
+
+
+def record_status_changes(proposals, status):
+    """
+    Записывает смену статуса предложений и сдвигает поколение
+    коллекции предложений (ETag списков API).
+    proposals: тройки (id, пользователь-отправитель, пользователь-получатель).
+    """
+    bump_generation(PROPOSALS_NAMESPACE)
+    return record_changes(
+        EntityChoices.PROPOSAL, EventChoices.STATUS_CHANGED,
+        (
+            (pk, proposal_payload(sender, receiver, status))
+            for pk, sender, receiver in proposals
+        )
+    )
+
+
+def encode_feed_cursor(event_id):
+    raw = json.dumps({'e': event_id}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_feed_cursor(cursor):
+    """Возвращает id последнего полученного события."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        return int(json.loads(raw)['e'])
+    except (
+        binascii.Error, ValueError, TypeError, KeyError, AttributeError
+    ) as error:
+        raise InvalidCursorError(Errors.INVALID_CURSOR) from error
+
+
+def settled_changes():
+    """
+    События, которые можно читать по курсору id: старше окна
+    CHANGE_FEED_SETTLE_SECONDS. Все события с меньшими id к этому
+    времени закоммичены, поэтому курсор не перескочит через них.
+    """
+    events = ChangeEvent.objects.all()
+    if settings.CHANGE_FEED_SETTLE_SECONDS:
+        events = events.filter(created_at__lte=timezone.now() - timedelta(
+            seconds=settings.CHANGE_FEED_SETTLE_SECONDS))
+    return events
+
+
+def visible_changes(user):
+    """
+    События, доступные пользователю: все изменения объявлений
+    и изменения предложений, в которых он участвует.
+    """
+    events = settled_changes()
+    if user.is_staff:
+        return events
+    return events.filter(
+        Q(entity=EntityChoices.AD)
+        | Q(payload__sender_user=user.id)
+        | Q(payload__receiver_user=user.id)
+    )
+
+
+def get_changes(user, cursor=None, limit=None, entity=None):
+    """
+    Возвращает (события, курсор, есть ли ещё) после позиции cursor.
+    Без курсора журнал читается с начала; если новых событий нет,
+    возвращается тот же курсор, чтобы клиент продолжал опрос.
+    """
+    limit = min(limit or ConstNum.CHANGES_PAGE_SIZE, ConstNum.CHANGES_MAX)
+    since = decode_feed_cursor(cursor) if cursor else 0
+    events = visible_changes(user).filter(id__gt=since)
+    if entity:
+        events = events.filter(entity=entity)
+    events = list(events.order_by('id')[:limit + 1])
+    has_more = len(events) > limit
+    events = events[:limit]
+    last = events[-1].id if events else since
+    return events, encode_feed_cursor(last), has_more
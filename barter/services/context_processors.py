@@ -1,7 +1,4 @@
-from django.db.models import Q
-
-from ads.models import ExchangeProposal
-from constants import ConstStr
+from services.counters import get_pending_count
 
 
 def pending_proposals_count(request):
@@ -11,14 +8,10 @@ def pending_proposals_count(request):
 
     Возвращает словарь с ключом 'pending_proposals_count' и числом заявок
     со статусом 'pending', в которых пользователь участвует
-    как отправитель или получатель.
+    как отправитель или получатель. Число берётся из денормализованного
+    счётчика ProposalCounter одним запросом по первичному ключу.
     """
 
     if request.user.is_authenticated:
-        user_ads = request.user.ads.all()
-        count = ExchangeProposal.objects.filter(
-            Q(ad_receiver__in=user_ads) | Q(ad_sender__in=user_ads),
-            status=ConstStr.PENDING
-        ).count()
-        return {'pending_proposals_count': count}
+        return {'pending_proposals_count': get_pending_count(request.user)}
     return {}
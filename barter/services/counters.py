@@ -0,0 +1,132 @@
+from collections import defaultdict
+
+from django.db.models import Case, Count, F, IntegerField, Value, When
+
+from ads.models import ExchangeProposal, ProposalCounter, StatusChoices
+
+
+def count_pending(user_id):
+    """
+    Считает ожидающие предложения пользователя по таблице предложений.
+    Предложение между двумя объявлениями самого пользователя
+    считается только отправленным, чтобы не учитывать его дважды.
+    """
+    pending = ExchangeProposal.objects.filter(status=StatusChoices.PENDING)
+    return {
+        'pending_sent': pending.filter(ad_sender__user_id=user_id).count(),
+        'pending_received': pending.filter(
+            ad_receiver__user_id=user_id
+        ).exclude(ad_sender__user_id=user_id).count(),
+    }
+
+
+def reconcile_user_counter(user_id):
+    """Пересчитывает счётчик одного пользователя с нуля."""
+    counter, _ = ProposalCounter.objects.update_or_create(
+        user_id=user_id, defaults=count_pending(user_id)
+    )
+    return counter
+
+
+def delta_case(changes, position):
+    """Выражение CASE с изменением счётчика для каждого пользователя."""
+    return Case(
+        *(
+            When(user_id=user_id, then=Value(delta[position]))
+            for user_id, delta in changes.items()
+        ),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def adjust_pending_counters(changes, create_missing=True):
+    """
+    Применяет изменения счётчиков одним UPDATE на всех пользователей.
+    changes: {user_id: (изменение отправленных, изменение входящих)}.
+    Вызывается в транзакции, изменившей предложения; отсутствующий
+    счётчик создаётся пересчётом, уже учитывающим это изменение.
+    При удалении (create_missing=False) меняются только существующие
+    счётчики: пользователь может удаляться вместе со своим счётчиком.
+    """
+    changes = {
+        user_id: delta for user_id, delta in changes.items() if any(delta)
+    }
+    if not changes:
+        return
+    counters = ProposalCounter.objects.filter(user_id__in=changes)
+    updated = counters.update(
+        pending_sent=F('pending_sent') + delta_case(changes, 0),
+        pending_received=F('pending_received') + delta_case(changes, 1),
+    )
+    if create_missing and updated < len(changes):
+        existing = set(counters.values_list('user_id', flat=True))
+        for user_id in changes.keys() - existing:
+            reconcile_user_counter(user_id)
+
+
+def pending_changes(proposals, delta):
+    """
+    Собирает изменения счётчиков для набора предложений.
+    proposals: пары (id пользователя-отправителя, id пользователя-получателя).
+    Предложение между объявлениями одного пользователя меняет
+    только счётчик отправленных (см. count_pending).
+    """
+    changes = defaultdict(lambda: [0, 0])
+    for sender_user_id, receiver_user_id in proposals:
+        changes[sender_user_id][0] += delta
+        if receiver_user_id != sender_user_id:
+            changes[receiver_user_id][1] += delta
+    return changes
+
+
+def get_pending_count(user):
+    """
+    Возвращает число ожидающих предложений пользователя
+    одним запросом по первичному ключу.
+    """
+    counter = ProposalCounter.objects.filter(user=user).first()
+    if counter is None:
+        counter = reconcile_user_counter(user.pk)
+    return counter.pending_total
+
+
+def reconcile_all_counters():
+    """
+    Сверяет все счётчики с таблицей предложений двумя GROUP BY
+    и возвращает число исправленных записей.
+    """
+    pending = ExchangeProposal.objects.filter(status=StatusChoices.PENDING)
+    sent = dict(
+        pending.values('ad_sender__user')
+        .annotate(total=Count('id')).values_list('ad_sender__user', 'total')
+    )
+    received = dict(
+        pending.exclude(ad_sender__user=F('ad_receiver__user'))
+        .values('ad_receiver__user')
+        .annotate(total=Count('id'))
+        .values_list('ad_receiver__user', 'total')
+    )
+    existing = {
+        counter.user_id: counter for counter in ProposalCounter.objects.all()
+    }
+    stale = []
+    for user_id in set(existing) | set(sent) | set(received):
+        expected = (sent.get(user_id, 0), received.get(user_id, 0))
+        counter = existing.get(user_id)
+        if counter and (
+            counter.pending_sent, counter.pending_received
+        ) == expected:
+            continue
+        stale.append(ProposalCounter(
+            user_id=user_id,
+            pending_sent=expected[0],
+            pending_received=expected[1],
+        ))
+    ProposalCounter.objects.bulk_create(
+        stale,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['pending_sent', 'pending_received'],
+    )
+    return len(stale)
@@ -0,0 +1,294 @@
+import logging
+import os
+import threading
+
+from django.db import connections
+from django.db.models import Max
+
+from ads.models import EntityChoices, ExchangeProposal
+from constants import ConstNum, ConstStr, Errors
+from .change_feed import settled_changes
+
+logger = logging.getLogger(__name__)
+
+
+class GraphLoadingError(Exception):
+    """Кастомное исключение: граф обменов ещё загружается."""
+    pass
+
+
+def pending_edges():
+    """
+    Рёбра графа обменов: ожидающие предложения между объявлениями,
+    которые ещё не обменяны. Строка — (id предложения, объявление
+    отправителя, объявление получателя, их владельцы).
+    """
+    return ExchangeProposal.objects.filter(
+        status=ConstStr.PENDING,
+        ad_sender__is_exchanged=False,
+        ad_receiver__is_exchanged=False,
+    ).order_by().values_list(
+        'pk', 'ad_sender_id', 'ad_receiver_id',
+        'ad_sender__user_id', 'ad_receiver__user_id'
+    )
+
+
+class ExchangeGraph:
+    """
+    Граф обменов в памяти процесса. Вершины — объявления, ребро
+    A → B — ожидающее предложение отдать A за B. Простой цикл,
+    в котором все владельцы различны, — обмен по кругу: каждый
+    отдаёт своё объявление и получает то, на которое предлагал обмен.
+
+    Граф загружается целиком в фоновом потоке (warm) при запуске
+    воркера, дальше обновляется по журналу изменений: перечитываются
+    только предложения с новыми событиями. Полная загрузка никогда
+    не выполняется в запросе: пока графа нет, поиск отвечает
+    GraphLoadingError, а при большом отставании перестройка идёт
+    в фоне и поиск работает по текущему снимку. Граф хранится
+    в памяти каждого процесса.
+    """
+
+    STATE = (
+        'cursor', 'edges', 'outgoing', 'incoming', 'spare', 'owners',
+        'user_ads',
+    )
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.loading = None
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.cursor = None
+            self.edges = {}
+            self.outgoing = {}
+            self.incoming = {}
+            self.spare = {}
+            self.owners = {}
+            self.user_ads = {}
+
+    def __len__(self):
+        return len(self.edges)
+
+    @property
+    def ready(self):
+        return self.cursor is not None
+
+    def add_edge(self, pk, sender, receiver, sender_user, receiver_user):
+        if pk in self.edges:
+            self.remove_edge(pk)
+        self.edges[pk] = (sender, receiver)
+        self.owners[sender] = sender_user
+        self.owners[receiver] = receiver_user
+        targets = self.outgoing.setdefault(sender, {})
+        if receiver in targets:
+            # Повторное предложение той же пары хранится про запас,
+            # чтобы ребро не пропало при отклонении одного из них.
+            self.spare.setdefault((sender, receiver), set()).add(pk)
+            return
+        targets[receiver] = pk
+        self.incoming.setdefault(receiver, set()).add(sender)
+        self.user_ads.setdefault(sender_user, set()).add(sender)
+
+    def remove_edge(self, pk):
+        if pk not in self.edges:
+            return
+        sender, receiver = self.edges.pop(pk)
+        pair = (sender, receiver)
+        spare = self.spare.get(pair)
+        if spare:
+            if pk in spare:
+                spare.discard(pk)
+            else:
+                self.outgoing[sender][receiver] = spare.pop()
+            if not spare:
+                del self.spare[pair]
+            return
+        del self.outgoing[sender][receiver]
+        if not self.outgoing[sender]:
+            del self.outgoing[sender]
+            owner_ads = self.user_ads[self.owners[sender]]
+            owner_ads.discard(sender)
+            if not owner_ads:
+                del self.user_ads[self.owners[sender]]
+        self.incoming[receiver].discard(sender)
+        if not self.incoming[receiver]:
+            del self.incoming[receiver]
+
+    def load(self, rows):
+        for row in rows:
+            self.add_edge(*row)
+
+    def rebuild(self):
+        """
+        Загружает граф из базы в новый экземпляр и подменяет им
+        текущий: поиск во время загрузки работает со старым снимком.
+        Курсор журнала фиксируется до чтения: изменения, сделанные
+        во время загрузки, применятся повторно при следующей
+        синхронизации, что безопасно.
+        """
+        fresh = ExchangeGraph()
+        fresh.cursor = settled_changes().aggregate(
+            last=Max('id'))['last'] or 0
+        fresh.load(pending_edges().iterator(
+            chunk_size=ConstNum.EXPORT_CHUNK_SIZE))
+        with self.lock:
+            for name in self.STATE:
+                setattr(self, name, getattr(fresh, name))
+
+    def warm(self, background=True):
+        """
+        Запускает полную загрузку графа в фоновом потоке, если она
+        ещё не идёт в этом процессе (после fork поток родителя
+        не переносится). background=False загружает граф сразу.
+        """
+        if not background:
+            return self.rebuild()
+        with self.lock:
+            if self.loading == os.getpid():
+                return
+            self.loading = os.getpid()
+        threading.Thread(
+            target=self._warm, name='exchange-graph', daemon=True
+        ).start()
+
+    def _warm(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception('Не удалось загрузить граф обменов.')
+        finally:
+            connections.close_all()
+            with self.lock:
+                self.loading = None
+
+    def sync(self):
+        """
+        Применяет события предложений, появившиеся после курсора:
+        рёбра изменённых предложений удаляются и добавляются заново
+        по текущему состоянию одним запросом. Читается не больше
+        CYCLES_SYNC_MAX + 1 событий; при большем отставании или
+        без загруженного графа запускается фоновая перестройка.
+        """
+        with self.lock:
+            if self.cursor is None:
+                return self.warm()
+            changes = list(settled_changes().filter(
+                entity=EntityChoices.PROPOSAL, id__gt=self.cursor
+            ).order_by('id').values_list(
+                'id', 'object_id')[:ConstNum.CYCLES_SYNC_MAX + 1])
+            if not changes:
+                return
+            if len(changes) > ConstNum.CYCLES_SYNC_MAX:
+                return self.warm()
+            self.cursor = changes[-1][0]
+            self.refresh({object_id for _, object_id in changes})
+
+    def refresh(self, ids):
+        with self.lock:
+            for pk in ids:
+                self.remove_edge(pk)
+            self.load(pending_edges().filter(pk__in=ids))
+
+    def reaching(self, target, depth, budget):
+        """
+        Обратный обход в ширину: объявления, из которых можно
+        вернуться к target не более чем за depth рёбер,
+        с длиной кратчайшего пути.
+        """
+        distances = {target: 0}
+        frontier = [target]
+        for distance in range(1, depth + 1):
+            following = []
+            for node in frontier:
+                for source in self.incoming.get(node, ()):
+                    budget[0] -= 1
+                    if source not in distances:
+                        distances[source] = distance
+                        following.append(source)
+            frontier = following
+            if not frontier or budget[0] <= 0:
+                break
+        return distances
+
+    def find_cycles(self, user_id, max_length=None, limit=None):
+        """
+        Ищет обмены по кругу длиной от CYCLES_MIN_LENGTH до max_length,
+        начинающиеся с объявлений пользователя.
+
+        Прямой обход в глубину заходит только в вершины, из которых
+        хватает рёбер вернуться к началу, поэтому стоимость зависит
+        от окрестности объявлений пользователя, а не от размера графа.
+        Число просмотренных рёбер ограничено CYCLES_SEARCH_BUDGET.
+        """
+        max_length = max_length or ConstNum.CYCLES_DEFAULT_LENGTH
+        limit = limit or ConstNum.CYCLES_LIMIT
+        budget = [ConstNum.CYCLES_SEARCH_BUDGET]
+        cycles = []
+        with self.lock:
+            for start in sorted(self.user_ads.get(user_id, ())):
+                distances = self.reaching(start, max_length - 1, budget)
+                self._walk(
+                    [start], {user_id}, distances, max_length,
+                    cycles, limit, budget
+                )
+                if len(cycles) >= limit or budget[0] <= 0:
+                    break
+        return cycles
+
+    def _walk(
+        self, path, users, distances, max_length, cycles, limit, budget
+    ):
+        start, node = path[0], path[-1]
+        for target in self.outgoing.get(node, ()):
+            if len(cycles) >= limit or budget[0] <= 0:
+                return
+            budget[0] -= 1
+            if target == start:
+                if len(path) >= ConstNum.CYCLES_MIN_LENGTH:
+                    cycles.append(self.describe(path))
+                continue
+            owner = self.owners[target]
+            if (
+                target in path or owner in users
+                or len(path) + distances.get(target, max_length) > max_length
+            ):
+                continue
+            path.append(target)
+            users.add(owner)
+            self._walk(path, users, distances, max_length, cycles, limit,
+                       budget)
+            users.discard(owner)
+            path.pop()
+
+    def describe(self, path):
+        """Шаги цикла: каждое предложение и участники обмена."""
+        return [
+            {
+                'proposal': self.outgoing[sender][receiver],
+                'ad_sender': sender,
+                'ad_receiver': receiver,
+                'sender_user': self.owners[sender],
+                'receiver_user': self.owners[receiver],
+            }
+            for sender, receiver in zip(path, path[1:] + path[:1])
+        ]
+
+
+exchange_graph = ExchangeGraph()
+
+
+def suggest_cycles(user, max_length=None, limit=None):
+    """
+    Возвращает обмены по кругу с участием пользователя,
+    предварительно применив новые события журнала к графу.
+    Если граф ещё не загружен, запускает загрузку в фоне
+    и бросает GraphLoadingError.
+    """
+    if not exchange_graph.ready:
+        exchange_graph.warm()
+        raise GraphLoadingError(Errors.CYCLES_LOADING)
+    exchange_graph.sync()
+    return exchange_graph.find_cycles(user.id, max_length, limit)
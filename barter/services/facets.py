@@ -0,0 +1,63 @@
+from django.db.models import Count
+
+from ads.models import CategoryChoices, ConditionChoices
+from constants import ConstStr
+from .listing_cache import get_or_compute, listing_key
+
+
+def count_facet_pairs(queryset):
+    """
+    Считает объявления по парам (категория, состояние)
+    одним запросом с GROUP BY.
+    """
+    return [
+        list(row) for row in queryset.order_by()
+        .values(ConstStr.CATEGORY, ConstStr.CONDITION)
+        .annotate(total=Count('pk'))
+        .values_list(ConstStr.CATEGORY, ConstStr.CONDITION, 'total')
+    ]
+
+
+def build_facets(pairs, category='', condition=''):
+    """
+    Собирает фасеты из счётчиков пар. Число в категории учитывает
+    выбранное состояние и наоборот, но не собственный фильтр:
+    так видно, сколько объявлений даст переключение значения.
+    """
+    categories = dict.fromkeys(CategoryChoices.values, 0)
+    conditions = dict.fromkeys(ConditionChoices.values, 0)
+    for pair_category, pair_condition, total in pairs:
+        if not condition or pair_condition == condition:
+            categories[pair_category] = (
+                categories.get(pair_category, 0) + total)
+        if not category or pair_category == category:
+            conditions[pair_condition] = (
+                conditions.get(pair_condition, 0) + total)
+    return {
+        ConstStr.CATEGORY: [
+            {'value': value, 'label': label, 'count': categories[value]}
+            for value, label in CategoryChoices.choices
+        ],
+        ConstStr.CONDITION: [
+            {'value': value, 'label': label, 'count': conditions[value]}
+            for value, label in ConditionChoices.choices
+        ],
+    }
+
+
+def get_facets(queryset, params, category='', condition=''):
+    """
+    Возвращает фасеты по категории и состоянию для кверисета,
+    уже отфильтрованного поиском. Счётчики пар кэшируются по
+    параметрам выборки без категории и состояния, поэтому
+    переключение фильтров в боковой панели не обращается к базе.
+    """
+    signature = {
+        key: value for key, value in params.items()
+        if key not in (ConstStr.CATEGORY, ConstStr.CONDITION, 'ordering')
+    }
+    pairs = get_or_compute(
+        listing_key({**signature, 'facets': True}),
+        lambda: count_facet_pairs(queryset)
+    )
+    return build_facets(pairs, category.lower(), condition.lower())
@@ -0,0 +1,148 @@
+import heapq
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from constants import Errors
+
+logger = logging.getLogger('barter.queries')
+
+
+class QueryBudgetExceeded(Exception):
+    """Кастомное исключение превышения бюджета SQL-запросов."""
+    pass
+
+
+class QueryRecorder:
+    """
+    Обёртка для connection.execute_wrapper: считает запросы,
+    суммарное время в базе и хранит самые медленные выражения.
+    """
+
+    def __init__(self, slow_limit=3):
+        self.slow_limit = slow_limit
+        self.count = 0
+        self.duration = 0.0
+        self._slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            item = (elapsed, self.count, sql)
+            if len(self._slowest) < self.slow_limit:
+                heapq.heappush(self._slowest, item)
+            else:
+                heapq.heappushpop(self._slowest, item)
+
+    def slowest(self):
+        """Возвращает пары (секунды, SQL) от самого медленного."""
+        return [
+            (elapsed, sql)
+            for elapsed, _, sql in sorted(self._slowest, reverse=True)
+        ]
+
+
+def get_query_budget(method, view_name):
+    """
+    Бюджет ищется сначала для пары «метод имя_представления»,
+    затем для имени представления без метода.
+    """
+    budgets = settings.QUERY_BUDGETS
+    return budgets.get(f'{method} {view_name}', budgets.get(view_name))
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Middleware учёта SQL-запросов на каждый запрос:
+    - заголовок Server-Timing с числом запросов и временем в базе;
+    - строка лога barter.queries с теми же метриками;
+    - проверка бюджета запросов для представления: при превышении
+      исключение (QUERY_BUDGET_RAISE, например в тестах) или warning.
+
+    У потоковых ответов запросы выполняются при чтении тела, поэтому
+    учёт продолжается до конца потока: лог и проверка бюджета
+    выполняются, когда поток прочитан или закрыт. Заголовок
+    Server-Timing отправляется раньше тела и учитывает только
+    запросы до начала потока.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder(settings.QUERY_SLOW_STATEMENTS)
+        started = time.perf_counter()
+        with self.recording(recorder):
+            response = self.get_response(request)
+        response['Server-Timing'] = (
+            f'db;dur={recorder.duration * 1000:.1f};'
+            f'desc="{recorder.count} queries", '
+            f'app;dur={(time.perf_counter() - started) * 1000:.1f}'
+        )
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.record_stream(
+                response.streaming_content, request, response,
+                recorder, started
+            )
+        else:
+            self.report(request, response, recorder, started)
+        return response
+
+    @staticmethod
+    def recording(recorder):
+        """Подключает recorder ко всем соединениям с базой."""
+        stack = ExitStack()
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(recorder))
+        return stack
+
+    def record_stream(self, content, request, response, recorder, started):
+        """
+        Отдаёт блоки потокового ответа, продолжая учёт запросов,
+        и проверяет бюджет, когда поток прочитан или закрыт.
+        """
+        try:
+            with self.recording(recorder):
+                yield from content
+        finally:
+            self.report(request, response, recorder, started)
+
+    def report(self, request, response, recorder, started):
+        """Пишет метрики запроса в лог и проверяет бюджет запросов."""
+        total = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else None
+        logger.info(
+            'method=%s path=%s view=%s status=%s queries=%d '
+            'db_ms=%.1f total_ms=%.1f',
+            request.method, request.path, view_name,
+            response.status_code, recorder.count,
+            recorder.duration * 1000, total * 1000,
+            extra={
+                'view': view_name,
+                'query_count': recorder.count,
+                'db_ms': recorder.duration * 1000,
+                'total_ms': total * 1000,
+            }
+        )
+        for elapsed, sql in recorder.slowest():
+            logger.debug(
+                'view=%s slow_query_ms=%.1f sql=%s',
+                view_name, elapsed * 1000, sql
+            )
+
+        budget = get_query_budget(request.method, view_name)
+        if budget is not None and recorder.count > budget:
+            message = Errors.QUERY_BUDGET_EXCEEDED.format(
+                view=view_name, count=recorder.count, budget=budget)
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
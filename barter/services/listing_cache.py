@@ -0,0 +1,201 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.utils.functional import cached_property
+
+from .pagination import (
+    KeysetPage, get_keyset_direction, keyset_ordering, paginate_keyset,
+    row_pk
+)
+
+ADS_NAMESPACE = 'ads'
+PROPOSALS_NAMESPACE = 'proposals'
+STATS = ('hits', 'misses', 'waits')
+POLL_INTERVAL = 0.01
+
+
+def generation_key(namespace):
+    return f'generation:{namespace}'
+
+
+def get_generation(namespace=ADS_NAMESPACE):
+    """
+    Возвращает текущее поколение данных пространства имён.
+    Начальное значение — время в наносекундах, поэтому после
+    очистки кэша или истечения LISTING_GENERATION_TIMEOUT
+    поколения не повторяются.
+    """
+    key = generation_key(namespace)
+    value = cache.get(key)
+    if value is None:
+        value = time.time_ns()
+        if not cache.add(key, value, settings.LISTING_GENERATION_TIMEOUT):
+            value = cache.get(key, value)
+    return value
+
+
+def _increment_generation(namespace):
+    key = generation_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), settings.LISTING_GENERATION_TIMEOUT)
+
+
+def bump_generation(namespace=ADS_NAMESPACE):
+    """
+    Делает устаревшими все закэшированные выборки пространства имён.
+    Поколение сдвигается сразу и ещё раз после коммита: чтение,
+    начатое до коммита, не сохранит старые данные под новым поколением.
+    """
+    _increment_generation(namespace)
+    transaction.on_commit(lambda: _increment_generation(namespace))
+
+
+def listing_key(params, namespace=ADS_NAMESPACE):
+    """Ключ выборки: поколение плюс хэш нормализованных параметров."""
+    raw = json.dumps(params, sort_keys=True, default=str)
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return f'listing:{namespace}:{get_generation(namespace)}:{digest}'
+
+
+def _record(stat):
+    key = f'listing:stats:{stat}'
+    if cache.add(key, 1, None):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def get_cache_stats():
+    """
+    Возвращает попадания, промахи, ожидания чужого вычисления
+    и долю попаданий кэша выборок.
+    """
+    values = cache.get_many([f'listing:stats:{stat}' for stat in STATS])
+    stats = {
+        stat: values.get(f'listing:stats:{stat}', 0) for stat in STATS
+    }
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / total if total else 0.0
+    return stats
+
+
+def reset_cache_stats():
+    cache.delete_many([f'listing:stats:{stat}' for stat in STATS])
+
+
+def _wait_for(key):
+    deadline = time.monotonic() + settings.LISTING_CACHE_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def get_or_compute(key, compute):
+    """
+    Возвращает значение из кэша или вычисляет его.
+    При промахе вычисляет только владелец блокировки, остальные
+    запросы ждут его результат; по истечении ожидания
+    вычисляют сами, чтобы не зависнуть на упавшем владельце.
+    """
+    value = cache.get(key)
+    if value is not None:
+        _record('hits')
+        return value
+    lock = f'{key}:lock'
+    locked = cache.add(lock, 1, settings.LISTING_CACHE_LOCK_TIMEOUT)
+    if not locked:
+        value = _wait_for(key)
+        if value is not None:
+            _record('hits')
+            _record('waits')
+            return value
+    _record('misses')
+    try:
+        value = compute()
+        cache.set(key, value, settings.LISTING_CACHE_TIMEOUT)
+    finally:
+        if locked:
+            cache.delete(lock)
+    return value
+
+
+def hydrate(queryset, ids):
+    """Загружает объекты по списку id, сохраняя порядок списка."""
+    rows = {row_pk(row): row for row in queryset.filter(pk__in=ids)}
+    return [rows[pk] for pk in ids if pk in rows]
+
+
+def cached_keyset_page(queryset, cursor, page_size, params):
+    """
+    paginate_keyset с кэшированием id страницы и курсоров.
+    При попадании страница загружается одним запросом по id.
+    """
+    computed = {}
+
+    def compute():
+        page = computed['page'] = paginate_keyset(queryset, cursor, page_size)
+        return {
+            'ids': [row_pk(row) for row in page],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        }
+
+    entry = get_or_compute(listing_key(
+        {**params, 'cursor': cursor, 'page_size': page_size}
+    ), compute)
+    if 'page' in computed:
+        return computed['page']
+    descending = get_keyset_direction(queryset)
+    rows = queryset.order_by(*keyset_ordering(descending)).filter(
+        pk__in=entry['ids'])
+    list(rows)
+    return KeysetPage(rows, entry['next'], entry['previous'])
+
+
+class CachedPaginator(Paginator):
+    """
+    Постраничный пагинатор, кэширующий COUNT(*) и id страниц
+    по нормализованным параметрам выборки.
+    """
+
+    def __init__(self, object_list, per_page, *args, params=None, **kwargs):
+        super().__init__(object_list, per_page, *args, **kwargs)
+        self.params = params or {}
+
+    @cached_property
+    def count(self):
+        return get_or_compute(
+            listing_key({**self.params, 'count': True}),
+            self.object_list.count
+        )
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        rows = []
+
+        def compute():
+            rows.extend(self.object_list[bottom:top])
+            return [row_pk(row) for row in rows]
+
+        ids = get_or_compute(listing_key(
+            {**self.params, 'page': number, 'per_page': self.per_page}
+        ), compute)
+        if len(rows) != len(ids):
+            rows = hydrate(self.object_list, ids)
+        return self._get_page(rows, number, self)
@@ -13,5 +13,7 @@ def get_proposal_action_message(code: str, action: str = None) -> str:
         'already_handled': Message.PROPOSAL_ALREADY,
         'forbidden': Errors.ERROR_PROPOSAL,
         'invalid_action': Message.UNKNOWN_ACTION,
+        'not_found': Errors.PROPOSAL_NOT_FOUND,
+        'duplicate': Errors.DUPLICATE_PROPOSAL,
     }
     return messages.get(code, Errors.UNKNOWN_RESULT)
@@ -0,0 +1,172 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+from constants import ConstStr, Errors
+
+KEYSET_ORDERINGS = {
+    (f'-{ConstStr.CREATED_AT}',): True,
+    (f'-{ConstStr.CREATED_AT}', '-id'): True,
+    (ConstStr.CREATED_AT,): False,
+    (ConstStr.CREATED_AT, 'id'): False,
+}
+
+
+class InvalidCursorError(Exception):
+    """Кастомное исключение для повреждённого курсора пагинации."""
+    pass
+
+
+class KeysetPage:
+    """
+    Страница курсорной пагинации по ключу (created_at, id).
+    Повторяет интерфейс django.core.paginator.Page, нужный шаблонам.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def encode_cursor(row, reverse=False):
+    """Кодирует позицию строки в непрозрачный курсор."""
+    created_at, pk = row_key(row)
+    payload = {'c': created_at.isoformat(), 'i': pk}
+    if reverse:
+        payload['r'] = 1
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Декодирует курсор в кортеж (created_at, id, reverse).
+    Бросает InvalidCursorError для повреждённых значений.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        return (
+            datetime.fromisoformat(payload['c']),
+            int(payload['i']),
+            bool(payload.get('r')),
+        )
+    except (
+        binascii.Error, ValueError, TypeError, KeyError, AttributeError
+    ) as error:
+        raise InvalidCursorError(Errors.INVALID_CURSOR) from error
+
+
+def row_pk(row):
+    """id строки: экземпляра модели или словаря values()."""
+    return row['id'] if isinstance(row, dict) else row.pk
+
+
+def row_key(row):
+    if isinstance(row, dict):
+        return row[ConstStr.CREATED_AT], row['id']
+    return row.created_at, row.pk
+
+
+def get_keyset_direction(queryset):
+    """
+    Возвращает True для сортировки по убыванию даты, False — по
+    возрастанию, None — если сортировка не подходит для курсора.
+    """
+    query = queryset.query
+    if query.extra_order_by:
+        return None
+    ordering = tuple(query.order_by)
+    if not ordering and query.default_ordering:
+        ordering = tuple(queryset.model._meta.ordering)
+    return KEYSET_ORDERINGS.get(ordering)
+
+
+def keyset_ordering(descending):
+    if descending:
+        return f'-{ConstStr.CREATED_AT}', '-id'
+    return ConstStr.CREATED_AT, 'id'
+
+
+def after(key, descending, inclusive=False):
+    """Условие «строго после key» (или «начиная с key») в порядке выдачи."""
+    created_at, pk = key
+    if descending:
+        return Q(created_at__lt=created_at) | Q(
+            created_at=created_at,
+            **{'pk__lte' if inclusive else 'pk__lt': pk}
+        )
+    return Q(created_at__gt=created_at) | Q(
+        created_at=created_at,
+        **{'pk__gte' if inclusive else 'pk__gt': pk}
+    )
+
+
+def paginate_keyset(queryset, cursor, page_size):
+    """
+    Возвращает KeysetPage без COUNT(*) и OFFSET: страница выбирается
+    условием по (created_at, id) относительно позиции курсора.
+    """
+    descending = get_keyset_direction(queryset)
+    if descending is None:
+        raise ValueError('Queryset ordering is not keyset-compatible.')
+    ordered = queryset.order_by(*keyset_ordering(descending))
+    position = decode_cursor(cursor) if cursor else None
+
+    if position and position[2]:
+        boundary = list(
+            queryset.order_by(*keyset_ordering(not descending))
+            .filter(after(position[:2], not descending))
+            .values_list(ConstStr.CREATED_AT, 'pk')[:page_size]
+        )
+        if boundary:
+            start = boundary[-1]
+            page = ordered.filter(after(start, descending, inclusive=True))
+            page = page[:page_size]
+            rows = list(page)
+            has_previous = queryset.filter(
+                after(start, not descending)).exists()
+            return KeysetPage(
+                page,
+                next_cursor=encode_cursor(rows[-1]),
+                previous_cursor=(
+                    encode_cursor(rows[0], reverse=True)
+                    if has_previous else None
+                ),
+            )
+        position = None
+
+    page = ordered
+    if position:
+        page = ordered.filter(after(position[:2], descending))
+    page = page[:page_size]
+    rows = list(page)
+    if not rows:
+        return KeysetPage(page)
+    has_next = ordered.filter(after(row_key(rows[-1]), descending)).exists()
+    return KeysetPage(
+        page,
+        next_cursor=encode_cursor(rows[-1]) if has_next else None,
+        previous_cursor=(
+            encode_cursor(rows[0], reverse=True) if position else None
+        ),
+    )
@@ -1,9 +1,15 @@
 from django.core.exceptions import PermissionDenied
 from django.db import transaction
+from django.db.models import F, Q
 from django.shortcuts import get_object_or_404
 
-from ads.models import ExchangeProposal, StatusChoices, Ad
+from ads.models import (
+    Ad, EntityChoices, EventChoices, ExchangeProposal, StatusChoices
+)
 from constants import Message, Errors, ConstStr
+from .change_feed import record_changes, record_status_changes
+from .counters import adjust_pending_counters, pending_changes
+from .listing_cache import bump_generation
 from .messages import get_proposal_action_message
 
 
@@ -12,24 +18,91 @@ class ProposalAlreadyHandledError(Exception):
     pass
 
 
+def reject_competing_proposals(ad_ids, accepted_ids):
+    """
+    Отклоняет одним UPDATE все прочие ожидающие предложения,
+    в которых участвуют обменянные объявления.
+    Возвращает тройки (id, пользователь-отправитель,
+    пользователь-получатель) отклонённых предложений.
+    """
+    competing = list(
+        ExchangeProposal.objects.filter(
+            Q(ad_sender__in=ad_ids) | Q(ad_receiver__in=ad_ids),
+            status=StatusChoices.PENDING,
+        ).exclude(pk__in=accepted_ids).values_list(
+            'pk', 'ad_sender__user_id', 'ad_receiver__user_id')
+    )
+    ExchangeProposal.objects.filter(
+        pk__in=[pk for pk, _, _ in competing], status=StatusChoices.PENDING
+    ).update(status=StatusChoices.REJECTED, version=F('version') + 1)
+    record_status_changes(competing, StatusChoices.REJECTED)
+    return competing
+
+
+def mark_ads_exchanged(owners):
+    """
+    Помечает объявления обменянными одним UPDATE, сдвигая их версию
+    (ключ кэша карточек), и пишет изменение в журнал.
+    owners: {id объявления: id владельца}.
+    Возвращает число объявлений, которые ещё не были обменяны.
+    """
+    exchanged = Ad.objects.filter(
+        pk__in=list(owners), is_exchanged=False
+    ).update(is_exchanged=True, version=F('version') + 1)
+    record_changes(EntityChoices.AD, EventChoices.UPDATED, (
+        (pk, {'user': user, 'is_exchanged': True})
+        for pk, user in owners.items()
+    ))
+    bump_generation()
+    return exchanged
+
+
 @transaction.atomic
 def handle_proposal_action(proposal: ExchangeProposal, action: str, user):
-    """Бизнес-логика предложений обмена."""
+    """
+    Бизнес-логика предложений обмена.
+
+    Статус меняется условным UPDATE ... WHERE status='pending':
+    из параллельных запросов к одному предложению или объявлению
+    успешен только первый, остальные получают
+    ProposalAlreadyHandledError, а транзакция откатывается.
+    При принятии все прочие ожидающие предложения с участием
+    обменянных объявлений отклоняются в той же транзакции.
+    """
     if proposal.status != StatusChoices.PENDING:
         raise ProposalAlreadyHandledError(Message.PROPOSAL_ALREADY)
-    if proposal.ad_receiver.user != user:
+    if proposal.ad_receiver.user_id != user.id:
         raise PermissionDenied(Errors.ERROR_PROPOSAL)
     if action == 'accept':
-        proposal.status = StatusChoices.ACCEPTED
-        proposal.ad_sender.is_exchanged = True
-        proposal.ad_receiver.is_exchanged = True
-        proposal.ad_sender.save()
-        proposal.ad_receiver.save()
+        status = StatusChoices.ACCEPTED
     elif action == 'reject':
-        proposal.status = StatusChoices.REJECTED
+        status = StatusChoices.REJECTED
     else:
         raise ValueError(Message.UNKNOWN_ACTION)
-    proposal.save()
+
+    updated = ExchangeProposal.objects.filter(
+        pk=proposal.pk, status=StatusChoices.PENDING
+    ).update(status=status, version=F('version') + 1)
+    if not updated:
+        raise ProposalAlreadyHandledError(Message.PROPOSAL_ALREADY)
+    handled = [(
+        proposal.pk, proposal.ad_sender.user_id, proposal.ad_receiver.user_id
+    )]
+    record_status_changes(handled, status)
+    if status == StatusChoices.ACCEPTED:
+        exchanged = mark_ads_exchanged({
+            proposal.ad_sender_id: proposal.ad_sender.user_id,
+            proposal.ad_receiver_id: proposal.ad_receiver.user_id,
+        })
+        if exchanged != 2:
+            raise ProposalAlreadyHandledError(Message.PROPOSAL_ALREADY)
+        handled += reject_competing_proposals(
+            [proposal.ad_sender_id, proposal.ad_receiver_id], [proposal.pk])
+        proposal.ad_sender.is_exchanged = True
+        proposal.ad_receiver.is_exchanged = True
+    proposal.status = status
+    adjust_pending_counters(pending_changes(
+        [(sender, receiver) for _, sender, receiver in handled], -1))
 
 
 def process_proposal_action(proposal, action, user):
@@ -61,11 +134,95 @@ def process_proposal_action(proposal, action, user):
         }
 
 
+@transaction.atomic
+def bulk_process_proposals(items, user):
+    """
+    Пакетная обработка предложений: items — пары (id, действие).
+
+    Все предложения и владельцы объявлений читаются одним запросом,
+    статусы меняются несколькими UPDATE на весь пакет. Читаются
+    только предложения, в которых участвует user, поэтому о чужих
+    сообщается not_found, как и при обработке по одному.
+    Из принимаемых предложений с общими объявлениями принимается
+    первое, остальные получают результат already_handled.
+    Возвращает результаты в порядке items.
+    """
+    ids = [pk for pk, _ in items]
+    proposals = {
+        row[0]: row for row in ExchangeProposal.objects.select_for_update()
+        .filter(
+            Q(ad_sender__user=user) | Q(ad_receiver__user=user), pk__in=ids
+        ).values_list(
+            'pk', 'status', 'ad_sender_id', 'ad_receiver_id',
+            'ad_sender__user_id', 'ad_receiver__user_id',
+            'ad_sender__is_exchanged', 'ad_receiver__is_exchanged',
+        )
+    }
+    codes = []
+    seen = set()
+    rejected, accepted, exchanged = [], [], {}
+    for pk, action in items:
+        row = proposals.get(pk)
+        if pk in seen:
+            codes.append('duplicate')
+            continue
+        seen.add(pk)
+        if row is None:
+            codes.append('not_found')
+            continue
+        (_, status, sender_ad, receiver_ad, sender, receiver,
+         sender_exchanged, receiver_exchanged) = row
+        if action not in ('accept', 'reject'):
+            codes.append('invalid_action')
+        elif status != StatusChoices.PENDING:
+            codes.append('already_handled')
+        elif receiver != user.id:
+            codes.append('forbidden')
+        elif action == 'reject':
+            rejected.append((pk, sender, receiver))
+            codes.append('success')
+        elif (
+            sender_exchanged or receiver_exchanged
+            or {sender_ad, receiver_ad} & exchanged.keys()
+        ):
+            codes.append('already_handled')
+        else:
+            accepted.append((pk, sender, receiver))
+            exchanged.update({sender_ad: sender, receiver_ad: receiver})
+            codes.append('success')
+
+    ExchangeProposal.objects.filter(
+        pk__in=[pk for pk, _, _ in rejected], status=StatusChoices.PENDING
+    ).update(status=StatusChoices.REJECTED, version=F('version') + 1)
+    record_status_changes(rejected, StatusChoices.REJECTED)
+    handled = rejected + accepted
+    if accepted:
+        accepted_ids = [pk for pk, _, _ in accepted]
+        ExchangeProposal.objects.filter(
+            pk__in=accepted_ids, status=StatusChoices.PENDING
+        ).update(status=StatusChoices.ACCEPTED, version=F('version') + 1)
+        record_status_changes(accepted, StatusChoices.ACCEPTED)
+        mark_ads_exchanged(exchanged)
+        handled += reject_competing_proposals(list(exchanged), accepted_ids)
+    adjust_pending_counters(pending_changes(
+        [(sender, receiver) for _, sender, receiver in handled], -1))
+
+    return [
+        {
+            'id': pk,
+            'error': code != 'success',
+            'message': get_proposal_action_message(code, action),
+        }
+        for (pk, action), code in zip(items, codes)
+    ]
+
+
 class ProposalCreationError(Exception):
     """Кастомное исключение создания предложения обмена."""
     pass
 
 
+@transaction.atomic
 def create_exchange_proposal(user, ad_receiver_id, ad_sender):
     """Сервисная функция для создания предложения обмена."""
     ad_receiver = get_object_or_404(Ad, pk=ad_receiver_id, is_exchanged=False)
@@ -79,4 +236,7 @@ def create_exchange_proposal(user, ad_receiver_id, ad_sender):
         status=ConstStr.PENDING
     )
     proposal.save()
+    adjust_pending_counters(pending_changes(
+        [(ad_sender.user_id, ad_receiver.user_id)], 1
+    ))
     return proposal
@@ -0,0 +1,74 @@
+from rest_framework import serializers
+
+
+class QueryPlan:
+    """
+    Декларативный план загрузки кверисета: какие связи подтянуть
+    одним запросом и какие колонки читать из базы.
+    """
+
+    def __init__(self, select_related=(), prefetch_related=(), only=()):
+        self.select_related = tuple(select_related)
+        self.prefetch_related = tuple(prefetch_related)
+        self.only = tuple(only)
+
+    def __repr__(self):
+        return (
+            f'QueryPlan(select_related={self.select_related!r}, '
+            f'prefetch_related={self.prefetch_related!r}, '
+            f'only={self.only!r})'
+        )
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.only:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+    @classmethod
+    def for_serializer(cls, serializer_class, extra=()):
+        """
+        Строит план по полям сериализатора: вложенные сериализаторы
+        превращаются в select_related (списки — в prefetch_related),
+        остальные поля — в колонки only(). extra добавляет колонки,
+        нужные помимо вывода (сортировка, курсор пагинации).
+        """
+        select_related, prefetch_related, only = collect_serializer_fields(
+            serializer_class()
+        )
+        return cls(
+            select_related=dict.fromkeys(select_related),
+            prefetch_related=dict.fromkeys(prefetch_related),
+            only=dict.fromkeys([*only, *extra]),
+        )
+
+
+def collect_serializer_fields(serializer, prefix=''):
+    """
+    Возвращает пути для select_related, prefetch_related и only(),
+    которые читает сериализатор при выводе.
+    """
+    select_related, prefetch_related, only = [], [], []
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        parts = field.source.split('.')
+        path = prefix + '__'.join(parts)
+        if isinstance(field, serializers.ListSerializer):
+            prefetch_related.append(path)
+            continue
+        for depth in range(1, len(parts)):
+            parent = prefix + '__'.join(parts[:depth])
+            select_related.append(parent)
+            only.append(parent)
+        if isinstance(field, serializers.BaseSerializer):
+            nested = collect_serializer_fields(field, prefix=f'{path}__')
+            select_related += [path, *nested[0]]
+            prefetch_related += nested[1]
+            only += [path, *nested[2]]
+        else:
+            only.append(path)
+    return select_related, prefetch_related, only
@@ -0,0 +1,163 @@
+import copy
+from operator import itemgetter
+
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+
+from constants import Errors
+
+# Поля, у которых to_representation не меняет значение из базы.
+IDENTITY_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+    PrimaryKeyRelatedField,
+)
+
+
+class UnknownFieldsError(ValueError):
+    """Кастомное исключение неизвестных полей выборки или раскрытия."""
+    pass
+
+
+def convert_getter(column, convert):
+    def get(row):
+        value = row[column]
+        return None if value is None else convert(value)
+    return get
+
+
+def nested_getter(column, getters):
+    def get(row):
+        if row[column] is None:
+            return None
+        return {name: getter(row) for name, getter in getters}
+    return get
+
+
+def compile_nested(column, serializer):
+    """
+    Колонки и функция строки для вложенного сериализатора связи
+    column: его поля читаются через JOIN того же запроса.
+    """
+    entries = compile_fields(serializer, prefix=f'{column}__')
+    columns = [column]
+    for nested_columns, _ in entries.values():
+        columns += nested_columns
+    return columns, nested_getter(column, [
+        (name, getter) for name, (_, getter) in entries.items()
+    ])
+
+
+def compile_field(name, field, prefix=''):
+    if (
+        field.source == '*'
+        or isinstance(field, serializers.ListSerializer)
+        or isinstance(field, serializers.SerializerMethodField)
+    ):
+        raise ValueError(f'Поле {name!r} нельзя вывести из строки values().')
+    column = prefix + field.source.replace('.', '__')
+    if isinstance(field, serializers.BaseSerializer):
+        return compile_nested(column, field)
+    if isinstance(field, IDENTITY_FIELDS):
+        return [column], itemgetter(column)
+    return [column], convert_getter(column, field.to_representation)
+
+
+def compile_fields(serializer, prefix=''):
+    """
+    Для каждого поля вывода сериализатора возвращает колонки values()
+    и функцию строки, повторяющую to_representation. Поле без колонки
+    в базе (source='*', SerializerMethodField, списки)
+    не поддерживается.
+    """
+    return {
+        name: compile_field(name, field, prefix)
+        for name, field in serializer.fields.items()
+        if not field.write_only
+    }
+
+
+def split_names(value):
+    names = (name.strip() for name in (value or '').split(','))
+    return [name for name in names if name]
+
+
+class RowSerializer:
+    """
+    Вывод только для чтения по строкам values() вместо экземпляров
+    моделей: поля ModelSerializer один раз компилируются в функции
+    чтения колонок, поэтому на объект не создаются модель, поля
+    и вложенные сериализаторы. Результат совпадает с выводом
+    исходного сериализатора. extra добавляет колонки, нужные помимо
+    вывода (курсор пагинации, проверка владельца).
+
+    expand задаёт связи, которые клиент может раскрыть: имя поля
+    и сериализатор связанного объекта. select() строит копию
+    для выбранных полей и раскрытых связей.
+    """
+
+    def __init__(self, serializer_class, extra=(), expand=None):
+        self.serializer_class = serializer_class
+        self.extra = tuple(extra)
+        self.entries = compile_fields(serializer_class())
+        self.expansions = {
+            name: compile_nested(name, nested())
+            for name, nested in (expand or {}).items()
+        }
+        self.build(self.entries)
+
+    def __repr__(self):
+        return f'RowSerializer({self.serializer_class.__name__})'
+
+    def build(self, entries):
+        # id читается всегда: по нему пагинация и кэш списков
+        # узнают строку, даже если клиент не выбрал это поле.
+        self.getters = [
+            (name, getter) for name, (_, getter) in entries.items()
+        ]
+        columns = ['id']
+        for field_columns, _ in entries.values():
+            columns += field_columns
+        self.columns = tuple(dict.fromkeys([*columns, *self.extra]))
+
+    def select(self, fields=None, expand=None):
+        """
+        Копия для полей fields и раскрытых связей expand (имена через
+        запятую). Раскрытая связь заменяет поле с id или добавляется
+        в конец. Колонки невыбранных полей не читаются из базы.
+        """
+        fields, expand = split_names(fields), split_names(expand)
+        if not fields and not expand:
+            return self
+        unknown = [name for name in expand if name not in self.expansions]
+        entries = {
+            **self.entries,
+            **{name: self.expansions[name] for name in expand
+               if name in self.expansions},
+        }
+        unknown += [name for name in fields if name not in entries]
+        if unknown:
+            raise UnknownFieldsError(Errors.UNKNOWN_FIELDS.format(
+                fields=', '.join(unknown),
+                allowed=', '.join([*self.entries, *self.expansions]),
+            ))
+        if fields:
+            entries = {
+                name: entry for name, entry in entries.items()
+                if name in fields
+            }
+        selected = copy.copy(self)
+        selected.build(entries)
+        return selected
+
+    def values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def to_representation(self, row):
+        return {name: get(row) for name, get in self.getters}
+
+    def represent(self, rows):
+        getters = self.getters
+        return [{name: get(row) for name, get in getters} for row in rows]
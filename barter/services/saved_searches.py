@@ -0,0 +1,114 @@
+import unicodedata
+from collections import defaultdict
+from itertools import chain
+
+from ads.models import SavedSearch, SavedSearchMatch, SavedSearchTerm
+from constants import ConstNum
+from .ad_export import chunked
+from .search import TOKEN_RE, normalize_terms
+
+
+def fold(text):
+    """Сворачивает диакритику латиницы, как токенайзер индекса FTS5."""
+    return ''.join(
+        decomposed[0] if decomposed[0].isascii() else char
+        for char in text
+        for decomposed in (unicodedata.normalize('NFD', char),)
+    )
+
+
+def search_terms(search):
+    """Уникальные термы запроса в том виде, в каком их ищет поиск."""
+    return list(dict.fromkeys(
+        fold(term)[:ConstNum.SAVED_SEARCH_TERM_LENGTH]
+        for term in normalize_terms(search)
+    ))
+
+
+def ad_prefixes(ad):
+    """
+    Все префиксы слов заголовка и описания: терм поиска совпадает
+    с объявлением, если он равен одному из них.
+    """
+    words = set(TOKEN_RE.findall(
+        fold(f'{ad.title} {ad.description}'.casefold())))
+    return {
+        word[:length]
+        for word in words
+        for length in range(
+            1, min(len(word), ConstNum.SAVED_SEARCH_TERM_LENGTH) + 1)
+    }
+
+
+def index_saved_search(saved_search):
+    """
+    Перестраивает записи обратного индекса сохранённого поиска
+    после создания или изменения запроса.
+    """
+    terms = search_terms(saved_search.search)
+    saved_search.term_count = len(terms)
+    saved_search.save(update_fields=['term_count'])
+    saved_search.terms.all().delete()
+    SavedSearchTerm.objects.bulk_create(
+        SavedSearchTerm(saved_search=saved_search, term=term)
+        for term in terms
+    )
+    return saved_search
+
+
+def percolate(ads):
+    """
+    Сверяет новые объявления со всеми активными сохранёнными поисками
+    и ставит совпадения в ленту уведомлений владельцев поисков.
+
+    Поиски не перезапускаются: по префиксам слов объявлений из
+    обратного индекса выбираются поиски, все термы которых нашлись,
+    и поиски без текста с подходящими категорией и состоянием.
+    Возвращает число новых совпадений.
+    """
+    ads = [ad for ad in ads if not ad.is_exchanged]
+    if not ads:
+        return 0
+    prefixes = {ad.pk: ad_prefixes(ad) for ad in ads}
+    searches = {}
+    term_searches = defaultdict(set)
+    for batch in chunked(
+        sorted(set().union(*prefixes.values())),
+        ConstNum.SAVED_SEARCH_BATCH_SIZE
+    ):
+        rows = SavedSearchTerm.objects.filter(
+            term__in=batch, saved_search__is_active=True
+        ).values_list(
+            'term', 'saved_search_id', 'saved_search__user_id',
+            'saved_search__category', 'saved_search__condition',
+            'saved_search__term_count'
+        )
+        for term, pk, *search in rows:
+            term_searches[term].add(pk)
+            searches[pk] = search
+    termless = {
+        pk: search for pk, *search in SavedSearch.objects.filter(
+            term_count=0, is_active=True,
+            category__in=['', *{ad.category for ad in ads}],
+            condition__in=['', *{ad.condition for ad in ads}],
+        ).values_list('pk', 'user_id', 'category', 'condition', 'term_count')
+    }
+    searches.update(termless)
+    matches = []
+    for ad in ads:
+        found = defaultdict(int)
+        for prefix in prefixes[ad.pk]:
+            for pk in term_searches.get(prefix, ()):
+                found[pk] += 1
+        for pk in chain(found, termless):
+            user_id, category, condition, term_count = searches[pk]
+            if (
+                found.get(pk, 0) == term_count
+                and category in ('', ad.category)
+                and condition in ('', ad.condition)
+                and user_id != ad.user_id
+            ):
+                matches.append(SavedSearchMatch(
+                    saved_search_id=pk, ad_id=ad.pk, user_id=user_id))
+    SavedSearchMatch.objects.bulk_create(matches, ignore_conflicts=True)
+    return len(matches)
@@ -0,0 +1,202 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from constants import ConstNum, ConstStr
+
+FTS_TABLE = 'ads_ad_fts'
+
+TOKEN_RE = re.compile(r'\w+')
+
+INSTALL_STATEMENTS = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title,
+        description,
+        content='ads_ad',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON ads_ad
+    BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON ads_ad
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF title, description ON ads_ad
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+)
+
+UNINSTALL_STATEMENTS = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+_availability = {}
+
+
+def supports_search_index(conn=connection):
+    """Проверяет, что СУБД умеет строить полнотекстовый индекс FTS5."""
+    if conn.vendor != 'sqlite':
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        options = {row[0] for row in cursor.fetchall()}
+    return 'ENABLE_FTS5' in options
+
+
+def install_search_index(conn=connection, rebuild=True):
+    """
+    Создаёт виртуальную таблицу FTS5 и триггеры синхронизации с ads_ad.
+    Операция идемпотентна: существующие объекты не пересоздаются.
+    """
+    if not supports_search_index(conn):
+        return False
+    with conn.cursor() as cursor:
+        for statement in INSTALL_STATEMENTS:
+            cursor.execute(statement)
+        if rebuild:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+            )
+    _availability.pop(conn.settings_dict['NAME'], None)
+    return True
+
+
+def ensure_search_index(conn=connection):
+    """
+    Восстанавливает индекс, если его объекты отсутствуют: SQLite
+    удаляет триггеры при пересоздании таблицы ads_ad в миграциях.
+    """
+    if not supports_search_index(conn):
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(
+            'SELECT COUNT(*) FROM sqlite_master '
+            'WHERE name IN (%s, %s, %s, %s)',
+            (FTS_TABLE, f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad',
+             f'{FTS_TABLE}_au')
+        )
+        present = cursor.fetchone()[0]
+    if present == len(INSTALL_STATEMENTS):
+        return True
+    return install_search_index(conn)
+
+
+def uninstall_search_index(conn=connection):
+    """Удаляет поисковый индекс и триггеры."""
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        for statement in UNINSTALL_STATEMENTS:
+            cursor.execute(statement)
+    _availability.pop(conn.settings_dict['NAME'], None)
+
+
+def rebuild_search_index(conn=connection):
+    """Полностью перестраивает индекс по текущему содержимому ads_ad."""
+    return install_search_index(conn, rebuild=True)
+
+
+def search_index_available(conn=connection):
+    """
+    Возвращает True, если в текущей базе есть поисковый индекс.
+    Результат проверки кешируется на время жизни процесса.
+    """
+    key = conn.settings_dict['NAME']
+    if key not in _availability:
+        _availability[key] = (
+            conn.vendor == 'sqlite'
+            and FTS_TABLE in conn.introspection.table_names()
+        )
+    return _availability[key]
+
+
+def normalize_terms(text):
+    """
+    Разбивает строку на термы в нижнем регистре.
+    Диакритику дополнительно сворачивает токенайзер FTS5.
+    """
+    return TOKEN_RE.findall(text.casefold())[:ConstNum.SEARCH_MAX_TERMS]
+
+
+def build_match_expression(text):
+    """
+    Строит выражение MATCH: каждый терм ищется как префикс слова,
+    все термы должны присутствовать в заголовке или описании.
+    """
+    return ' '.join(f'"{term}"*' for term in normalize_terms(text))
+
+
+def normalize_search(search):
+    """
+    Приводит запрос к виду, в котором его выполняет поиск:
+    запросы с одинаковым результатом дают одну строку.
+    """
+    expression = build_match_expression(search)
+    if not expression or not search_index_available():
+        return search
+    return expression
+
+
+def search_ads(queryset, search):
+    """
+    Ограничивает кверисет объявлениями, подходящими под поисковый запрос.
+    При наличии индекса использует FTS5, иначе — icontains по полям.
+    """
+    expression = build_match_expression(search)
+    if not expression or not search_index_available():
+        return queryset.filter(
+            Q(title__icontains=search) | Q(description__icontains=search)
+        )
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        (expression,)
+    ))
+
+
+def rank_ads(queryset, search):
+    """
+    Ищет объявления и сортирует их по релевантности BM25.
+    Статистика термов берётся из индекса, заголовок весит больше описания.
+    Без индекса сортирует найденное по дате создания.
+    """
+    expression = build_match_expression(search)
+    if not expression or not search_index_available():
+        return search_ads(queryset, search).order_by('-created_at')
+    return queryset.extra(
+        select={
+            ConstStr.RELEVANCE: f'bm25({FTS_TABLE}, %s, %s)',
+        },
+        select_params=(
+            ConstNum.SEARCH_TITLE_WEIGHT,
+            ConstNum.SEARCH_DESCRIPTION_WEIGHT,
+        ),
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = ads_ad.id',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[expression],
+    ).order_by(ConstStr.RELEVANCE, '-created_at')
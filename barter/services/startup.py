@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+
+# Запуск воркера до первого ответа: настройка Django и загрузка URLconf.
+PROBE = '''
+import json
+import sys
+import time
+
+started = time.perf_counter()
+import django
+django.setup()
+configured = time.perf_counter()
+from django.urls import resolve
+resolve(sys.argv[1])
+print(json.dumps({
+    'setup_ms': (configured - started) * 1000,
+    'urlconf_ms': (time.perf_counter() - configured) * 1000,
+    'modules': sorted(sys.modules),
+}))
+'''
+
+
+def parse_importtime(lines):
+    """
+    Разбирает вывод python -X importtime: словарь модуль →
+    (собственное время, время с вложенными импортами) в миллисекундах.
+    """
+    imports = {}
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        if not own.strip().isdigit():
+            continue
+        imports[name.strip()] = (
+            int(own) / 1000, int(cumulative) / 1000)
+    return imports
+
+
+def group_by_package(imports):
+    """Собственное время импорта и число модулей по пакетам верхнего уровня."""
+    packages = defaultdict(lambda: [0.0, 0])
+    for name, (own, _) in imports.items():
+        package = packages[name.split('.')[0]]
+        package[0] += own
+        package[1] += 1
+    return sorted(
+        ((name, own, count) for name, (own, count) in packages.items()),
+        key=lambda row: row[1], reverse=True
+    )
+
+
+def profile_startup(path='/api/ads/'):
+    """
+    Запускает новый процесс Python с -X importtime, настраивает
+    Django и загружает URLconf разрешением path. Возвращает
+    сводку (время настройки, загрузки URLconf, список модулей)
+    и время импорта по модулям.
+    """
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'barter.settings'),
+    }
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE, path],
+        capture_output=True, text=True, env=env, cwd=settings.BASE_DIR,
+        check=True
+    )
+    summary = json.loads(result.stdout.splitlines()[-1])
+    return summary, parse_importtime(result.stderr.splitlines())
@@ -0,0 +1,369 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import (
+    Count, Exists, F, Max, Min, OuterRef, Q, Window
+)
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from ads.models import (
+    Ad, ChangeEvent, EntityChoices, EventChoices, ExchangeProposal,
+    JobCheckpoint, TradeProfile, TradeSuggestion
+)
+from constants import ConstNum, ConstStr
+from .ad_export import chunked
+from .change_feed import settled_changes
+
+User = get_user_model()
+
+JOB_NAME = 'trade_suggestions'
+RECENCY_RATE = math.log(2) / (ConstNum.SUGGESTIONS_HALF_LIFE_DAYS * 86400)
+
+
+def recency(created_at):
+    """
+    Вклад свежести в логарифм оценки: вес объявления падает вдвое
+    за SUGGESTIONS_HALF_LIFE_DAYS. Со временем оценки всех объявлений
+    сдвигаются одинаково, поэтому сохранённый порядок не устаревает.
+    """
+    return created_at.timestamp() * RECENCY_RATE
+
+
+def affinity(profile, category, condition):
+    """Логарифм интереса пользователя к категории и состоянию."""
+    categories, conditions = profile
+    return math.log(
+        (categories.get(category, 0) + ConstNum.SUGGESTIONS_CATEGORY_PRIOR)
+        * (conditions.get(condition, 0) + ConstNum.SUGGESTIONS_CONDITION_PRIOR)
+    )
+
+
+def shares(counter):
+    total = sum(counter.values())
+    if not total:
+        return {}
+    return {key: value / total for key, value in counter.items()}
+
+
+def active_users():
+    """
+    Пользователи, для которых поддерживаются рекомендации:
+    заходившие на сайт, зарегистрированные или предлагавшие обмен
+    за последние SUGGESTIONS_ACTIVE_DAYS дней.
+    """
+    since = timezone.now() - timedelta(days=ConstNum.SUGGESTIONS_ACTIVE_DAYS)
+    return User.objects.filter(is_active=True).filter(
+        Q(last_login__gte=since)
+        | Q(date_joined__gte=since)
+        | Exists(ExchangeProposal.objects.filter(
+            ad_sender__user=OuterRef('pk'), created_at__gte=since))
+    )
+
+
+def build_profiles(user_ids):
+    """
+    Доли категорий и состояний, интересных пользователям: объявления,
+    на которые они предлагали обмен, и принятые ими предложения.
+    Два запроса с GROUP BY на пачку пользователей.
+    """
+    categories = defaultdict(Counter)
+    conditions = defaultdict(Counter)
+    history = (
+        (ExchangeProposal.objects.filter(ad_sender__user__in=user_ids),
+         'ad_sender__user', 'ad_receiver'),
+        (ExchangeProposal.objects.filter(
+            ad_receiver__user__in=user_ids, status=ConstStr.ACCEPTED),
+         'ad_receiver__user', 'ad_sender'),
+    )
+    for queryset, user_field, ad_field in history:
+        fields = (
+            user_field, f'{ad_field}__{ConstStr.CATEGORY}',
+            f'{ad_field}__{ConstStr.CONDITION}'
+        )
+        rows = queryset.order_by().values(*fields).annotate(
+            total=Count('pk')).values_list(*fields, 'total')
+        for user_id, category, condition, total in rows:
+            categories[user_id][category] += total
+            conditions[user_id][condition] += total
+    return {
+        user_id: (shares(categories[user_id]), shares(conditions[user_id]))
+        for user_id in user_ids
+    }
+
+
+def pending_targets(filters):
+    """Объявления, на которые пользователи уже ждут ответа."""
+    targets = defaultdict(set)
+    rows = ExchangeProposal.objects.filter(
+        status=ConstStr.PENDING, **filters
+    ).order_by().values_list('ad_sender__user', 'ad_receiver_id')
+    for user_id, ad_id in rows:
+        targets[user_id].add(ad_id)
+    return targets
+
+
+def candidate_buckets(depth):
+    """
+    Самые свежие depth необменянных объявлений в каждой паре
+    (категория, состояние) одним запросом с оконной функцией.
+    Оценка внутри пары зависит только от свежести, поэтому лучшие
+    объявления пользователя всегда находятся в начале списков пар.
+    """
+    ranked = Ad.objects.filter(is_exchanged=False).annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=[F(ConstStr.CATEGORY), F(ConstStr.CONDITION)],
+            order_by=[F(ConstStr.CREATED_AT).desc(), F('id').desc()]
+        )
+    ).filter(position__lte=depth).values_list(
+        'id', 'user_id', ConstStr.CATEGORY, ConstStr.CONDITION,
+        ConstStr.CREATED_AT
+    )
+    buckets = defaultdict(list)
+    for pk, owner, category, condition, created_at in ranked:
+        buckets[(category, condition)].append(
+            (recency(created_at), pk, owner))
+    for ads in buckets.values():
+        ads.sort(reverse=True)
+    return buckets
+
+
+def scored(ads, base, user_id, excluded):
+    for fresh, pk, owner in ads:
+        if owner != user_id and pk not in excluded:
+            yield base + fresh, pk
+
+
+def rank_ads(user_id, profile, buckets, excluded):
+    """
+    Лучшие SUGGESTIONS_PER_USER пар (оценка, id объявления):
+    слияние отсортированных списков пар без полной сортировки.
+    """
+    streams = [
+        scored(ads, affinity(profile, category, condition), user_id, excluded)
+        for (category, condition), ads in buckets.items()
+    ]
+    return list(islice(
+        heapq.merge(*streams, reverse=True), ConstNum.SUGGESTIONS_PER_USER))
+
+
+def threshold(ranked):
+    if len(ranked) < ConstNum.SUGGESTIONS_PER_USER:
+        return None
+    return ranked[-1][0]
+
+
+def refresh_users(user_ids, buckets):
+    """
+    Полностью пересчитывает рекомендации и профили пользователей
+    пачками по SUGGESTIONS_BATCH_SIZE.
+    """
+    for batch in chunked(sorted(user_ids), ConstNum.SUGGESTIONS_BATCH_SIZE):
+        profiles = build_profiles(batch)
+        targets = pending_targets({'ad_sender__user__in': batch})
+        suggestions, records = [], []
+        for user_id in batch:
+            ranked = rank_ads(
+                user_id, profiles[user_id], buckets, targets[user_id])
+            suggestions.extend(
+                TradeSuggestion(user_id=user_id, ad_id=pk, score=score)
+                for score, pk in ranked
+            )
+            categories, conditions = profiles[user_id]
+            records.append(TradeProfile(
+                user_id=user_id, categories=categories,
+                conditions=conditions, threshold=threshold(ranked)
+            ))
+        with transaction.atomic():
+            TradeSuggestion.objects.filter(user__in=batch).delete()
+            TradeSuggestion.objects.bulk_create(suggestions)
+            TradeProfile.objects.bulk_create(
+                records, update_conflicts=True, unique_fields=['user'],
+                update_fields=[
+                    'categories', 'conditions', 'threshold', 'updated_at']
+            )
+
+
+def trim(user_ids):
+    """
+    Оставляет пользователям по SUGGESTIONS_PER_USER лучших
+    рекомендаций и обновляет пороги профилей.
+    """
+    limit = ConstNum.SUGGESTIONS_PER_USER
+    for batch in chunked(sorted(user_ids), ConstNum.SUGGESTIONS_BATCH_SIZE):
+        extra = TradeSuggestion.objects.filter(user__in=batch).annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=[F('user')],
+                order_by=[F('score').desc(), F('ad').desc()]
+            )
+        ).filter(position__gt=limit).values_list('pk', flat=True)
+        TradeSuggestion.objects.filter(pk__in=list(extra)).delete()
+        stats = {
+            user_id: (total, lowest) for user_id, total, lowest in
+            TradeSuggestion.objects.filter(user__in=batch).order_by()
+            .values('user').annotate(total=Count('pk'), lowest=Min('score'))
+            .values_list('user', 'total', 'lowest')
+        }
+        profiles = list(TradeProfile.objects.filter(user__in=batch))
+        for profile in profiles:
+            total, lowest = stats.get(profile.user_id, (0, None))
+            profile.threshold = lowest if total >= limit else None
+        TradeProfile.objects.bulk_update(profiles, ['threshold'])
+
+
+def candidate_profiles(ads):
+    """
+    Профили активных пользователей, в чьи списки может попасть
+    хотя бы одно из объявлений ads: с неполным списком (без порога),
+    с интересом к категории одного из объявлений или с порогом ниже
+    наибольшей оценки, которую объявление получает без интереса
+    к категории. Остальные профили не читаются и не оцениваются.
+    """
+    categories = sorted({ad[2] for ad in ads})
+    uninterested = math.log(
+        ConstNum.SUGGESTIONS_CATEGORY_PRIOR
+        * (1 + ConstNum.SUGGESTIONS_CONDITION_PRIOR)
+    ) + max(recency(ad[4]) for ad in ads)
+    return TradeProfile.objects.filter(
+        Q(threshold__isnull=True)
+        | Q(categories__has_any_keys=categories)
+        | Q(threshold__lt=uninterested),
+        user__in=active_users(),
+    ).values_list('user_id', 'categories', 'conditions', 'threshold')
+
+
+def apply_ads(ad_ids, skip_users):
+    """
+    Добавляет новые или изменённые объявления в рекомендации
+    активных пользователей с готовыми профилями без полного
+    пересчёта: объявление попадает в список, если его оценка выше
+    порога. Оцениваются только профили из candidate_profiles.
+    Возвращает пользователей, чьи списки изменились.
+    """
+    ads = list(Ad.objects.filter(
+        pk__in=ad_ids, is_exchanged=False
+    ).values_list(
+        'id', 'user_id', ConstStr.CATEGORY, ConstStr.CONDITION,
+        ConstStr.CREATED_AT
+    ))
+    if not ads:
+        return set()
+    targets = pending_targets({'ad_receiver__in': ad_ids})
+    suggestions = []
+    profiles = candidate_profiles(ads).iterator(
+        chunk_size=ConstNum.SUGGESTIONS_BATCH_SIZE)
+    for user_id, categories, conditions, lowest in profiles:
+        if user_id in skip_users:
+            continue
+        for pk, owner, category, condition, created_at in ads:
+            if owner == user_id or pk in targets[user_id]:
+                continue
+            score = affinity(
+                (categories, conditions), category, condition
+            ) + recency(created_at)
+            if lowest is None or score > lowest:
+                suggestions.append(TradeSuggestion(
+                    user_id=user_id, ad_id=pk, score=score))
+    touched = {suggestion.user_id for suggestion in suggestions}
+    with transaction.atomic():
+        TradeSuggestion.objects.bulk_create(
+            suggestions, ignore_conflicts=True,
+            batch_size=ConstNum.SUGGESTIONS_BATCH_SIZE
+        )
+        trim(touched)
+    return touched
+
+
+def short_lists():
+    """
+    Пользователи, чей полный список сократился после удаления
+    объявлений: их нужно пересчитать, чтобы дополнить список.
+    """
+    return set(TradeProfile.objects.filter(
+        threshold__isnull=False
+    ).annotate(
+        total=Count('user__trade_suggestions')
+    ).filter(
+        total__lt=ConstNum.SUGGESTIONS_PER_USER
+    ).values_list('user_id', flat=True))
+
+
+def collect_changes(cursor, last):
+    """
+    Разбирает журнал изменений после cursor: участники предложений
+    с новыми событиями, созданные и изменённые объявления,
+    были ли удаления.
+    """
+    users, created, updated, deleted = set(), set(), set(), False
+    events = ChangeEvent.objects.filter(
+        id__gt=cursor, id__lte=last
+    ).values_list('entity', 'object_id', 'event', 'payload')
+    for entity, object_id, event, payload in events.iterator():
+        if entity == EntityChoices.PROPOSAL:
+            users.update((
+                payload.get('sender_user'), payload.get('receiver_user')))
+        elif event == EventChoices.DELETED:
+            deleted = True
+        elif event == EventChoices.UPDATED:
+            updated.add(object_id)
+        else:
+            created.add(object_id)
+    users.discard(None)
+    return users, created, updated, deleted
+
+
+def refresh_suggestions(full=False):
+    """
+    Обновляет рекомендации по журналу изменений с прошлого запуска.
+
+    Пересчитываются только пользователи, чья история предложений
+    изменилась, новые активные пользователи и те, у кого из списка
+    выпали изменённые или удалённые объявления. Новые объявления
+    добавляются в готовые списки сравнением с порогом профиля.
+    Первый запуск и full=True пересчитывают всех активных.
+    """
+    checkpoint, created = JobCheckpoint.objects.get_or_create(name=JOB_NAME)
+    last = settled_changes().aggregate(last=Max('id'))['last'] or 0
+    full = full or created
+    stats = {'full': full, 'users': 0, 'ads': 0}
+    if full:
+        TradeSuggestion.objects.exclude(user__in=active_users()).delete()
+        TradeProfile.objects.exclude(user__in=active_users()).delete()
+        dirty = set(active_users().values_list('pk', flat=True))
+    else:
+        dirty, new_ads, updated, deleted = collect_changes(
+            checkpoint.cursor, last)
+        for batch in chunked(sorted(updated), ConstNum.SUGGESTIONS_BATCH_SIZE):
+            holders = TradeSuggestion.objects.filter(ad__in=batch)
+            dirty.update(holders.values_list('user_id', flat=True))
+            holders.delete()
+        if deleted:
+            dirty.update(short_lists())
+        dirty.update(active_users().filter(
+            trade_profile__isnull=True).values_list('pk', flat=True))
+        dirty = {
+            user_id
+            for batch in chunked(
+                sorted(dirty), ConstNum.SUGGESTIONS_BATCH_SIZE)
+            for user_id in active_users().filter(
+                pk__in=batch).values_list('pk', flat=True)
+        }
+        for batch in chunked(
+            sorted(new_ads | updated), ConstNum.SUGGESTIONS_BATCH_SIZE
+        ):
+            stats['ads'] += len(batch)
+            apply_ads(batch, dirty)
+    if dirty:
+        refresh_users(dirty, candidate_buckets(
+            2 * ConstNum.SUGGESTIONS_PER_USER))
+    stats['users'] = len(dirty)
+    checkpoint.cursor = last
+    checkpoint.save()
+    return stats
@@ -1,10 +1,51 @@
 import pytest
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from rest_framework.test import APIClient
 
 from ads.models import Ad, ExchangeProposal
 from constants import ConstStr
+from services.exchange_cycles import exchange_graph
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(
+    django_db_modify_db_settings_parallel_suffix, tmp_path_factory
+):
+    """
+    Тестовая база SQLite хранится в файле: параллельные потоки
+    стресс-тестов работают с ней через обычные блокировки SQLite,
+    как процессы приложения с рабочей базой.
+    """
+    settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = str(
+        tmp_path_factory.mktemp('db') / 'test.sqlite3')
+
+
+@pytest.fixture(autouse=True)
+def strict_query_budgets(settings):
+    """Превышение бюджета SQL-запросов в тестах приводит к ошибке."""
+    settings.QUERY_BUDGET_RAISE = True
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Очищает кэш, чтобы выборки не переходили между тестами."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_exchange_graph():
+    """
+    Сбрасывает граф обменов: после отката транзакции теста
+    id событий журнала используются повторно.
+    """
+    exchange_graph.clear()
+    yield
+    exchange_graph.clear()
 
 
 @pytest.fixture
@@ -1,6 +1,31 @@
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import timedelta
+from decimal import Decimal
+
 import pytest
-from ads.models import ExchangeProposal
-from constants import ConstStr
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+
+from ads.models import Ad, ChangeEvent, ExchangeProposal, ProposalCounter
+from api import renderers, schema
+from api.renderers import FastJSONRenderer, StreamingJSONRenderer
+from constants import ConstNum, ConstStr, Errors
+from services.counters import reconcile_all_counters
+from services.exchange_cycles import exchange_graph
+from services.proposal_service import (
+    create_exchange_proposal, handle_proposal_action
+)
 
 
 @pytest.mark.django_db
@@ -58,6 +83,38 @@ def test_create_exchange_proposal(auth_client, ad1, ad2):
     assert ExchangeProposal.objects.count() == 1
 
 
+@pytest.mark.django_db
+def test_update_proposal_keeps_counters(
+    auth_client, user1, user2, ad1, ad2
+):
+    """
+    PATCH не меняет статус предложения в обход accept/reject,
+    а смена объявления переносит предложение в счётчиках.
+    """
+    proposal = create_exchange_proposal(user1, ad2.id, ad1)
+    response = auth_client.patch(
+        f'/api/proposals/{proposal.id}/', {'status': ConstStr.ACCEPTED})
+    assert response.status_code == 200
+    proposal.refresh_from_db()
+    assert proposal.status == ConstStr.PENDING
+    counters = dict(ProposalCounter.objects.values_list(
+        'user_id', 'pending_received'))
+    assert counters[user2.id] == 1
+
+    user3 = User.objects.create_user(username='user3', password='pass')
+    coat = Ad.objects.create(
+        user=user3, title='Куртка', description='Зимняя',
+        category='clothes', condition='used'
+    )
+    response = auth_client.patch(
+        f'/api/proposals/{proposal.id}/', {'ad_receiver': coat.id})
+    assert response.status_code == 200
+    counters = dict(ProposalCounter.objects.values_list(
+        'user_id', 'pending_received'))
+    assert counters[user2.id] == 0 and counters[user3.id] == 1
+    assert reconcile_all_counters() == 0
+
+
 @pytest.mark.django_db
 def test_accept_proposal(api_client, user2, exchange_proposal):
     """
@@ -86,3 +143,787 @@ def test_reject_proposal(api_client, user2, exchange_proposal):
 
     assert response.status_code == 200
     assert exchange_proposal.status == ConstStr.REJECTED
+
+
+@pytest.mark.django_db
+def test_ads_ordering_by_relevance(auth_client, user1, ad1):
+    """
+    Проверяет сортировку ordering=relevance: объявление с совпадением
+    в заголовке идёт первым, несмотря на более позднее создание другого.
+    """
+    Ad.objects.create(
+        user=user1, title='Табурет', description='Под стол подходит',
+        category='furniture', condition='used'
+    )
+    response = auth_client.get('/api/ads/?search=стол&ordering=relevance')
+    titles = [ad['title'] for ad in response.data['results']]
+    assert titles == [ad1.title, 'Табурет']
+
+
+@pytest.mark.django_db
+def test_ads_cursor_pagination(auth_client, user1):
+    """
+    Проверяет курсорную пагинацию: проход вперёд и назад по страницам
+    с сохранением фильтров и без дублей на границах страниц.
+    """
+    for number in range(25):
+        Ad.objects.create(
+            user=user1, title=f'Книга {number}', description='Бумажная',
+            category='books', condition='used'
+        )
+    Ad.objects.create(
+        user=user1, title='Лампа', description='Настольная',
+        category='electronics', condition='new'
+    )
+    response = auth_client.get('/api/ads/?category=books')
+    assert 'count' not in response.data
+    assert response.data['previous'] is None
+    seen = [ad['id'] for ad in response.data['results']]
+    pages = [seen]
+    while response.data['next']:
+        assert 'category=books' in response.data['next']
+        response = auth_client.get(response.data['next'])
+        pages.append([ad['id'] for ad in response.data['results']])
+        seen += pages[-1]
+    expected = list(
+        Ad.objects.filter(category='books')
+        .order_by('-created_at', '-id').values_list('id', flat=True)
+    )
+    assert seen == expected
+    response = auth_client.get(response.data['previous'])
+    assert [ad['id'] for ad in response.data['results']] == pages[1]
+
+
+@pytest.mark.django_db
+def test_ads_page_number_pagination_opt_in(auth_client, ad1, ad2):
+    """Параметр page включает прежнюю постраничную пагинацию с count."""
+    response = auth_client.get('/api/ads/?page=1')
+    assert response.data['count'] == 2
+
+
+@pytest.mark.django_db
+def test_ads_invalid_cursor(auth_client, ad1):
+    """Повреждённый курсор возвращает 404."""
+    response = auth_client.get('/api/ads/?cursor=broken')
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_proposals_list_query_count_is_constant(
+    api_client, user1, user2, ad1
+):
+    """
+    Проверяет, что список предложений в API выполняет одно и то же
+    число запросов при 2 и при 8 предложениях на странице.
+    """
+    api_client.force_authenticate(user=user1)
+    counts = []
+    for number in range(8):
+        ad = Ad.objects.create(
+            user=user2, title=f'Лампа {number}', description='Новая',
+            category='electronics', condition='new'
+        )
+        ExchangeProposal.objects.create(ad_sender=ad1, ad_receiver=ad)
+        if number + 1 in (2, 8):
+            with CaptureQueriesContext(connection) as queries:
+                response = api_client.get('/api/proposals/')
+            assert len(response.data['results']) == number + 1
+            counts.append(len(queries))
+    assert counts == [2, 2]
+
+
+@pytest.mark.django_db
+def test_ads_list_query_count_is_constant(auth_client, user1):
+    """
+    Проверяет, что список объявлений в API укладывается в 2 запроса
+    и при 2, и при 10 объявлениях на странице.
+    """
+    counts = []
+    for number in range(10):
+        Ad.objects.create(
+            user=user1, title=f'Стул {number}', description='Деревянный',
+            category='furniture', condition='used'
+        )
+        if number + 1 in (2, 10):
+            with CaptureQueriesContext(connection) as queries:
+                response = auth_client.get('/api/ads/')
+            assert len(response.data['results']) == number + 1
+            counts.append(len(queries))
+    assert counts == [2, 2]
+
+
+@pytest.mark.django_db
+def test_ads_list_cache_hit_and_invalidation(
+    auth_client, django_assert_num_queries, user1, ad1
+):
+    """
+    Повторный запрос того же списка загружает страницу одним запросом
+    по id, а новое объявление сразу появляется в выдаче.
+    """
+    auth_client.get('/api/ads/?category=Furniture')
+    with django_assert_num_queries(1):
+        response = auth_client.get('/api/ads/?category=furniture')
+    assert [ad['id'] for ad in response.data['results']] == [ad1.id]
+    ad = Ad.objects.create(
+        user=user1, title='Шкаф', description='Платяной',
+        category='furniture', condition='used'
+    )
+    response = auth_client.get('/api/ads/?category=furniture')
+    assert [ad['id'] for ad in response.data['results']] == [ad.id, ad1.id]
+
+
+@pytest.mark.django_db
+def test_ads_page_number_cache_keeps_order(auth_client, user1, ad1, ad2):
+    """Закэшированная страница постраничного режима сохраняет порядок."""
+    first = auth_client.get('/api/ads/?page=1&ordering=title')
+    second = auth_client.get('/api/ads/?page=1&ordering=title')
+    assert second.data == first.data
+    assert [ad['title'] for ad in second.data['results']] == ['Лампа', 'Стол']
+
+
+@pytest.mark.django_db
+def test_ads_facets_single_query(
+    api_client, django_assert_num_queries, user1, ad1, ad2
+):
+    """
+    Проверяет фасеты API: счётчики по категории учитывают выбранное
+    состояние, по состоянию — выбранную категорию; всё одним запросом.
+    """
+    Ad.objects.create(
+        user=user1, title='Шкаф', description='Платяной',
+        category='furniture', condition='new'
+    )
+    with django_assert_num_queries(1):
+        response = api_client.get(
+            '/api/ads/facets/?category=furniture&condition=new')
+    categories = {f['value']: f['count'] for f in response.data['category']}
+    conditions = {f['value']: f['count'] for f in response.data['condition']}
+    assert categories['furniture'] == 1
+    assert categories['electronics'] == 1
+    assert conditions == {'new': 1, 'used': 1}
+    with django_assert_num_queries(0):
+        api_client.get('/api/ads/facets/?category=electronics')
+
+
+def post_bulk_actions(client, receiver_ad, sender_user, size):
+    """
+    Создаёт size предложений sender_user к receiver_ad и отправляет
+    пакет: первые два принимаются, остальные отклоняются.
+    Возвращает предложения, ответ и число SQL-запросов.
+    """
+    proposals = []
+    for number in range(size):
+        ad = Ad.objects.create(
+            user=sender_user, title=f'Книга {number}',
+            description='Бумажная', category='books', condition='used'
+        )
+        proposals.append(ExchangeProposal.objects.create(
+            ad_sender=ad, ad_receiver=receiver_ad))
+    items = [
+        {'id': proposals[0].id, 'action': 'accept'},
+        {'id': proposals[1].id, 'action': 'accept'},
+        *({'id': p.id, 'action': 'reject'} for p in proposals[2:]),
+    ]
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(
+            '/api/proposals/bulk/', {'items': items}, format='json')
+    return proposals, response, len(queries)
+
+
+@pytest.mark.django_db
+def test_bulk_proposal_actions(api_client, user1, user2, ad1, ad2):
+    """
+    Проверяет пакетную обработку: результаты по каждому предложению,
+    чужие и отсутствующие предложения не меняются.
+    """
+    lamp = Ad.objects.create(
+        user=user2, title='Торшер', description='Напольный',
+        category='electronics', condition='used'
+    )
+    foreign = ExchangeProposal.objects.create(
+        ad_sender=lamp, ad_receiver=ad1)
+    user3 = User.objects.create_user(username='user3', password='pass3')
+    chair = Ad.objects.create(
+        user=user3, title='Кресло', description='Мягкое',
+        category='furniture', condition='used'
+    )
+    unrelated = ExchangeProposal.objects.create(
+        ad_sender=chair, ad_receiver=ad1)
+    api_client.force_authenticate(user=user2)
+    proposals, response, _ = post_bulk_actions(api_client, ad2, user1, 12)
+    assert response.status_code == 200
+    errors = [result['error'] for result in response.data['results']]
+    assert errors == [False, True] + [False] * 10
+    response = api_client.post('/api/proposals/bulk/', {'items': [
+        {'id': foreign.id, 'action': 'reject'},
+        {'id': unrelated.id, 'action': 'reject'},
+        {'id': 0, 'action': 'reject'},
+    ]}, format='json')
+    messages = [result['message'] for result in response.data['results']]
+    assert messages == [
+        Errors.ERROR_PROPOSAL,
+        Errors.PROPOSAL_NOT_FOUND,
+        Errors.PROPOSAL_NOT_FOUND,
+    ]
+    statuses = dict(ExchangeProposal.objects.values_list('id', 'status'))
+    assert statuses[proposals[0].id] == ConstStr.ACCEPTED
+    assert statuses[proposals[1].id] == ConstStr.REJECTED
+    assert statuses[foreign.id] == ConstStr.PENDING
+    assert statuses[unrelated.id] == ConstStr.PENDING
+
+
+@pytest.mark.django_db
+def test_bulk_proposal_actions_constant_queries(api_client, user1, user2):
+    """Число запросов пакетной обработки не зависит от размера пакета."""
+    api_client.force_authenticate(user=user2)
+    counts = []
+    for size in (3, 30):
+        receiver_ad = Ad.objects.create(
+            user=user2, title='Лампа', description='Светодиодная',
+            category='electronics', condition='new'
+        )
+        _, response, count = post_bulk_actions(
+            api_client, receiver_ad, user1, size)
+        assert response.status_code == 200
+        counts.append(count)
+    assert counts[0] == counts[1]
+
+
+@pytest.mark.django_db
+def test_bulk_proposal_actions_validation(api_client, user2):
+    """Проверяет, что неизвестное действие отклоняет весь пакет."""
+    api_client.force_authenticate(user=user2)
+    response = api_client.post(
+        '/api/proposals/bulk/',
+        {'items': [{'id': 1, 'action': 'delete'}]}, format='json'
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_bulk_create_ads_streaming(auth_client, user1):
+    """
+    Проверяет массовое создание из JSON Lines: корректные строки
+    создаются и находятся поиском, ошибки возвращаются по номерам строк.
+    """
+    body = '\n'.join([
+        '{"title": "Самокат", "description": "Детский", '
+        '"category": "toys", "condition": "used"}',
+        '{"title": "Без категории", "description": "Нет"}',
+        'не json',
+        '{"title": "Куртка", "description": "Зимняя", '
+        '"category": "clothes", "condition": "new"}',
+    ])
+    response = auth_client.post(
+        '/api/ads/bulk/', body, content_type='application/x-ndjson')
+    assert response.status_code == 201
+    assert response.data['created'] == 2
+    assert [error['row'] for error in response.data['errors']] == [2, 3]
+    assert 'category' in response.data['errors'][0]['errors']
+    assert Ad.objects.filter(user=user1).count() == 2
+    response = auth_client.get('/api/ads/?search=самокат')
+    assert [ad['title'] for ad in response.data['results']] == ['Самокат']
+
+
+@pytest.mark.django_db
+def test_bulk_create_ads_csv(auth_client, user1):
+    """Проверяет массовое создание из CSV с заголовком."""
+    body = (
+        'title,description,category,condition,image_url\n'
+        'Книга,Бумажная,books,used,\n'
+        'Лампа,Настольная,electronics,wrong,\n'
+    )
+    response = auth_client.post(
+        '/api/ads/bulk/', body, content_type='text/csv')
+    assert response.data['created'] == 1
+    assert response.data['errors'][0]['row'] == 3
+
+
+@pytest.mark.django_db
+def test_export_ads_stream(api_client, ad1, ad2):
+    """
+    Проверяет потоковую выгрузку: NDJSON по объекту на строку
+    с учётом фильтров и CSV с заголовком.
+    """
+    response = api_client.get('/api/ads/export/?category=furniture')
+    assert response.streaming
+    assert response['Content-Type'] == 'application/x-ndjson'
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert [json.loads(line)['title'] for line in lines] == [ad1.title]
+
+    response = api_client.get('/api/ads/export/?output=csv')
+    rows = list(csv.DictReader(io.StringIO(
+        b''.join(response.streaming_content).decode())))
+    assert {row['title'] for row in rows} == {ad1.title, ad2.title}
+    assert rows[0]['user__username'] in {'user1', 'user2'}
+
+    response = api_client.get('/api/ads/export/?output=json')
+    assert response['Content-Type'] == 'application/json'
+    ads = json.loads(b''.join(response.streaming_content))
+    assert {ad['title'] for ad in ads} == {ad1.title, ad2.title}
+
+    response = api_client.get('/api/ads/export/?output=xml')
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_change_feed_incremental_sync(api_client, user1, user2, ad1, ad2):
+    """
+    Проверяет журнал изменений: события выдаются пачками после курсора,
+    без новых изменений курсор не меняется, чужие предложения скрыты.
+    """
+    create_exchange_proposal(user1, ad2.id, ad1)
+    api_client.force_authenticate(user=user2)
+    response = api_client.get('/api/changes/?limit=2')
+    first = response.data['results']
+    assert [(e['entity'], e['event']) for e in first] == [
+        ('ad', 'created'), ('ad', 'created')]
+    assert response.data['has_more'] is True
+    response = api_client.get(
+        '/api/changes/', {'since': response.data['next']})
+    assert [(e['entity'], e['event']) for e in response.data['results']] == [
+        ('proposal', 'created')]
+    cursor = response.data['next']
+    response = api_client.get('/api/changes/', {'since': cursor})
+    assert response.data['results'] == []
+    assert response.data['next'] == cursor
+
+    ad2.delete()
+    response = api_client.get('/api/changes/', {'since': cursor})
+    events = {(e['entity'], e['event']) for e in response.data['results']}
+    assert events == {('proposal', 'deleted'), ('ad', 'deleted')}
+
+    outsider = User.objects.create_user(username='user3', password='pass')
+    api_client.force_authenticate(user=outsider)
+    response = api_client.get('/api/changes/?entity=proposal')
+    assert response.data['results'] == []
+
+
+@pytest.mark.django_db
+def test_change_feed_records_proposal_status(
+    api_client, user1, user2, ad1, ad2
+):
+    """Принятие предложения пишет смену статуса и обмен объявлений."""
+    proposal = create_exchange_proposal(user1, ad2.id, ad1)
+    api_client.force_authenticate(user=user1)
+    cursor = api_client.get('/api/changes/').data['next']
+    handle_proposal_action(proposal, 'accept', user2)
+    response = api_client.get('/api/changes/', {'since': cursor})
+    events = [
+        (e['entity'], e['object_id'], e['event'])
+        for e in response.data['results']
+    ]
+    assert events == [
+        ('proposal', proposal.id, 'status_changed'),
+        ('ad', ad1.id, 'updated'),
+        ('ad', ad2.id, 'updated'),
+    ]
+    assert response.data['results'][0]['payload']['status'] == 'accepted'
+
+
+@pytest.mark.django_db
+def test_change_feed_settle_window(api_client, settings, user1, user2, ad1):
+    """
+    С окном CHANGE_FEED_SETTLE_SECONDS свежие события не выдаются:
+    курсор не уходит дальше транзакций, которые ещё могут закоммититься
+    с меньшим id. Граф обменов читает журнал так же.
+    """
+    settings.CHANGE_FEED_SETTLE_SECONDS = 60
+    api_client.force_authenticate(user=user1)
+    response = api_client.get('/api/changes/')
+    assert response.data['results'] == []
+    cursor = response.data['next']
+    exchange_graph.warm(background=False)
+    assert exchange_graph.cursor == 0
+    ChangeEvent.objects.update(
+        created_at=timezone.now() - timedelta(minutes=2))
+    response = api_client.get('/api/changes/', {'since': cursor})
+    assert [e['object_id'] for e in response.data['results']] == [ad1.id]
+
+
+@pytest.mark.django_db
+def test_change_feed_invalid_cursor(auth_client):
+    """Повреждённый курсор журнала возвращает 400."""
+    response = auth_client.get('/api/changes/?since=broken')
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_proposal_cycles_api(
+    auth_client, monkeypatch, user1, user2, ad1, ad2
+):
+    """
+    Эндпоинт обменов по кругу возвращает шаги цикла пользователя,
+    а пока граф загружается — 503 с Retry-After.
+    """
+    user3 = User.objects.create_user(username='user3', password='pass')
+    ad3 = Ad.objects.create(
+        user=user3, title='Куртка', description='Зимняя',
+        category='clothes', condition='used'
+    )
+    create_exchange_proposal(user1, ad2.id, ad1)
+    create_exchange_proposal(user2, ad3.id, ad2)
+    create_exchange_proposal(user3, ad1.id, ad3)
+    with monkeypatch.context() as patch:
+        patch.setattr(exchange_graph, 'warm', lambda: None)
+        response = auth_client.get('/api/proposals/cycles/')
+    assert response.status_code == 503
+    assert response['Retry-After'] == str(ConstNum.CYCLES_RETRY_AFTER)
+    exchange_graph.warm(background=False)
+    response = auth_client.get('/api/proposals/cycles/')
+    assert response.status_code == 200
+    [cycle] = response.data['results']
+    assert [step['receiver_user'] for step in cycle] == [
+        user2.id, user3.id, user1.id]
+
+    response = auth_client.get('/api/proposals/cycles/?max_length=2')
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_ad_suggestions_api(api_client, auth_client, user1, ad1, ad2):
+    """
+    Рекомендации отдаются из готового списка без пересчёта,
+    анонимному пользователю недоступны.
+    """
+    call_command('refresh_suggestions', stdout=io.StringIO())
+    response = auth_client.get('/api/ads/suggestions/')
+    assert response.status_code == 200
+    assert [ad['id'] for ad in response.data['results']] == [ad2.id]
+    assert response.data['count'] == 1
+
+    response = api_client.get('/api/ads/suggestions/')
+    assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_saved_search_matches_api(api_client, auth_client, user1, user2):
+    """
+    Сохранённый поиск через API, лента совпадений новых объявлений
+    и отметка совпадений просмотренными.
+    """
+    response = auth_client.post('/api/saved-searches/', {'search': ''})
+    assert response.status_code == 400
+    response = auth_client.post(
+        '/api/saved-searches/', {'search': 'лампа', 'category': 'electronics'})
+    assert response.status_code == 201, response.data
+
+    api_client.force_authenticate(user=user2)
+    api_client.post('/api/ads/', {
+        'title': 'Настольная лампа', 'description': 'Светодиодная',
+        'category': 'electronics', 'condition': 'new'
+    })
+    api_client.post('/api/ads/', {
+        'title': 'Лампа', 'description': 'Для чтения',
+        'category': 'furniture', 'condition': 'new'
+    })
+    response = auth_client.get('/api/saved-searches/matches/?unread=1')
+    assert [m['ad']['title'] for m in response.data['results']] == [
+        'Настольная лампа']
+
+    response = auth_client.post('/api/saved-searches/matches/read/')
+    assert response.data == {'updated': 1}
+    response = auth_client.get('/api/saved-searches/matches/?unread=1')
+    assert response.data['results'] == []
+
+
+@pytest.mark.django_db
+def test_ads_conditional_get(auth_client, django_assert_num_queries, ad1):
+    """
+    Неизменившийся список отдаётся ответом 304 без запросов к базе,
+    изменение объявления меняет ETag списка и объекта.
+    """
+    response = auth_client.get('/api/ads/?category=furniture')
+    etag = response['ETag']
+    assert response.status_code == 200
+    assert not response.has_header('Last-Modified')
+    response = auth_client.get(
+        '/api/ads/?category=furniture',
+        HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+    )
+    assert response.status_code == 200
+    with django_assert_num_queries(0):
+        response = auth_client.get(
+            '/api/ads/?category=furniture', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+    other = auth_client.get('/api/ads/?category=electronics')
+    assert other['ETag'] != etag
+
+    detail = auth_client.get(f'/api/ads/{ad1.id}/')
+    with django_assert_num_queries(1):
+        response = auth_client.get(
+            f'/api/ads/{ad1.id}/', HTTP_IF_NONE_MATCH=detail['ETag'])
+    assert response.status_code == 304
+    ad1.title = 'Новый стол'
+    ad1.save()
+    response = auth_client.get(
+        '/api/ads/?category=furniture', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data['results'][0]['title'] == 'Новый стол'
+    response = auth_client.get(
+        f'/api/ads/{ad1.id}/', HTTP_IF_NONE_MATCH=detail['ETag'])
+    assert response.status_code == 200
+    assert auth_client.get('/api/ads/0/').status_code == 404
+
+
+@pytest.mark.django_db
+def test_ads_conditional_get_checks_permissions(
+    api_client, user1, user2, ad1
+):
+    """
+    Актуальный ETag не даёт 304 клиенту без прав на объект:
+    чужой и анонимный пользователь получают тот же ответ,
+    что и на обычный GET.
+    """
+    api_client.force_authenticate(user=user1)
+    etag = api_client.get(f'/api/ads/{ad1.id}/')['ETag']
+
+    api_client.force_authenticate(user=user2)
+    expected = api_client.get(f'/api/ads/{ad1.id}/').status_code
+    assert expected == 403
+    response = api_client.get(f'/api/ads/{ad1.id}/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == expected
+    assert not response.has_header('ETag')
+
+    api_client.force_authenticate(user=None)
+    expected = api_client.get(f'/api/ads/{ad1.id}/').status_code
+    assert expected in (401, 403)
+    response = api_client.get(f'/api/ads/{ad1.id}/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == expected
+
+
+@pytest.mark.django_db
+def test_proposals_conditional_get(
+    api_client, django_assert_num_queries, user1, user2, exchange_proposal
+):
+    """
+    ETag списка предложений свой у каждого пользователя и меняется
+    при смене статуса через set-based обработку.
+    """
+    api_client.force_authenticate(user=user2)
+    response = api_client.get('/api/proposals/')
+    etag = response['ETag']
+    with django_assert_num_queries(0):
+        response = api_client.get(
+            '/api/proposals/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    detail = api_client.get(f'/api/proposals/{exchange_proposal.id}/')
+    api_client.force_authenticate(user=user1)
+    assert api_client.get('/api/proposals/')['ETag'] != etag
+
+    api_client.force_authenticate(user=user2)
+    response = api_client.post(
+        f'/api/proposals/{exchange_proposal.id}/reject/')
+    response = api_client.get('/api/proposals/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data['results'][0]['status'] == ConstStr.REJECTED
+    response = api_client.get(
+        f'/api/proposals/{exchange_proposal.id}/',
+        HTTP_IF_NONE_MATCH=detail['ETag']
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_ads_sparse_fields(auth_client, ad1, ad2):
+    """
+    fields оставляет в ответе только выбранные поля, а невыбранные
+    колонки не читаются из базы.
+    """
+    with CaptureQueriesContext(connection) as queries:
+        response = auth_client.get('/api/ads/?fields=id,title')
+    assert [list(ad) for ad in response.data['results']] == [
+        ['id', 'title'], ['id', 'title']]
+    assert not any('"description"' in query['sql'] for query in queries)
+    response = auth_client.get(f'/api/ads/{ad1.id}/?fields=title')
+    assert response.data == {'title': 'Стол'}
+    response = auth_client.get('/api/ads/?fields=id,secret')
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_proposals_expand(
+    api_client, django_assert_num_queries, user1, ad1, exchange_proposal
+):
+    """
+    expand раскрывает объявления предложения тем же запросом,
+    а их изменение меняет ETag раскрытого списка.
+    """
+    api_client.force_authenticate(user=user1)
+    with CaptureQueriesContext(connection) as plain:
+        api_client.get('/api/proposals/')
+    with django_assert_num_queries(len(plain)):
+        response = api_client.get(
+            '/api/proposals/?expand=ad_sender,ad_receiver'
+            '&fields=id,ad_sender,ad_receiver'
+        )
+    proposal = response.data['results'][0]
+    assert list(proposal) == ['id', 'ad_sender', 'ad_receiver']
+    assert proposal['ad_sender']['title'] == 'Стол'
+    assert proposal['ad_receiver']['title'] == 'Лампа'
+    etag = response['ETag']
+    response = api_client.get(
+        f'/api/proposals/{exchange_proposal.id}/?expand=ad_receiver')
+    assert response.data['ad_sender'] == ad1.id
+    assert response.data['ad_receiver']['category'] == 'electronics'
+
+    ad1.title = 'Круглый стол'
+    ad1.save()
+    response = api_client.get(
+        '/api/proposals/?expand=ad_sender,ad_receiver'
+        '&fields=id,ad_sender,ad_receiver',
+        HTTP_IF_NONE_MATCH=etag
+    )
+    assert response.status_code == 200
+    assert response.data['results'][0]['ad_sender']['title'] == (
+        'Круглый стол')
+    response = api_client.get('/api/proposals/?expand=user')
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('fast_encoder', [True, False])
+def test_fast_json_renderer_matches_drf(monkeypatch, fast_encoder):
+    """
+    FastJSONRenderer и потоковый рендерер выдают те же байты,
+    что JSONRenderer DRF, с orjson и без него.
+    """
+    if not fast_encoder:
+        monkeypatch.setattr(renderers, 'orjson', None)
+    items = [
+        {
+            'id': number,
+            'title': f'Лампа \u2028 №{number}',
+            'price': Decimal('10.50'),
+            'created_at': timezone.now(),
+            'tags': ['новый', None, True, 1.5],
+            2: 'ключ-число',
+        }
+        for number in range(5)
+    ]
+    expected = JSONRenderer().render(items)
+    assert FastJSONRenderer().render(items) == expected
+    assert FastJSONRenderer().render({'big': 2 ** 70}) == (
+        JSONRenderer().render({'big': 2 ** 70}))
+    assert FastJSONRenderer().render(
+        items, 'application/json; indent=2'
+    ) == JSONRenderer().render(items, 'application/json; indent=2')
+    for size in (0, 1, 5):
+        streamed = b''.join(StreamingJSONRenderer().render_stream(
+            iter(items[:size]), chunk_size=2))
+        assert streamed == JSONRenderer().render(items[:size])
+
+
+@pytest.mark.parametrize('fast_encoder', [True, False])
+def test_fast_json_renderer_non_finite_floats(monkeypatch, fast_encoder):
+    """
+    NaN и бесконечности: orjson пишет null, стандартный путь,
+    как и JSONRenderer DRF, бросает ValueError.
+    """
+    if not fast_encoder:
+        monkeypatch.setattr(renderers, 'orjson', None)
+    data = {'ratio': float('nan'), 'limit': float('inf')}
+    with pytest.raises(ValueError):
+        JSONRenderer().render(data)
+    if renderers.orjson is None:
+        with pytest.raises(ValueError):
+            FastJSONRenderer().render(data)
+    else:
+        assert FastJSONRenderer().render(data) == (
+            b'{"ratio":null,"limit":null}')
+
+
+@pytest.fixture
+def schema_file(settings, tmp_path):
+    """Файл схемы во временном каталоге и пустой кэш схемы."""
+    settings.API_SCHEMA_PATH = str(tmp_path / 'openapi.json')
+    schema.clear_schema_cache()
+    yield tmp_path / 'openapi.json'
+    schema.clear_schema_cache()
+
+
+def test_schema_served_from_file_with_etag(
+    client, monkeypatch, schema_file
+):
+    """
+    Схема, собранная generate_schema, отдаётся из файла и памяти
+    без повторной генерации, с ETag по содержимому.
+    """
+    call_command('generate_schema', stdout=io.StringIO())
+    body = schema_file.read_bytes()
+    assert '/ads/' in json.loads(body)['paths']
+
+    def fail(*args, **kwargs):
+        raise AssertionError('Схема не должна генерироваться заново.')
+
+    monkeypatch.setattr(schema, 'generate_schema', fail)
+    response = client.get('/swagger.json')
+    assert response.status_code == 200
+    assert response.content == body
+    etag = response['ETag']
+    assert client.get(
+        '/swagger.json', HTTP_IF_NONE_MATCH=etag).status_code == 304
+    response = client.get('/swagger/?format=openapi')
+    assert response['ETag'] == etag
+    response = client.get('/swagger.yaml')
+    assert response['Content-Type'].startswith('application/yaml')
+    assert client.get('/swagger/').status_code == 200
+    assert client.get('/redoc/').status_code == 200
+
+
+def test_schema_regenerated_when_routes_change(client, schema_file):
+    """Схема с чужим отпечатком маршрутов генерируется заново."""
+    schema_file.write_text(json.dumps({
+        'paths': {}, schema.FINGERPRINT_KEY: 'stale'}))
+    response = client.get('/swagger.json')
+    data = json.loads(response.content)
+    assert '/proposals/cycles/' in data['paths']
+    assert data[schema.FINGERPRINT_KEY] == schema.urlconf_fingerprint()
+    assert schema_file.read_bytes() == response.content
+
+
+def test_schema_fingerprint_covers_serializers():
+    """
+    Отпечаток схемы учитывает не только модули представлений,
+    но и сериализаторы, фильтры и модели, которые они используют.
+    """
+    modules = schema.schema_modules(['api.views'])
+    assert {
+        'api.views', 'api.serializers', 'ads.filters', 'ads.models',
+        'constants',
+    } <= modules.keys()
+    assert not any(name.startswith('rest_framework') for name in modules)
+
+
+SERVE_ADS = """
+import json
+import sys
+
+import django
+django.setup()
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+
+setup_test_environment()
+connection.creation.create_test_db(verbosity=0, serialize=False)
+response = Client().get('/api/ads/')
+print(json.dumps({
+    'status': response.status_code,
+    'loaded': sorted(name for name in sys.modules if 'drf_yasg' in name),
+}))
+"""
+
+
+def test_docs_tooling_not_loaded_for_api(settings):
+    """
+    Процесс, обслуживший /api/ads/, не импортирует drf_yasg:
+    инструменты документации загружаются лениво.
+    """
+    result = subprocess.run(
+        [sys.executable, '-c', SERVE_ADS],
+        capture_output=True, text=True, cwd=settings.BASE_DIR, check=True,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'barter.settings'}
+    )
+    outcome = json.loads(result.stdout.splitlines()[-1])
+    assert outcome == {'status': 200, 'loaded': []}
@@ -0,0 +1,74 @@
+import logging
+
+import pytest
+from django.urls import reverse
+
+from services.instrumentation import QueryBudgetExceeded
+
+
+@pytest.mark.django_db
+def test_server_timing_header(client, user1, ad1):
+    """
+    Проверка, что ответ содержит заголовок Server-Timing
+    с числом SQL-запросов и временем в базе.
+    """
+    client.force_login(user1)
+    response = client.get(reverse('ad_list'))
+    timing = response['Server-Timing']
+    assert timing.startswith('db;dur=')
+    assert 'queries"' in timing and 'app;dur=' in timing
+
+
+@pytest.mark.django_db
+def test_query_budget_raises_in_strict_mode(client, settings, user1):
+    """Превышение бюджета в строгом режиме приводит к исключению."""
+    settings.QUERY_BUDGETS = {'GET ad_list': 1}
+    client.force_login(user1)
+    with pytest.raises(QueryBudgetExceeded):
+        client.get(reverse('ad_list'))
+
+
+@pytest.mark.django_db
+def test_query_budget_logs_in_production_mode(
+    client, settings, caplog, user1
+):
+    """Без строгого режима превышение бюджета только пишется в лог."""
+    settings.QUERY_BUDGETS = {'GET ad_list': 1}
+    settings.QUERY_BUDGET_RAISE = False
+    client.force_login(user1)
+    with caplog.at_level(logging.INFO, logger='barter.queries'):
+        response = client.get(reverse('ad_list'))
+    assert response.status_code == 200
+    warnings = [
+        record for record in caplog.records
+        if record.levelno == logging.WARNING
+    ]
+    assert len(warnings) == 1 and 'ad_list' in warnings[0].getMessage()
+    info = next(
+        record for record in caplog.records if record.levelno == logging.INFO
+    )
+    assert info.view == 'ad_list' and info.query_count > 1
+
+
+@pytest.mark.django_db
+def test_query_budget_counts_streamed_queries(
+    api_client, settings, caplog, ad1
+):
+    """
+    Запросы потокового ответа выполняются при чтении тела
+    и учитываются в бюджете, когда поток прочитан.
+    """
+    settings.QUERY_BUDGET_RAISE = False
+    with caplog.at_level(logging.INFO, logger='barter.queries'):
+        response = api_client.get('/api/ads/export/')
+        assert not caplog.records
+        body = b''.join(response.streaming_content)
+    assert ad1.title in body.decode()
+    info = caplog.records[0]
+    assert info.view == 'ad-export' and info.query_count == 1
+
+    settings.QUERY_BUDGETS = {'GET ad-export': 0}
+    settings.QUERY_BUDGET_RAISE = True
+    response = api_client.get('/api/ads/export/')
+    with pytest.raises(QueryBudgetExceeded):
+        b''.join(response.streaming_content)
@@ -1,5 +1,6 @@
 import pytest
 from django.core.exceptions import ValidationError
+from ads.filters import filter_ads
 from ads.models import Ad, ExchangeProposal
 from constants import ConstStr
 
@@ -137,3 +138,60 @@ def test_delete_exchange_proposal(exchange_proposal):
     exchange_proposal.delete()
     with pytest.raises(ExchangeProposal.DoesNotExist):
         ExchangeProposal.objects.get(pk=pk)
+
+
+def query_plan(queryset):
+    """Возвращает план выполнения запроса (EXPLAIN QUERY PLAN)."""
+    return queryset.explain()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('filters, index', [
+    ({'category': 'books', 'condition': 'new'}, 'ad_category_condition_idx'),
+    ({'category': 'books'}, 'ad_category_created_idx'),
+    ({'condition': 'new'}, 'ad_condition_created_idx'),
+    ({}, 'ad_created_id_idx'),
+])
+def test_ad_list_queries_use_indexes(ad1, filters, index):
+    """
+    Проверка, что планировщик использует составные индексы
+    для фильтров списка объявлений с сортировкой по дате.
+    """
+    queryset = Ad.objects.filter(**filters).order_by('-created_at', '-id')
+    plan = query_plan(queryset[:10])
+    assert f'INDEX {index}' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+@pytest.mark.django_db
+def test_user_ads_query_uses_index(user1, ad1):
+    """Проверка индекса для объявлений пользователя по дате."""
+    plan = query_plan(Ad.objects.filter(user=user1).order_by('-created_at'))
+    assert 'INDEX ad_user_created_idx' in plan
+
+
+@pytest.mark.django_db
+def test_pending_proposal_queries_use_partial_indexes(exchange_proposal):
+    """
+    Проверка, что выборки ожидающих предложений по объявлению
+    используют частичные индексы по статусу pending.
+    """
+    by_receiver = ExchangeProposal.objects.filter(
+        ad_receiver=exchange_proposal.ad_receiver, status=ConstStr.PENDING)
+    by_sender = ExchangeProposal.objects.filter(
+        ad_sender=exchange_proposal.ad_sender, status=ConstStr.PENDING)
+    assert 'INDEX proposal_pending_receiver_idx' in query_plan(by_receiver)
+    assert 'INDEX proposal_pending_sender_idx' in query_plan(by_sender)
+
+
+@pytest.mark.django_db
+def test_filter_ads_uses_exact_lookups(ad1):
+    """
+    Проверка, что фильтр по категории и состоянию сравнивает значения
+    точно (без LIKE), поэтому план использует индекс.
+    """
+    queryset = filter_ads(Ad.objects.all(), category='Furniture',
+                          condition='USED')
+    assert 'LIKE' not in str(queryset.query)
+    assert list(queryset) == [ad1]
+    assert 'INDEX ad_category_condition_idx' in query_plan(queryset)
@@ -0,0 +1,669 @@
+import threading
+import time
+from io import StringIO
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from ads.filters import filter_ads
+from api.serializers import (
+    AdCreateSerializer, AdSerializer, ExchangeProposalSerializer
+)
+from ads.models import (
+    Ad, ChangeEvent, EntityChoices, EventChoices, ExchangeProposal,
+    ProposalCounter, SavedSearch, SavedSearchMatch, TradeProfile,
+    TradeSuggestion
+)
+from constants import ConstNum, ConstStr
+from services.context_processors import pending_proposals_count
+from services.listing_cache import (
+    get_cache_stats, get_generation, get_or_compute
+)
+from services.ad_import import import_ads
+from services.counters import (
+    adjust_pending_counters, pending_changes, reconcile_all_counters
+)
+from services.exchange_cycles import (
+    ExchangeGraph, GraphLoadingError, exchange_graph, suggest_cycles
+)
+from services.proposal_service import (
+    ProposalAlreadyHandledError, create_exchange_proposal,
+    handle_proposal_action
+)
+from services.row_serializers import RowSerializer
+from services.saved_searches import index_saved_search
+from services.startup import group_by_package, parse_importtime
+from services.search import build_match_expression
+from services.suggestions import (
+    apply_ads, candidate_profiles, refresh_suggestions
+)
+
+
+def test_build_match_expression():
+    """
+    Проверка построения выражения MATCH:
+    термы в нижнем регистре, префиксный поиск, без спецсимволов.
+    """
+    assert build_match_expression('Детская  КОЛЯСКА!') == (
+        '"детская"* "коляска"*'
+    )
+    assert build_match_expression('"*"') == ''
+
+
+@pytest.mark.django_db
+def test_search_index_follows_ad_changes(ad1, ad2):
+    """
+    Проверка синхронизации поискового индекса с таблицей объявлений
+    при создании, изменении и удалении.
+    """
+    assert list(filter_ads(Ad.objects.all(), search='деревян')) == [ad1]
+    ad1.title = 'Кресло'
+    ad1.description = 'Кожаное'
+    ad1.save()
+    assert not filter_ads(Ad.objects.all(), search='деревян').exists()
+    assert list(filter_ads(Ad.objects.all(), search='кож')) == [ad1]
+    ad1.delete()
+    assert not filter_ads(Ad.objects.all(), search='кож').exists()
+
+
+@pytest.mark.django_db
+def test_search_requires_all_terms(ad1, ad2):
+    """Все слова запроса должны встречаться в заголовке или описании."""
+    assert list(filter_ads(Ad.objects.all(), search='лампа светодиод')) == [
+        ad2
+    ]
+    assert not filter_ads(Ad.objects.all(), search='лампа деревян').exists()
+
+
+@pytest.mark.django_db
+def test_rebuild_search_index_command(ad1):
+    """Команда перестройки индекса сохраняет результаты поиска."""
+    call_command('rebuild_search_index', stdout=StringIO())
+    assert list(filter_ads(Ad.objects.all(), search='стол')) == [ad1]
+
+
+@pytest.mark.django_db
+def test_rank_prefers_title_matches(user1):
+    """
+    Проверка сортировки по релевантности: совпадение в заголовке
+    важнее более нового объявления с совпадением только в описании.
+    """
+    in_title = Ad.objects.create(
+        user=user1, title='Детская коляска', description='Синяя',
+        category='toys', condition='used'
+    )
+    in_description = Ad.objects.create(
+        user=user1, title='Автокресло',
+        description='Подойдёт к любой детской коляске',
+        category='toys', condition='used'
+    )
+    ranked = filter_ads(Ad.objects.all(), search='детская коляска', rank=True)
+    assert list(ranked) == [in_title]
+    ranked = filter_ads(Ad.objects.all(), search='детск коляск', rank=True)
+    assert list(ranked) == [in_title, in_description]
+
+
+def pending_counter(user):
+    counter = ProposalCounter.objects.get(user=user)
+    return counter.pending_sent, counter.pending_received
+
+
+@pytest.mark.django_db
+def test_pending_counters_follow_proposal_lifecycle(user1, user2, ad1, ad2):
+    """
+    Проверка счётчиков ожидающих предложений: создание увеличивает,
+    обработка и каскадное удаление уменьшают.
+    """
+    proposal = create_exchange_proposal(user1, ad2.id, ad1)
+    assert pending_counter(user1) == (1, 0)
+    assert pending_counter(user2) == (0, 1)
+    handle_proposal_action(proposal, 'reject', user2)
+    assert pending_counter(user1) == (0, 0)
+    assert pending_counter(user2) == (0, 0)
+    create_exchange_proposal(user1, ad2.id, ad1)
+    ad2.delete()
+    assert pending_counter(user1) == (0, 0)
+    assert pending_counter(user2) == (0, 0)
+
+
+@pytest.mark.django_db
+def test_ad_cascade_delete_constant_queries(user1, user2):
+    """
+    Удаление объявления с предложениями выполняет одно и то же число
+    запросов при 2 и при 20 предложениях; события и счётчики
+    обновляются для всех удалённых предложений.
+    """
+    counts = []
+    for size in (2, 20):
+        target = Ad.objects.create(
+            user=user2, title='Лампа', description='Светодиодная',
+            category='electronics', condition='new'
+        )
+        for number in range(size):
+            sender = User.objects.create_user(username=f'u{size}-{number}')
+            ad = Ad.objects.create(
+                user=sender, title=f'Книга {number}',
+                description='Бумажная', category='books', condition='used'
+            )
+            create_exchange_proposal(sender, target.id, ad)
+        assert pending_counter(user2) == (0, size)
+        with CaptureQueriesContext(connection) as queries:
+            target.delete()
+        counts.append(len(queries))
+        assert pending_counter(user2) == (0, 0)
+        assert pending_counter(sender) == (0, 0)
+        assert ChangeEvent.objects.filter(
+            entity=EntityChoices.PROPOSAL, event=EventChoices.DELETED
+        ).count() == size
+        ChangeEvent.objects.all().delete()
+    assert counts[0] == counts[1]
+
+
+@pytest.mark.django_db
+def test_delete_user_with_pending_proposals(user1, user2, ad1, ad2):
+    """
+    Удаление пользователя с ожидающими отправленными и входящими
+    предложениями не создаёт заново его счётчик и уменьшает
+    счётчики второй стороны.
+    """
+    create_exchange_proposal(user1, ad2.id, ad1)
+    chair = Ad.objects.create(
+        user=user2, title='Стул', description='Деревянный',
+        category='furniture', condition='used'
+    )
+    create_exchange_proposal(user2, ad1.id, chair)
+    user1_id = user1.id
+    user1.delete()
+    assert not ProposalCounter.objects.filter(user_id=user1_id).exists()
+    assert pending_counter(user2) == (0, 0)
+    assert reconcile_all_counters() == 0
+
+
+@pytest.mark.django_db
+def test_pending_counter_counts_own_proposal_once(user1, ad1):
+    """
+    Предложение между двумя объявлениями одного пользователя
+    учитывается в счётчике один раз, как в подсчёте через OR.
+    """
+    chair = Ad.objects.create(
+        user=user1, title='Стул', description='Деревянный',
+        category='furniture', condition='used'
+    )
+    proposal = ExchangeProposal.objects.create(
+        ad_sender=chair, ad_receiver=ad1)
+    adjust_pending_counters(pending_changes([(user1.id, user1.id)], 1))
+    assert pending_counter(user1) == (1, 0)
+    assert ProposalCounter.objects.get(user=user1).pending_total == (
+        ExchangeProposal.objects.filter(
+            Q(ad_sender__user=user1) | Q(ad_receiver__user=user1),
+            status=ConstStr.PENDING
+        ).count()
+    )
+    assert reconcile_all_counters() == 0
+    proposal.delete()
+    assert pending_counter(user1) == (0, 0)
+
+
+@pytest.mark.django_db
+def test_proposal_version_not_repeated(exchange_proposal):
+    """
+    Версия предложения увеличивается в самом UPDATE: две копии,
+    загруженные до сохранения, получают разные версии.
+    """
+    first = ExchangeProposal.objects.get(pk=exchange_proposal.pk)
+    second = ExchangeProposal.objects.get(pk=exchange_proposal.pk)
+    first.comment = 'Первая правка'
+    first.save()
+    second.comment = 'Вторая правка'
+    second.save()
+    assert (first.version, second.version) == (2, 3)
+    assert ExchangeProposal.objects.get(
+        pk=exchange_proposal.pk).version == 3
+
+
+@pytest.mark.django_db
+def test_reconcile_proposal_counters_command(user1, user2, exchange_proposal):
+    """Команда сверки исправляет расхождение счётчиков."""
+    ProposalCounter.objects.update_or_create(
+        user=user1, defaults={'pending_sent': 7})
+    call_command('reconcile_proposal_counters', stdout=StringIO())
+    assert pending_counter(user1) == (1, 0)
+    assert pending_counter(user2) == (0, 1)
+
+
+@pytest.mark.django_db
+def test_pending_count_context_is_single_lookup(
+    rf, django_assert_num_queries, user1, user2, ad1, ad2
+):
+    """Счётчик в шапке читается одним запросом по первичному ключу."""
+    create_exchange_proposal(user1, ad2.id, ad1)
+    request = rf.get('/')
+    request.user = user2
+    with django_assert_num_queries(1):
+        context = pending_proposals_count(request)
+    assert context == {'pending_proposals_count': 1}
+
+
+def test_listing_cache_counts_hits_and_misses():
+    """Повторное обращение по ключу берёт значение из кэша."""
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return [1, 2]
+
+    assert get_or_compute('listing:test', compute) == [1, 2]
+    assert get_or_compute('listing:test', compute) == [1, 2]
+    assert len(calls) == 1
+    stats = get_cache_stats()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_listing_cache_single_flight():
+    """
+    Пока значение вычисляет другой запрос, обращение по тому же ключу
+    ждёт его результат и не вычисляет значение повторно.
+    """
+    cache.add('listing:test:lock', 1)
+    timer = threading.Timer(0.05, cache.set, ('listing:test', [3]))
+    timer.start()
+
+    def compute():
+        raise AssertionError('Значение должен вычислить владелец блокировки')
+
+    assert get_or_compute('listing:test', compute) == [3]
+    timer.join()
+    assert get_cache_stats()['waits'] == 1
+
+
+@pytest.mark.django_db
+def test_generation_follows_ad_changes(ad1, user2, ad2):
+    """Сохранение, удаление и обмен объявлений сдвигают поколение."""
+    generation = get_generation()
+    ad1.title = 'Новый стол'
+    ad1.save()
+    assert get_generation() > generation
+    generation = get_generation()
+    proposal = create_exchange_proposal(ad1.user, ad2.id, ad1)
+    handle_proposal_action(proposal, 'accept', user2)
+    assert get_generation() > generation
+    generation = get_generation()
+    ad1.delete()
+    assert get_generation() > generation
+
+
+def test_local_generation_expires(settings):
+    """
+    Поколение в локальном кэше истекает: процесс, не видевший
+    чужого изменения, со временем получает новое поколение,
+    и оно больше всех прежних.
+    """
+    settings.LISTING_GENERATION_TIMEOUT = 0.05
+    generation = get_generation()
+    assert get_generation() == generation
+    time.sleep(0.1)
+    assert get_generation() > generation
+
+
+@pytest.mark.django_db
+def test_accept_rejects_competing_proposals(user1, user2, ad1, ad2):
+    """
+    Принятие предложения отклоняет все прочие ожидающие предложения
+    с участием обменянных объявлений и освобождает их счётчики.
+    """
+    accepted = create_exchange_proposal(user1, ad2.id, ad1)
+    other = Ad.objects.create(
+        user=user1, title='Стул', description='Мягкий',
+        category='furniture', condition='used'
+    )
+    competing = create_exchange_proposal(user1, ad2.id, other)
+    handle_proposal_action(accepted, 'accept', user2)
+    competing.refresh_from_db()
+    assert competing.status == 'rejected'
+    assert pending_counter(user1) == (0, 0)
+    assert pending_counter(user2) == (0, 0)
+    with pytest.raises(ProposalAlreadyHandledError):
+        handle_proposal_action(
+            ExchangeProposal.objects.get(pk=competing.pk), 'accept', user2)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_accepts_have_single_winner(user1, user2, ad2):
+    """
+    Параллельное принятие нескольких предложений на одно объявление
+    в файловой базе: успешно ровно одно, обменяны ровно два объявления,
+    остальные предложения отклонены, счётчики сходятся.
+    """
+    proposals = []
+    for number in range(8):
+        ad = Ad.objects.create(
+            user=user1, title=f'Книга {number}', description='Бумажная',
+            category='books', condition='used'
+        )
+        proposals.append(create_exchange_proposal(user1, ad2.id, ad))
+    barrier = threading.Barrier(len(proposals))
+    results = []
+
+    def accept(proposal):
+        try:
+            barrier.wait()
+            handle_proposal_action(proposal, 'accept', user2)
+            results.append('accepted')
+        except ProposalAlreadyHandledError:
+            results.append('already_handled')
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=accept, args=(proposal,))
+        for proposal in ExchangeProposal.objects.select_related(
+            'ad_sender', 'ad_receiver')
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == ['accepted'] + ['already_handled'] * 7
+    assert Ad.objects.filter(is_exchanged=True).count() == 2
+    statuses = list(ExchangeProposal.objects.values_list('status', flat=True))
+    assert sorted(statuses) == ['accepted'] + ['rejected'] * 7
+    assert reconcile_all_counters() == 0
+
+
+@pytest.mark.django_db
+def test_import_ads_in_batches(
+    tmp_path, django_assert_max_num_queries, user1
+):
+    """
+    Импорт вставляет строки пачками: число запросов зависит
+    от количества пачек, а не строк; команда читает файл построчно.
+    """
+    rows = (
+        (number, {
+            'title': f'Книга {number}', 'description': 'Бумажная',
+            'category': 'books', 'condition': 'used',
+        })
+        for number in range(1, 251)
+    )
+    with django_assert_max_num_queries(18):
+        report = import_ads(rows, user1, batch_size=100)
+    assert (report.created, report.error_count) == (250, 0)
+    assert report.rows_per_second > 0
+
+    path = tmp_path / 'ads.jsonl'
+    path.write_text(
+        '{"title": "Лампа", "description": "Настольная", '
+        '"category": "electronics", "condition": "new"}\n'
+        '{"title": "Лампа"}\n',
+        encoding='utf-8'
+    )
+    out, err = StringIO(), StringIO()
+    call_command(
+        'import_ads', str(path), user='user1', stdout=out, stderr=err)
+    assert 'Создано объявлений: 1' in out.getvalue()
+    assert 'Строка 2' in err.getvalue()
+    assert filter_ads(Ad.objects.all(), search='лампа').count() == 1
+
+
+@pytest.mark.django_db
+def test_export_ads_command(tmp_path, ad1, ad2):
+    """Команда выгрузки пишет NDJSON в файл с учётом поиска."""
+    path = tmp_path / 'ads.ndjson'
+    call_command('export_ads', file=str(path), search='лампа')
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 1
+    assert '"title": "Лампа"' in lines[0]
+
+
+def test_exchange_graph_cycle_rules():
+    """
+    Граф находит циклы от трёх участников в пределах длины,
+    пропускает циклы с повторным владельцем и сохраняет ребро,
+    пока жив хотя бы один дубль предложения.
+    """
+    graph = ExchangeGraph()
+    graph.load([
+        (1, 10, 20, 1, 2), (2, 20, 30, 2, 3), (3, 30, 10, 3, 1),
+        (4, 10, 40, 1, 4), (5, 40, 50, 4, 5), (6, 50, 60, 5, 6),
+        (7, 60, 10, 6, 1), (8, 20, 11, 2, 1), (9, 11, 10, 1, 1),
+        (10, 20, 30, 2, 3),
+    ])
+    cycles = graph.find_cycles(1)
+    assert [[step['ad_sender'] for step in cycle] for cycle in cycles] == [
+        [10, 20, 30], [10, 40, 50, 60]]
+    assert graph.find_cycles(1, max_length=3) == cycles[:1]
+    graph.remove_edge(2)
+    assert len(graph.find_cycles(1, max_length=3)) == 1
+    graph.remove_edge(10)
+    assert graph.find_cycles(1, max_length=3) == []
+    assert graph.find_cycles(2) == []
+
+
+@pytest.mark.django_db
+def test_exchange_cycles_follow_change_feed(
+    user1, user2, ad1, ad2, django_assert_num_queries
+):
+    """
+    Граф обменов загружается один раз и дальше обновляется
+    по журналу изменений: новое и отклонённое предложение
+    меняют найденные циклы без полной перезагрузки.
+    """
+    user3 = User.objects.create_user(username='user3', password='pass')
+    ad3 = Ad.objects.create(
+        user=user3, title='Куртка', description='Зимняя',
+        category='clothes', condition='used'
+    )
+    create_exchange_proposal(user1, ad2.id, ad1)
+    create_exchange_proposal(user2, ad3.id, ad2)
+    exchange_graph.warm(background=False)
+    assert suggest_cycles(user1) == []
+    closing = create_exchange_proposal(user3, ad1.id, ad3)
+    with django_assert_num_queries(2):
+        cycles = suggest_cycles(user1)
+    assert [step['ad_sender'] for step in cycles[0]] == [
+        ad1.id, ad2.id, ad3.id]
+    assert cycles[0][2]['proposal'] == closing.id
+    with django_assert_num_queries(1):
+        assert suggest_cycles(user3) != []
+
+    handle_proposal_action(closing, 'reject', user1)
+    assert suggest_cycles(user1) == []
+    assert len(exchange_graph) == 2
+
+
+@pytest.mark.django_db
+def test_exchange_graph_never_loads_in_request(
+    monkeypatch, user1, user2, ad1, ad2
+):
+    """
+    Без загруженного графа поиск не загружает его в запросе,
+    а запускает фоновую загрузку; при отставании больше
+    CYCLES_SYNC_MAX поиск отвечает по текущему снимку.
+    """
+    started = []
+    monkeypatch.setattr(
+        exchange_graph, 'warm', lambda background=True: started.append(1))
+    with pytest.raises(GraphLoadingError):
+        suggest_cycles(user1)
+    assert started == [1] and not exchange_graph.ready
+
+    exchange_graph.rebuild()
+    monkeypatch.setattr(ConstNum, 'CYCLES_SYNC_MAX', 1)
+    create_exchange_proposal(user1, ad2.id, ad1)
+    create_exchange_proposal(user2, ad1.id, ad2)
+    with CaptureQueriesContext(connection) as queries:
+        assert suggest_cycles(user1) == []
+    assert started == [1, 1] and len(exchange_graph) == 0
+    assert 'LIMIT 2' in queries[0]['sql']
+
+
+def suggested(user):
+    return list(TradeSuggestion.objects.filter(user=user).order_by(
+        '-score', '-ad').values_list('ad_id', flat=True))
+
+
+@pytest.mark.django_db
+def test_refresh_suggestions_incremental(user1, user2, ad1, ad2):
+    """
+    Рекомендации учитывают интересы из истории предложений,
+    не включают свои объявления и уже предложенные обмены;
+    новые и обменянные объявления обрабатываются без полного пересчёта.
+    """
+    create_exchange_proposal(user1, ad2.id, ad1)
+    lamp = Ad.objects.create(
+        user=user2, title='Торшер', description='Напольный',
+        category='electronics', condition='new'
+    )
+    book = Ad.objects.create(
+        user=user2, title='Роман', description='Твёрдый переплёт',
+        category='books', condition='used'
+    )
+    assert refresh_suggestions()['full'] is True
+    assert suggested(user1) == [lamp.id, book.id]
+    assert TradeProfile.objects.get(user=user1).categories == {
+        'electronics': 1.0}
+
+    phone = Ad.objects.create(
+        user=user2, title='Телефон', description='Кнопочный',
+        category='electronics', condition='used'
+    )
+    stats = refresh_suggestions()
+    assert (stats['full'], stats['users'], stats['ads']) == (False, 0, 1)
+    assert suggested(user1) == [lamp.id, phone.id, book.id]
+
+    lamp.is_exchanged = True
+    lamp.save()
+    refresh_suggestions()
+    assert suggested(user1) == [phone.id, book.id]
+    assert ad1.id in suggested(user2)
+
+
+@pytest.mark.django_db
+def test_apply_ads_reads_only_candidate_profiles(user1):
+    """
+    Новое объявление сравнивается только с профилями активных
+    пользователей, в чей список оно может попасть.
+    """
+    book = Ad.objects.create(
+        user=user1, title='Роман', description='Твёрдый переплёт',
+        category='books', condition='used'
+    )
+    profiles = {
+        'short': ({'toys': 1.0}, None),
+        'reader': ({'books': 1.0}, 10.0 ** 6),
+        'stale': ({'toys': 1.0}, -10.0 ** 6),
+        'collector': ({'toys': 1.0}, 10.0 ** 6),
+        'inactive': ({'books': 1.0}, None),
+    }
+    for username, (categories, lowest) in profiles.items():
+        user = User.objects.create_user(
+            username=username, is_active=username != 'inactive')
+        TradeProfile.objects.create(
+            user=user, categories=categories, threshold=lowest)
+    ads = Ad.objects.filter(pk=book.pk).values_list(
+        'id', 'user_id', 'category', 'condition', 'created_at')
+    selected = User.objects.filter(pk__in=[
+        row[0] for row in candidate_profiles(list(ads))
+    ]).values_list('username', flat=True)
+    assert set(selected) == {'short', 'reader', 'stale'}
+    assert apply_ads([book.id], set()) == {
+        User.objects.get(username=name).pk for name in ('short', 'stale')}
+
+
+@pytest.mark.django_db
+def test_saved_searches_percolate_new_ads(user1, user2):
+    """
+    Новое объявление попадает в ленту владельцев поисков, все термы
+    которых нашлись как префиксы слов, с учётом категории и состояния;
+    свои объявления и неактивные поиски не учитываются.
+    """
+    def saved(user, search='', **filters):
+        return index_saved_search(SavedSearch.objects.create(
+            user=user, search=search, **filters))
+
+    stroller = saved(user1, 'Детская КОЛЯСК')
+    toys = saved(user1, category='toys', condition='new')
+    saved(user1, 'коляска зимняя')
+    saved(user1, 'детская', is_active=False)
+    own = saved(user2, 'коляска')
+    cafe = saved(user1, 'cafe')
+    ad = Ad.objects.create(
+        user=user2, title='Коляска детская', description='Почти новая',
+        category='toys', condition='new'
+    )
+    matches = SavedSearchMatch.objects.filter(ad=ad)
+    assert set(matches.values_list('saved_search', flat=True)) == {
+        stroller.id, toys.id}
+    assert not matches.filter(saved_search=own).exists()
+
+    report = import_ads([
+        (1, {'title': 'Café', 'description': 'Коляска детская, синяя',
+             'category': 'other', 'condition': 'used'}),
+    ], user2)
+    assert report.created == 1
+    assert SavedSearchMatch.objects.filter(
+        saved_search=stroller).count() == 2
+    assert SavedSearchMatch.objects.filter(saved_search=toys).count() == 1
+    assert SavedSearchMatch.objects.filter(saved_search=cafe).count() == 1
+
+
+@pytest.mark.django_db
+def test_row_serializer_matches_model_serializer(ad1, ad2, exchange_proposal):
+    """
+    Вывод RowSerializer по строкам values() совпадает побайтно
+    с выводом ModelSerializer, включая вложенного пользователя,
+    пустые значения и даты.
+    """
+    ad1.image_url = 'https://example.com/lamp.png'
+    ad1.save()
+    renderer = JSONRenderer()
+    cases = [
+        (AdCreateSerializer, Ad.objects.order_by('id')),
+        (AdSerializer, Ad.objects.order_by('id')),
+        (ExchangeProposalSerializer, ExchangeProposal.objects.all()),
+    ]
+    for serializer_class, queryset in cases:
+        row_serializer = RowSerializer(serializer_class)
+        rows = row_serializer.values(queryset)
+        assert renderer.render(row_serializer.represent(rows)) == (
+            renderer.render(serializer_class(queryset, many=True).data)
+        )
+        assert renderer.render(
+            row_serializer.to_representation(rows[0])
+        ) == renderer.render(serializer_class(queryset[0]).data)
+
+    class MethodSerializer(serializers.ModelSerializer):
+        label = serializers.SerializerMethodField()
+
+        class Meta:
+            model = Ad
+            fields = ['id', 'label']
+
+    with pytest.raises(ValueError):
+        RowSerializer(MethodSerializer)
+
+
+def test_parse_importtime():
+    """Разбор вывода -X importtime и сводка по пакетам."""
+    imports = parse_importtime([
+        'import time: self [us] | cumulative | imported package',
+        'import time:       120 |        120 |   yaml.reader',
+        'import time:       880 |       1000 | yaml',
+        'import time:      2500 |       2500 | api.views',
+        'Traceback: не строка профиля',
+    ])
+    assert imports == {
+        'yaml.reader': (0.12, 0.12),
+        'yaml': (0.88, 1.0),
+        'api.views': (2.5, 2.5),
+    }
+    assert group_by_package(imports) == [('api', 2.5, 1), ('yaml', 1.0, 2)]
@@ -1,7 +1,10 @@
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.http import urlencode
-from ads.models import Ad
+from ads.models import Ad, ExchangeProposal
+from services.listing_cache import bump_generation
 
 
 @pytest.mark.django_db
@@ -144,3 +147,194 @@ def test_ad_delete_view(client, user1, ad1):
     response = client.post(reverse('ad_delete', args=[ad1.pk]))
     assert response.status_code == 302
     assert not Ad.objects.filter(pk=ad1.pk).exists()
+
+
+@pytest.mark.django_db
+def test_ad_list_cursor_pagination(client, user1):
+    """
+    Проверка курсорной пагинации списка объявлений:
+    вторая страница продолжает первую без повторов.
+    """
+    client.force_login(user1)
+    for number in range(15):
+        Ad.objects.create(
+            user=user1, title=f'Книга {number}', description='Бумажная',
+            category='books', condition='used'
+        )
+    response = client.get(reverse('ad_list'), {'category': 'books'})
+    page_obj = response.context['page_obj']
+    first_ids = [ad.id for ad in response.context['ads']]
+    assert response.context['paginator'] is None
+    assert page_obj.has_next() and not page_obj.has_previous()
+    response = client.get(
+        reverse('ad_list'),
+        {'category': 'books', 'cursor': page_obj.next_cursor}
+    )
+    second_ids = [ad.id for ad in response.context['ads']]
+    assert len(first_ids) == 10 and len(second_ids) == 5
+    assert not set(first_ids) & set(second_ids)
+    assert not response.context['page_obj'].has_next()
+
+
+def create_exchanged_ads(user, count):
+    Ad.objects.bulk_create(
+        Ad(
+            user=user, title=f'Обменяно {number}', description='Старое',
+            category='other', condition='used', is_exchanged=True
+        )
+        for number in range(count)
+    )
+    bump_generation()
+
+
+@pytest.mark.django_db
+def test_ad_list_query_count_independent_of_exchanged_ads(
+    client, user1, user2
+):
+    """
+    Проверка, что число запросов списка объявлений не растёт
+    вместе с количеством обменянных объявлений в базе.
+    """
+    client.force_login(user1)
+    create_exchanged_ads(user2, 3)
+    with CaptureQueriesContext(connection) as small:
+        client.get(reverse('ad_list'))
+    create_exchanged_ads(user2, 50)
+    with CaptureQueriesContext(connection) as large:
+        response = client.get(reverse('ad_list'))
+    assert len(large) == len(small)
+    assert 'exchanged_ads_ids' not in response.context
+    assert 'proposed_ads_ids' not in response.context
+
+
+@pytest.mark.django_db
+def test_ad_list_marks_proposed_ads(client, user1, ad2, exchange_proposal):
+    """
+    Проверка, что объявление, которому пользователь уже отправил
+    предложение, помечено в списке как ожидающее ответа.
+    """
+    client.force_login(user1)
+    response = client.get(reverse('ad_list'))
+    flags = {ad.pk: ad.is_proposed for ad in response.context['ads']}
+    assert flags[ad2.pk] is True
+    assert flags[exchange_proposal.ad_sender_id] is False
+    assert 'Ожидает ответа' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_my_proposals_query_count_is_constant(client, user1, user2, ad1):
+    """
+    Проверка, что страница предложений выполняет одно и то же
+    число запросов при 1 и при 5 предложениях в каждом списке.
+    """
+    client.force_login(user1)
+    counts = []
+    for number in range(5):
+        ad = Ad.objects.create(
+            user=user2, title=f'Лампа {number}', description='Новая',
+            category='electronics', condition='new'
+        )
+        ExchangeProposal.objects.create(ad_sender=ad1, ad_receiver=ad)
+        ExchangeProposal.objects.create(ad_sender=ad, ad_receiver=ad1)
+        if number + 1 in (1, 5):
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(reverse('my_proposals'))
+            assert len(response.context['sent_proposals']) == number + 1
+            assert len(response.context['received_proposals']) == number + 1
+            counts.append(len(queries))
+    assert counts == [7, 7]
+
+
+@pytest.mark.django_db
+def test_ad_list_query_count_is_constant(client, user1, user2):
+    """
+    Проверка, что страница объявлений выполняет одно и то же число
+    запросов при 2 и при 12 объявлениях: владелец объявления
+    не загружается построчно.
+    """
+    client.force_login(user1)
+    counts = []
+    for number in range(12):
+        Ad.objects.create(
+            user=user2 if number % 2 else user1, title=f'Стул {number}',
+            description='Деревянный', category='furniture', condition='used'
+        )
+        if number + 1 in (2, 12):
+            with CaptureQueriesContext(connection) as queries:
+                client.get(reverse('ad_list'))
+            counts.append(len(queries))
+    assert counts == [6, 6]
+
+
+@pytest.mark.django_db
+def test_ad_list_shows_exchange_after_cache_hit(
+    client, user1, user2, exchange_proposal
+):
+    """
+    Принятие предложения сбрасывает кэш списка: обменянные
+    объявления сразу показываются с новым статусом.
+    """
+    client.force_login(user1)
+    response = client.get(reverse('ad_list'))
+    assert len(response.context['ads']) == 2
+    client.force_login(user2)
+    client.post(
+        reverse('handle_proposal', args=[exchange_proposal.pk, 'accept']))
+    client.force_login(user1)
+    response = client.get(reverse('ad_list'))
+    assert all(ad.is_exchanged for ad in response.context['ads'])
+
+
+@pytest.mark.django_db
+def test_ad_list_facet_counts(client, user1, ad1, ad2):
+    """
+    Проверка, что в фильтрах рядом с категориями и состояниями
+    показано число объявлений под текущим поиском.
+    """
+    client.force_login(user1)
+    response = client.get(reverse('ad_list'), {'search': 'стол'})
+    categories = {
+        facet['value']: facet['count']
+        for facet in response.context['category_facets']
+    }
+    assert categories['furniture'] == 1
+    assert categories['electronics'] == 0
+    assert 'Мебель (1)' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_ad_card_fragment_follows_version(client, user1, user2, ad1, ad2):
+    """
+    Общая часть карточки берётся из кэша по id и версии объявления,
+    кнопки рисуются для каждого пользователя отдельно; сохранение
+    и обмен объявления сдвигают версию и обновляют карточку.
+    """
+    client.force_login(user1)
+    client.get(reverse('ad_list'))
+    Ad.objects.filter(pk=ad2.pk).update(title='Без версии')
+    bump_generation()
+    content = client.get(reverse('ad_list')).content.decode()
+    assert 'Лампа' in content and 'Без версии' not in content
+    assert 'Предложить обмен' in content
+
+    client.force_login(user2)
+    content = client.get(reverse('ad_list')).content.decode()
+    assert 'Лампа' in content and 'Редактировать' in content
+
+    ad2.title = 'Торшер'
+    ad2.save()
+    assert ad2.version == 2
+    content = client.get(reverse('ad_list')).content.decode()
+    assert 'Торшер' in content and 'Лампа' not in content
+
+    proposal = ExchangeProposal.objects.create(ad_sender=ad1, ad_receiver=ad2)
+    client.post(reverse('handle_proposal', args=[proposal.pk, 'accept']))
+    assert Ad.objects.get(pk=ad2.pk).version == 3
+    content = client.get(reverse('ad_list')).content.decode()
+    assert 'Торшер' in content
+
+    ad2.title = 'Ночник'
+    ad2.save()
+    assert ad2.version == 4
+    content = client.get(reverse('ad_list')).content.decode()
+    assert 'Ночник' in content and 'Торшер' not in content